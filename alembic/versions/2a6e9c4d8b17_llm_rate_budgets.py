@@ -0,0 +1,35 @@
+"""LLM rate budgets
+
+Revision ID: 2a6e9c4d8b17
+Revises: f20c8b5d3e91
+Create Date: 2026-10-18 13:26:52.084117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2a6e9c4d8b17'
+down_revision: Union[str, None] = 'f20c8b5d3e91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'llm_rate_budgets',
+        sa.Column('model', sa.String(length=100), nullable=False),
+        sa.Column('tokens_limit', sa.Integer(), nullable=False),
+        sa.Column('requests_limit', sa.Integer(), nullable=False),
+        sa.Column('tokens_available', sa.Float(), nullable=False),
+        sa.Column('requests_available', sa.Float(), nullable=False),
+        sa.Column('refilled_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('model')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('llm_rate_budgets')
@@ -0,0 +1,50 @@
+"""Resume parse jobs
+
+Revision ID: 5c1d9a7e3b20
+Revises: 2047c39ea9f2
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d9a7e3b20'
+down_revision: Union[str, None] = '2047c39ea9f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'resume_parse_jobs',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('candidate_id', sa.BigInteger(), nullable=False),
+        sa.Column('blend', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='5'),
+        sa.Column('run_after', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('locked_by', sa.String(length=255), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_resume_parse_jobs_id'), 'resume_parse_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_resume_parse_jobs_candidate_id'), 'resume_parse_jobs', ['candidate_id'], unique=False)
+    op.create_index(op.f('ix_resume_parse_jobs_status'), 'resume_parse_jobs', ['status'], unique=False)
+    op.create_index(op.f('ix_resume_parse_jobs_run_after'), 'resume_parse_jobs', ['run_after'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_resume_parse_jobs_run_after'), table_name='resume_parse_jobs')
+    op.drop_index(op.f('ix_resume_parse_jobs_status'), table_name='resume_parse_jobs')
+    op.drop_index(op.f('ix_resume_parse_jobs_candidate_id'), table_name='resume_parse_jobs')
+    op.drop_index(op.f('ix_resume_parse_jobs_id'), table_name='resume_parse_jobs')
+    op.drop_table('resume_parse_jobs')
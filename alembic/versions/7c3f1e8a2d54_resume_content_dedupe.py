@@ -0,0 +1,51 @@
+"""Resume content dedupe
+
+Revision ID: 7c3f1e8a2d54
+Revises: 2a6e9c4d8b17
+Create Date: 2026-10-18 14:02:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3f1e8a2d54'
+down_revision: Union[str, None] = '2a6e9c4d8b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'resume_contents',
+        sa.Column('content_sha256', sa.String(length=64), nullable=False),
+        sa.Column('extracted_text', sa.Text(), nullable=True),
+        sa.Column('parsed_data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('content_sha256')
+    )
+
+    # Nullable without a default, so adding it doesn't rewrite the table
+    op.add_column('candidate_resumes', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+
+    # Build the index without blocking writes, CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_candidate_resumes_content_sha256'),
+            'candidate_resumes',
+            ['content_sha256'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_candidate_resumes_content_sha256'), table_name='candidate_resumes', postgresql_concurrently=True)
+    op.drop_column('candidate_resumes', 'content_sha256')
+    op.drop_table('resume_contents')
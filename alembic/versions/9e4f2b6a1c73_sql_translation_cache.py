@@ -0,0 +1,38 @@
+"""SQL translation cache
+
+Revision ID: 9e4f2b6a1c73
+Revises: 5c1d9a7e3b20
+Create Date: 2026-10-18 10:02:17.540932
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4f2b6a1c73'
+down_revision: Union[str, None] = '5c1d9a7e3b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sql_translation_cache',
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('normalized_query', sa.Text(), nullable=False),
+        sa.Column('sql', sa.Text(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index(op.f('ix_sql_translation_cache_expires_at'), 'sql_translation_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_sql_translation_cache_expires_at'), table_name='sql_translation_cache')
+    op.drop_table('sql_translation_cache')
@@ -0,0 +1,32 @@
+"""Parse claims
+
+Revision ID: a8c2e5d7f391
+Revises: e6b3f9a1d274
+Create Date: 2026-10-18 19:27:51.630482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c2e5d7f391'
+down_revision: Union[str, None] = 'e6b3f9a1d274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'parse_claims',
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('owner', sa.String(length=64), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('parse_claims')
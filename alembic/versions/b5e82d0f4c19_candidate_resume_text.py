@@ -0,0 +1,28 @@
+"""Candidate resume text
+
+Revision ID: b5e82d0f4c19
+Revises: 7c3f1e8a2d54
+Create Date: 2026-10-18 14:31:08.662045
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e82d0f4c19'
+down_revision: Union[str, None] = '7c3f1e8a2d54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # zlib compressed, Postgres doesn't need to TOAST-compress it again
+    op.add_column('candidate_resumes', sa.Column('resume_text', sa.LargeBinary(), nullable=True))
+    op.execute("ALTER TABLE candidate_resumes ALTER COLUMN resume_text SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    op.drop_column('candidate_resumes', 'resume_text')
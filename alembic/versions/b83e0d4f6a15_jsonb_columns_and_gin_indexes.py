@@ -0,0 +1,101 @@
+"""JSONB columns and GIN indexes
+
+Revision ID: b83e0d4f6a15
+Revises: 9e4f2b6a1c73
+Create Date: 2026-10-18 10:48:05.902615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b83e0d4f6a15'
+down_revision: Union[str, None] = '9e4f2b6a1c73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+JSON_COLUMNS = [
+    'jobby_skills', 'jobby_certifications', 'jobby_education', 'jobby_jobs', 'jobby_reviews',
+    'skills', 'languages', 'certifications', 'education', 'experience', 'projects',
+    'achievements', 'publications', 'volunteer_work', 'professional_links', 'tags',
+]
+
+# Columns the text-to-SQL prompt queries with @>, the others are searched through the
+# trigram indexed *_text columns
+GIN_COLUMNS = ['tags', 'jobby_jobs']
+
+# Rows converted per committed UPDATE during the backfill
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    # An ALTER COLUMN ... TYPE would rewrite the table under ACCESS EXCLUSIVE. Instead each
+    # column gets a JSONB shadow column, backfilled in small committed batches and then
+    # swapped in with metadata-only DROP/RENAME.
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    for column in JSON_COLUMNS:
+        op.add_column('candidate_resumes', sa.Column(f'{column}_jsonb', postgresql.JSONB(), nullable=True))
+
+    # Rows written while the backfill runs convert themselves
+    op.execute(
+        "CREATE FUNCTION candidate_resumes_jsonb_sync() RETURNS trigger AS $$ BEGIN "
+        + " ".join(f"NEW.{column}_jsonb := NEW.{column}::jsonb;" for column in JSON_COLUMNS)
+        + " RETURN NEW; END; $$ LANGUAGE plpgsql"
+    )
+    op.execute(
+        "CREATE TRIGGER candidate_resumes_jsonb_sync BEFORE INSERT OR UPDATE ON candidate_resumes "
+        "FOR EACH ROW EXECUTE FUNCTION candidate_resumes_jsonb_sync()"
+    )
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM candidate_resumes")).scalar()
+        for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+            # The trigger fills the shadow columns, each batch commits on its own
+            bind.execute(
+                sa.text("UPDATE candidate_resumes SET id = id WHERE id >= :start AND id < :end"),
+                {"start": start, "end": start + BACKFILL_BATCH_SIZE},
+            )
+
+    # Fail fast instead of queueing every reader behind the short ACCESS EXCLUSIVE lock
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.execute("DROP TRIGGER candidate_resumes_jsonb_sync ON candidate_resumes")
+    op.execute("DROP FUNCTION candidate_resumes_jsonb_sync()")
+    op.execute("ALTER TABLE candidate_resumes " + ", ".join(f"DROP COLUMN {column}" for column in JSON_COLUMNS))
+    for column in JSON_COLUMNS:
+        op.alter_column('candidate_resumes', f'{column}_jsonb', new_column_name=column)
+
+    # Build the indexes without blocking writes, CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for column in GIN_COLUMNS:
+            op.create_index(
+                f'ix_candidate_resumes_{column}_gin',
+                'candidate_resumes',
+                [column],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column: 'jsonb_path_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in GIN_COLUMNS:
+            op.drop_index(
+                f'ix_candidate_resumes_{column}_gin',
+                table_name='candidate_resumes',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+    op.execute(
+        "ALTER TABLE candidate_resumes "
+        + ", ".join(f"ALTER COLUMN {column} TYPE JSON USING {column}::json" for column in JSON_COLUMNS)
+    )
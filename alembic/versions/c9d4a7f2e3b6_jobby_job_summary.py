@@ -0,0 +1,47 @@
+"""Jobby job summary
+
+Revision ID: c9d4a7f2e3b6
+Revises: b5e82d0f4c19
+Create Date: 2026-10-18 15:12:45.204871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d4a7f2e3b6'
+down_revision: Union[str, None] = 'b5e82d0f4c19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'jobby_job_summary',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('job_id', sa.BigInteger(), nullable=False),
+        sa.Column('title', sa.Text(), nullable=True),
+        sa.Column('categories', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('application_count', sa.Integer(), nullable=False),
+        sa.Column('jobstart_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'job_id')
+    )
+    op.create_table(
+        'sync_watermarks',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('last_id', sa.BigInteger(), nullable=False),
+        sa.Column('last_updated_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+    # Filled by `python -m logic.job_summary --rebuild`, the collector reads Jobby directly until then
+
+
+def downgrade() -> None:
+    op.drop_table('sync_watermarks')
+    op.drop_table('jobby_job_summary')
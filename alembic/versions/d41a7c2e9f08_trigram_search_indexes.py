@@ -0,0 +1,88 @@
+"""Trigram search indexes
+
+Revision ID: d41a7c2e9f08
+Revises: b83e0d4f6a15
+Create Date: 2026-10-18 11:31:44.127390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a7c2e9f08'
+down_revision: Union[str, None] = 'b83e0d4f6a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TEXT_COLUMNS = ['skills_text', 'languages_text', 'certifications_text', 'experience_text', 'tags_text']
+
+TRGM_COLUMNS = ['location', 'about', 'jobby_about'] + TEXT_COLUMNS
+
+# Rows backfilled per committed UPDATE
+BACKFILL_BATCH_SIZE = 5000
+
+
+def _array_text(column: str) -> str:
+    """SQL joining the string elements of a JSONB array column, mirrors build_search_text"""
+    return (
+        f"COALESCE((SELECT string_agg(value, ' | ') FROM jsonb_array_elements_text("
+        f"CASE WHEN jsonb_typeof({column}) = 'array' THEN {column} ELSE '[]'::jsonb END) AS value), '')"
+    )
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    for column in TEXT_COLUMNS:
+        op.add_column('candidate_resumes', sa.Column(column, sa.Text(), nullable=True))
+
+    # Backfill existing rows in small committed batches, a single UPDATE would row-lock the
+    # whole table for the run. New and updated rows are filled by store_resume_data.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM candidate_resumes")).scalar()
+        for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+            bind.execute(sa.text(f"""
+                UPDATE candidate_resumes SET
+                    skills_text = concat_ws(' | ', NULLIF({_array_text('skills')}, ''), NULLIF({_array_text('jobby_skills')}, '')),
+                    languages_text = {_array_text('languages')},
+                    certifications_text = concat_ws(' | ', NULLIF({_array_text('certifications')}, ''), NULLIF({_array_text('jobby_certifications')}, '')),
+                    experience_text = COALESCE((
+                        SELECT string_agg(concat_ws(' | ', exp->>'title', exp->>'company', exp->>'description', exp->>'location'), ' | ')
+                        FROM jsonb_array_elements(CASE WHEN jsonb_typeof(experience) = 'array' THEN experience ELSE '[]'::jsonb END) AS exp
+                    ), ''),
+                    tags_text = {_array_text('tags')}
+                WHERE id >= :start AND id < :end
+            """), {"start": start, "end": start + BACKFILL_BATCH_SIZE})
+
+    # Build the indexes without blocking writes, CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for column in TRGM_COLUMNS:
+            op.create_index(
+                f'ix_candidate_resumes_{column}_trgm',
+                'candidate_resumes',
+                [column],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in TRGM_COLUMNS:
+            op.drop_index(
+                f'ix_candidate_resumes_{column}_trgm',
+                table_name='candidate_resumes',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+    for column in TEXT_COLUMNS:
+        op.drop_column('candidate_resumes', column)
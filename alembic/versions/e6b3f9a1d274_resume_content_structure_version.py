@@ -0,0 +1,28 @@
+"""Resume content structure version
+
+Revision ID: e6b3f9a1d274
+Revises: c9d4a7f2e3b6
+Create Date: 2026-10-18 18:41:09.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3f9a1d274'
+down_revision: Union[str, None] = 'c9d4a7f2e3b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable without a default, so adding it doesn't rewrite the table. Structures
+    # stored before it have no version and are parsed again on their next use.
+    op.add_column('resume_contents', sa.Column('structure_version', sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('resume_contents', 'structure_version')
@@ -0,0 +1,84 @@
+"""Search document
+
+Revision ID: f20c8b5d3e91
+Revises: d41a7c2e9f08
+Create Date: 2026-10-18 12:14:09.663018
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f20c8b5d3e91'
+down_revision: Union[str, None] = 'd41a7c2e9f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_DOCUMENT_SQL = (
+    "setweight(to_tsvector('simple', coalesce(NEW.name, '') || ' ' || coalesce(NEW.jobby_name, '')), 'A') || "
+    "setweight(to_tsvector('italian', coalesce(NEW.skills_text, '') || ' ' || coalesce(NEW.tags_text, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(NEW.skills_text, '') || ' ' || coalesce(NEW.tags_text, '')), 'A') || "
+    "setweight(to_tsvector('italian', coalesce(NEW.experience_text, '') || ' ' || coalesce(NEW.certifications_text, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(NEW.experience_text, '') || ' ' || coalesce(NEW.certifications_text, '')), 'B') || "
+    "setweight(to_tsvector('italian', coalesce(NEW.about, '') || ' ' || coalesce(NEW.jobby_about, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(NEW.about, '') || ' ' || coalesce(NEW.jobby_about, '')), 'C')"
+)
+
+# Rows filled per committed UPDATE during the backfill
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    # A GENERATED ... STORED column would rewrite the table under ACCESS EXCLUSIVE. Instead
+    # the column is a plain tsvector kept up to date by a trigger and backfilled in small
+    # committed batches.
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.add_column('candidate_resumes', sa.Column('search_document', postgresql.TSVECTOR(), nullable=True))
+
+    op.execute(
+        "CREATE FUNCTION candidate_resumes_search_document() RETURNS trigger AS $$ BEGIN "
+        f"NEW.search_document := {SEARCH_DOCUMENT_SQL}; RETURN NEW; END; $$ LANGUAGE plpgsql"
+    )
+    op.execute(
+        "CREATE TRIGGER candidate_resumes_search_document BEFORE INSERT OR UPDATE ON candidate_resumes "
+        "FOR EACH ROW EXECUTE FUNCTION candidate_resumes_search_document()"
+    )
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM candidate_resumes")).scalar()
+        for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+            # The trigger fills search_document, each batch commits on its own
+            bind.execute(
+                sa.text("UPDATE candidate_resumes SET id = id WHERE id >= :start AND id < :end"),
+                {"start": start, "end": start + BACKFILL_BATCH_SIZE},
+            )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_candidate_resumes_search_document',
+            'candidate_resumes',
+            ['search_document'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_candidate_resumes_search_document',
+            table_name='candidate_resumes',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.execute("DROP TRIGGER candidate_resumes_search_document ON candidate_resumes")
+    op.execute("DROP FUNCTION candidate_resumes_search_document()")
+    op.drop_column('candidate_resumes', 'search_document')
@@ -1,19 +1,23 @@
 import asyncio
-from fastapi import FastAPI, Depends, Body
+import json
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Generator, Optional
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional, Literal
+from pydantic import BaseModel, Field
 
-from core.database import get_db, get_pg_db
-from logic.collect import collect_candidate_data
+from core.database import get_async_pg_db
+from logic.collect import collect_candidate_data, candidate_data_cache
+from logic.jobs import enqueue_parse_job, get_job, make_job_response
 from services import ServiceManager, get_service_manager
-from models.sql import CandidateResume
-from logic.resume import check_existing_resume, get_resume_path, store_resume_data, get_resume_result,blend_data
-import logging
+from logic.resume import parse_candidate_resume
 import core.database
 from services.evaluator import CandidateEvaluator
-from utils.structure import DataStructureService
+from utils.sql_cache import sql_translation_cache
+from utils.llm_cache import llm_response_cache
+from utils.file_cache import resume_file_cache
+from utils.llm_scheduler import backfill
 
 app = FastAPI(
     title="Jobby API",
@@ -27,6 +31,16 @@ app = FastAPI(
     - hard_skills: Optional list of hard skills to filter by
     - languages: Optional list of languages to filter by
     - certifications: Optional list of certifications to filter by
+    - llm_deadline: Optional seconds to wait for the natural language query before returning filter results only
+    - mode: "llm" (default) for the text-to-SQL search, "ranked" for relevance ordered full-text search
+    - page_size / cursor: Keyset paging, pass the previous response's next_cursor to get the next page
+    - fields: Optional list of candidate columns to return (e.g. ["name", "location", "skills"])
+
+    The batch parse endpoint (/resumes/parse/batch) accepts a list of candidate IDs and
+    streams one NDJSON line per candidate as soon as its resume has been processed.
+
+    The job endpoints (/resumes/jobs) queue a parse and return a job id immediately; the
+    worker pool started with `python worker.py` drains the queue.
     """,
     version="1.0.0"
 )
@@ -48,6 +62,16 @@ class SearchRequest(BaseModel):
     hard_skills: Optional[List[str]] = None
     languages: Optional[List[str]] = None
     certifications: Optional[List[str]] = None
+    llm_deadline: Optional[float] = Field(None, gt=0)
+    mode: Literal["llm", "ranked"] = "llm"
+    page_size: int = Field(50, ge=1, le=200)
+    cursor: Optional[str] = None
+    fields: Optional[List[str]] = None
+
+class BatchParseRequest(BaseModel):
+    candidate_ids: List[int] = Field(..., min_length=1)
+    blend: bool = False
+    concurrency: int = Field(5, ge=1, le=50)
 
 @app.get("/health")
 async def health_check() -> Dict[str, Any]:
@@ -58,54 +82,90 @@ async def health_check() -> Dict[str, Any]:
         "version": app.version
     }
 
+@app.get("/cache/stats")
+async def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the in-process caches"""
+    return {
+        "sql_translation": sql_translation_cache.stats(),
+        "llm_response": llm_response_cache.stats(),
+        "resume_files": resume_file_cache.stats(),
+        "candidate_data": candidate_data_cache.stats(),
+    }
+
 @app.post("/resumes/parse/")
 async def parse_resume(
     candidate_id: int,
     blend: bool = False,
+    force: bool = False,
     service_manager: ServiceManager = Depends(get_service_manager),
-    pg_db: Session = Depends(get_pg_db)
+    pg_db: AsyncSession = Depends(get_async_pg_db)
+) -> Dict[str, Any]:
+    return await parse_candidate_resume(service_manager, pg_db, candidate_id, blend, force)
+
+@app.post("/resumes/parse/batch")
+async def parse_resume_batch(
+    request: BatchParseRequest,
+) -> StreamingResponse:
+    """
+    Parse resumes for a list of candidates with bounded concurrency.
+
+    Request body:
+    - **candidate_ids**: List of candidate IDs to parse
+    - **blend**: Whether to blend the resumes with the Jobby data
+    - **concurrency**: Maximum number of candidates processed at the same time
+
+    Results are streamed back as NDJSON, one line per candidate, in completion order.
+    """
+    candidate_ids = list(dict.fromkeys(request.candidate_ids))
+    semaphore = asyncio.Semaphore(request.concurrency)
+
+    async def parse_one(candidate_id: int) -> Dict[str, Any]:
+        async with semaphore:
+            # Each candidate gets its own sessions: request scoped sessions are closed
+            # before the streamed body is sent, and an AsyncSession can't be shared
+            async with core.database.AsyncSessionLocal() as db, core.database.AsyncPGSessionLocal() as pg_db:
+                # Bulk parsing yields the LLM budget to interactive requests
+                with backfill():
+                    result = await parse_candidate_resume(ServiceManager(db), pg_db, candidate_id, request.blend)
+        return {"candidate_id": candidate_id, **result}
+
+    async def stream_results():
+        tasks = [asyncio.ensure_future(parse_one(candidate_id)) for candidate_id in candidate_ids]
+        try:
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                yield json.dumps(result, default=str) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.post("/resumes/jobs")
+async def submit_resume_job(
+    candidate_id: int,
+    blend: bool = False,
+    pg_db: AsyncSession = Depends(get_async_pg_db)
 ) -> Dict[str, Any]:
-    try:
-        path_result = get_resume_path(service_manager, candidate_id)
-        if "error" in path_result:
-            return path_result
-        resume_path = path_result["resume_path"]
-
-        # Check if resume exists
-        existing_result = check_existing_resume(pg_db, resume_path)
-        if existing_result["exists"] and existing_result["blended"] == blend:
-            return existing_result
-
-        # Process resume and collect candidate data concurrently
-        tasks = [
-            get_resume_result(service_manager, resume_path, candidate_id, structured=not blend),
-            collect_candidate_data(service_manager, candidate_id)
-        ]
-        resume_result, candidate_data = await asyncio.gather(*tasks)
-
-        if not resume_result:
-            return {"error": "Failed to process resume"}
-        data_to_store = resume_result[0]
-        if blend:
-            structureService = DataStructureService()
-            content = blend_data(data_to_store, candidate_data)
-            structured_data = structureService.struture_resume_with_blended_jobby_data(content)
-            store_result = await store_resume_data(pg_db, candidate_id, candidate_data, resume_path, {"data" : structured_data["parsed_data"]}, blended=blend)
-            return store_result["data"]
-        # Store resume data
-        store_result = await store_resume_data(pg_db, candidate_id, candidate_data, resume_path, resume_result[0], blended=blend)
-        return store_result["data"]
-
-    except Exception as e:
-        if pg_db and hasattr(pg_db, 'is_active') and pg_db.is_active:
-            pg_db.rollback()
-        logging.error(f"Error processing resume for candidate {candidate_id}: {str(e)}")
-        return {"success": False, "error": f"Failed to process resume: {str(e)}"}
+    """Queue a resume parse to be processed by the worker pool (see worker.py)"""
+    job = await enqueue_parse_job(pg_db, candidate_id, blend)
+    return {"success": True, "job_id": job.id, "status": job.status}
+
+@app.get("/resumes/jobs/{job_id}")
+async def get_resume_job(
+    job_id: int,
+    pg_db: AsyncSession = Depends(get_async_pg_db)
+) -> Dict[str, Any]:
+    """Get the status and, once done, the result of a resume parse job"""
+    job = await get_job(pg_db, job_id)
+    if not job:
+        return {"success": False, "error": "Job not found"}
+    return {"success": True, **make_job_response(job)}
 
 @app.post("/candidates/search")
 async def search_candidates(
     request: SearchRequest,
-    pg_db: Session = Depends(get_pg_db),
+    pg_db: AsyncSession = Depends(get_async_pg_db),
 ) -> Dict[str, Any]:
     """
     Search and evaluate candidates based on criteria with optional filters.
@@ -118,9 +178,14 @@ async def search_candidates(
     - **hard_skills**: List of hard skills to filter by (e.g., ["Java", "Python"])
     - **languages**: List of languages to filter by (e.g., ["English", "Spanish"])
     - **certifications**: List of certifications to filter by (e.g., ["AWS", "PMP"])
+    - **llm_deadline**: Seconds to wait for the semantic search before returning filter results only
+    - **mode**: "llm" (default) or "ranked" for full-text search ordered by relevance, without an LLM call
+    - **page_size** / **cursor**: Page size and the `next_cursor` of the previous page
+    - **fields**: Candidate columns to return, all of them when omitted (e.g. ["name", "location", "skills"])
     
     The search combines both semantic search (via the query parameter) and direct database filtering.
-    Results will include candidates that match both the semantic search and the applied filters.
+    Both run concurrently; results will include candidates that match both the semantic search and
+    the applied filters. The response reports per-branch timings and whether the deadline was hit.
     
     Example request:
     ```json
@@ -141,18 +206,30 @@ async def search_candidates(
         soft_skills=request.soft_skills,
         hard_skills=request.hard_skills,
         languages=request.languages,
-        certifications=request.certifications
+        certifications=request.certifications,
+        llm_deadline=request.llm_deadline,
+        mode=request.mode,
+        page_size=request.page_size,
+        cursor=request.cursor,
+        fields=request.fields
     )
 
 @app.post("/candidates/evaluate")
 async def evaluate_candidate(
     request: Dict[str, Any],
-    pg_db: Session = Depends(get_pg_db),
+    pg_db: AsyncSession = Depends(get_async_pg_db),
 ) -> Dict[str, Any]:
     """Evaluate a candidate based on their resume data"""
     candidate_ids = request.get("candidate_ids", [])
     compare_with = request.get("compare_with", "")
-    return await CandidateEvaluator(pg_db).evaluate_candidate_list(candidate_ids, compare_with)
+    # Optional pre-screen limits, only the best candidates are evaluated by the LLM
+    top_n = request.get("top_n")
+    min_score = request.get("min_score")
+    return await CandidateEvaluator(pg_db).evaluate_candidate_list(
+        candidate_ids, compare_with,
+        top_n=int(top_n) if top_n is not None else None,
+        min_score=float(min_score) if min_score is not None else None,
+    )
 
 
 @app.get("/collect_data/{candidate_id}")
@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from functools import lru_cache
-from typing import Generator
+from typing import Generator, AsyncGenerator
 import os
 import logging
 from dotenv import load_dotenv
@@ -42,6 +43,10 @@ DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB
 # SQLAlchemy setup for PostgreSQL
 PG_DATABASE_URL = f"postgresql://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_DB}"
 
+# Async drivers used by the API, the sync URLs above remain for alembic and table creation
+ASYNC_DATABASE_URL = f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_PG_DATABASE_URL = f"postgresql+asyncpg://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_DB}"
+
 # MySQL engine with connection pool and retry settings
 engine = create_engine(
     DATABASE_URL,
@@ -61,6 +66,33 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 pg_engine = create_engine(PG_DATABASE_URL)
 PGSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=pg_engine)
 
+# Async MySQL engine, same pool settings as the sync one
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=5,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    connect_args={
+        'connect_timeout': 30,
+    }
+)
+
+# Objects must stay readable after commit without an implicit (and, with asyncio, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Async PostgreSQL engine and session
+async_pg_engine = create_async_engine(
+    ASYNC_PG_DATABASE_URL,
+    pool_size=10,
+    max_overflow=20,
+    pool_timeout=30,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+)
+AsyncPGSessionLocal = async_sessionmaker(bind=async_pg_engine, autoflush=False, expire_on_commit=False)
+
 # Create base classes for models
 Base = declarative_base()
 Base.metadata.bind = engine
@@ -87,6 +119,9 @@ def create_all_tables():
     try:
         # Create tables
         Base.metadata.create_all(bind=engine)
+        # Trigram indexes on candidate_resumes need pg_trgm
+        with pg_engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         PGBase.metadata.create_all(bind=pg_engine)
         logger.info("All database tables created successfully")
     except Exception as e:
@@ -120,6 +155,20 @@ def get_pg_db() -> Generator[Session, None, None]:
         db.close()        
         logger.info('PostgreSQL Database session closed')
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency for getting an async MySQL database session"""
+    async with AsyncSessionLocal() as db:
+        logger.info('Async MySQL Database session created')
+        yield db
+    logger.info('Async MySQL Database session closed')
+
+async def get_async_pg_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency for getting an async PostgreSQL database session"""
+    async with AsyncPGSessionLocal() as db:
+        logger.info('Async PostgreSQL Database session created')
+        yield db
+    logger.info('Async PostgreSQL Database session closed')
+
 # Set up SQLAlchemy event listeners for MySQL
 @event.listens_for(engine, 'connect')
 def receive_connect(dbapi_connection, connection_record):
@@ -173,3 +222,12 @@ def receive_pg_after_commit(session):
 @event.listens_for(PGSessionLocal, 'after_rollback')
 def receive_pg_after_rollback(session):
     logger.info('PostgreSQL Database transaction rolled back')
+
+# Set up SQLAlchemy event listeners for the async engines
+@event.listens_for(async_engine.sync_engine, 'connect')
+def receive_async_connect(dbapi_connection, connection_record):
+    logger.info(f'Async MySQL Database connection established to {DB_HOST}:{DB_PORT}')
+
+@event.listens_for(async_pg_engine.sync_engine, 'connect')
+def receive_async_pg_connect(dbapi_connection, connection_record):
+    logger.info('Async PostgreSQL Database connection established')
@@ -1,67 +1,100 @@
+from typing import Any, Dict, List, Optional, Tuple
 from services import ServiceManager, get_service_manager
 from services.jobby import JobbyDBService
+from utils.cache import LRUCache
+from logic.job_summary import get_summary_watermark, get_jobs_done
+import asyncio
+import copy
 import logging
+import os
 from  models.candidate import CandidateData
 
+# Candidates collected per batch, each batch costs one connection and one round trip per query
+COLLECT_BATCH_SIZE = int(os.getenv('COLLECT_BATCH_SIZE', '200'))
+# Batches collected at the same time
+COLLECT_CONCURRENCY = int(os.getenv('COLLECT_CONCURRENCY', '4'))
+CANDIDATE_CACHE_SIZE = int(os.getenv('CANDIDATE_CACHE_SIZE', '2048'))
+# Even unchanged entries are recollected after this, not every Jobby table bumps users.updated_at
+CANDIDATE_CACHE_TTL = int(os.getenv('CANDIDATE_CACHE_TTL', '900'))
+
+
+class CandidateDataCache:
+    """LRU of collected candidate data, each entry tagged with the candidate's version
+
+    A lookup serves the entry only if the version, read fresh by the caller, still
+    matches the one it was collected at.
+    """
+
+    def __init__(self, max_size: int = CANDIDATE_CACHE_SIZE, ttl: int = CANDIDATE_CACHE_TTL):
+        self.entries = LRUCache(max_size=max_size, ttl=ttl)
+        self.stale = 0
+
+    def get(self, candidate_id: int, version: Tuple) -> Optional[CandidateData]:
+        entry = self.entries.get(candidate_id)
+        if entry is None:
+            return None
+        cached_version, data = entry
+        if cached_version != version:
+            self.entries.delete(candidate_id)
+            self.stale += 1
+            return None
+        # Callers may modify the data, hand out a copy
+        return copy.deepcopy(data)
+
+    def set(self, candidate_id: int, version: Tuple, data: CandidateData) -> None:
+        self.entries.set(candidate_id, (version, copy.deepcopy(data)))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.entries.stats()
+        # A stale entry was found but had changed, it is served as a miss
+        stats["stale"] = self.stale
+        stats["hits"] -= self.stale
+        stats["misses"] += self.stale
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+candidate_data_cache = CandidateDataCache()
+
 
 
 async def collect_jobby_data(sm: ServiceManager, candidate_id: int):
     import asyncio
-    from functools import partial
-    from core.database import SessionLocal
-
-    async def run_sync(func, *args):
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, func, *args)
+    from core.database import AsyncSessionLocal, AsyncPGSessionLocal
 
     async def get_certifications():
-        db = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             jobby_service = JobbyDBService(db)
-            jobby_certifications = await run_sync(jobby_service.get_candidate_certifications, candidate_id)
+            jobby_certifications = await jobby_service.get_candidate_certifications(candidate_id)
             logging.info(f"Jobby certifications: {jobby_certifications}")
             return jobby_certifications
-        finally:
-            db.close()
 
     async def get_jobs():
-        db = SessionLocal()
-        try:
-            jobby_service = JobbyDBService(db)
-            jobby_jobs = await run_sync(jobby_service.get_candidate_jobs_done, candidate_id)
+        async with AsyncSessionLocal() as db, AsyncPGSessionLocal() as pg_db:
+            jobby_jobs = (await get_jobs_done(db, pg_db, [candidate_id]))[candidate_id]
             logging.info(f"Jobby jobs: {jobby_jobs}")
             return jobby_jobs
-        finally:
-            db.close()
     async def get_skills():
-        db = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             jobby_service = JobbyDBService(db)
-            jobby_skills = await run_sync(jobby_service.get_candidate_skills, candidate_id)
+            jobby_skills = await jobby_service.get_candidate_skills(candidate_id)
             logging.info(f"Jobby skills: {jobby_skills}")
             return jobby_skills
-        finally:
-            db.close()
 
     async def get_education():
-        db = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             jobby_service = JobbyDBService(db)
-            jobby_education = await run_sync(jobby_service.get_candidate_education, candidate_id)
+            jobby_education = await jobby_service.get_candidate_education(candidate_id)
             logging.info(f"Jobby education: {jobby_education}")
             return jobby_education
-        finally:
-            db.close()
 
     async def get_basic_info():
-        db = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             jobby_service = JobbyDBService(db)
-            jobby_basic_info = await run_sync(jobby_service.get_candidate_basic_info, candidate_id)
+            jobby_basic_info = await jobby_service.get_candidate_basic_info(candidate_id)
             logging.info(f"Jobby basic info: {jobby_basic_info}")
             return jobby_basic_info
-        finally:
-            db.close()
 
     certifications, jobs , basic_info = await asyncio.gather(
         get_certifications(),
@@ -77,5 +110,74 @@ async def collect_jobby_data(sm: ServiceManager, candidate_id: int):
 
 
 async def collect_candidate_data(sm: ServiceManager, candidate_id: int) -> CandidateData:
+    """Collected data of a candidate, served from the cache while its version is unchanged"""
+    from core.database import AsyncSessionLocal, AsyncPGSessionLocal
+
+    async with AsyncSessionLocal() as db, AsyncPGSessionLocal() as pg_db:
+        version = await JobbyDBService(db).get_candidate_version(candidate_id)
+        watermark = await get_summary_watermark(pg_db)
+
+    if version is not None:
+        # Jobs may come from the summary, entries collected before its last refresh are stale
+        version += (watermark.last_id, watermark.last_updated_at) if watermark else (None, None)
+        data = candidate_data_cache.get(candidate_id, version)
+        if data is not None:
+            logging.info(f"Candidate data cache hit for {candidate_id}")
+            return data
+
     logging.info("Collecting data")
-    return await collect_jobby_data(sm, candidate_id)
\ No newline at end of file
+    data = await collect_jobby_data(sm, candidate_id)
+    # Unknown users are not cached, they may be created any moment
+    if version is not None:
+        candidate_data_cache.set(candidate_id, version, data)
+    return data
+
+
+async def collect_jobby_data_batch(candidate_ids: List[int]) -> Dict[int, Dict]:
+    """Collect the Jobby data of a batch of candidates on a single connection"""
+    from core.database import AsyncSessionLocal, AsyncPGSessionLocal
+
+    async with AsyncSessionLocal() as db, AsyncPGSessionLocal() as pg_db:
+        jobby_service = JobbyDBService(db)
+        # One session can't run statements concurrently, the queries run back to back
+        certifications = await jobby_service.get_candidates_certifications(candidate_ids)
+        jobs = await get_jobs_done(db, pg_db, candidate_ids)
+        basic_info = await jobby_service.get_candidates_basic_info(candidate_ids)
+
+    return {
+        candidate_id: {
+            # Same values as collect_jobby_data for a single candidate
+            "certifications": certifications.get(candidate_id) or None,
+            "jobs": jobs.get(candidate_id),
+            "basic_info": basic_info.get(candidate_id),
+        }
+        for candidate_id in candidate_ids
+    }
+
+
+async def collect_candidates_data(candidate_ids: List[int], batch_size: int = COLLECT_BATCH_SIZE) -> Dict[int, CandidateData]:
+    """Collect the Jobby data of many candidates
+
+    Candidates are split into batches of ``batch_size``; each batch runs one query per
+    data source with an IN list, so the cost scales with batches rather than candidates.
+
+    Args:
+        candidate_ids (List[int]): Jobby user IDs of the candidates
+        batch_size (int): Candidates per batch
+
+    Returns:
+        Dict[int, CandidateData]: Collected data by candidate ID
+    """
+    candidate_ids = list(dict.fromkeys(candidate_ids))
+    batches = [candidate_ids[i:i + batch_size] for i in range(0, len(candidate_ids), batch_size)]
+    logging.info(f"Collecting data for {len(candidate_ids)} candidates in {len(batches)} batches")
+    semaphore = asyncio.Semaphore(COLLECT_CONCURRENCY)
+
+    async def collect_batch(batch: List[int]) -> Dict[int, Dict]:
+        async with semaphore:
+            return await collect_jobby_data_batch(batch)
+
+    collected = {}
+    for result in await asyncio.gather(*[collect_batch(batch) for batch in batches]):
+        collected.update(result)
+    return collected
@@ -0,0 +1,114 @@
+from datetime import datetime
+from typing import Dict, Any, Optional, BinaryIO, Tuple, Union
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import hashlib
+import json
+import logging
+import zlib
+
+from models.sql import CandidateResume, ResumeContent
+
+HASH_CHUNK_SIZE = 1024 * 1024
+TEXT_COMPRESSION_LEVEL = 6
+
+
+def compress_text(text: Optional[str]) -> Optional[bytes]:
+    """zlib compress extracted resume text for storage"""
+    if text is None:
+        return None
+    return zlib.compress(text.replace('\x00', '').encode('utf-8'), TEXT_COMPRESSION_LEVEL)
+
+
+def decompress_text(data: Optional[bytes]) -> Optional[str]:
+    if data is None:
+        return None
+    return zlib.decompress(data).decode('utf-8')
+
+
+def content_sha256(file: Union[str, BinaryIO]) -> str:
+    """sha256 of a resume file, from a path or a seekable binary file object"""
+    digest = hashlib.sha256()
+    if isinstance(file, str):
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    else:
+        file.seek(0)
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        file.seek(0)
+    return digest.hexdigest()
+
+
+async def get_resume_content(pg_db: AsyncSession, sha256: str) -> Optional[ResumeContent]:
+    """Get the stored extraction of a resume file by its hash"""
+    result = await pg_db.execute(select(ResumeContent).where(ResumeContent.content_sha256 == sha256))
+    return result.scalars().first()
+
+
+async def save_resume_content(pg_db: AsyncSession, sha256: str, extracted_text: Optional[str]=None,
+                              parsed_data: Optional[Dict[str, Any]]=None, structure_version: Optional[str]=None) -> None:
+    """Store the extraction and/or unblended structure of a resume file
+
+    Values left as None keep what is already stored, so the text and the structure
+    can be saved at different points of the pipeline.
+
+    Args:
+        pg_db (AsyncSession): PostgreSQL session
+        sha256 (str): Hash of the resume file
+        extracted_text (Optional[str]): Text extracted from the file
+        parsed_data (Optional[Dict[str, Any]]): Structured resume without Jobby data
+        structure_version (Optional[str]): Version ``parsed_data`` was produced with, required with it
+    """
+    values = {
+        'content_sha256': sha256,
+        # Postgres text can't hold NUL characters
+        'extracted_text': extracted_text.replace('\x00', '') if extracted_text is not None else None,
+        # Structures carry dates, round-trip through json so the column only holds plain values
+        'parsed_data': json.loads(json.dumps(parsed_data, default=str).replace('\\u0000', '')) if parsed_data is not None else None,
+        'structure_version': structure_version if parsed_data is not None else None,
+    }
+    stmt = insert(ResumeContent).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['content_sha256'],
+        set_={
+            'extracted_text': func.coalesce(stmt.excluded.extracted_text, ResumeContent.extracted_text),
+            'parsed_data': func.coalesce(stmt.excluded.parsed_data, ResumeContent.parsed_data),
+            'structure_version': func.coalesce(stmt.excluded.structure_version, ResumeContent.structure_version),
+            'updated_at': datetime.utcnow(),
+        }
+    )
+    try:
+        await pg_db.execute(stmt)
+        await pg_db.commit()
+    except Exception as e:
+        logging.error(f"Error storing resume content {sha256}: {str(e)}")
+        await pg_db.rollback()
+
+
+async def get_stored_resume_text(pg_db: AsyncSession, resume_path: str) -> Tuple[Optional[str], Optional[str]]:
+    """Text previously extracted for a resume path, without touching S3
+
+    Reads the compressed copy on the candidate row, falling back to the content table
+    for rows stored before the text was kept on the row.
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: The text, or None if it isn't stored, and
+        the sha256 of the file it was extracted from, if known
+    """
+    result = await pg_db.execute(
+        select(CandidateResume.resume_text, CandidateResume.content_sha256)
+        .where(CandidateResume.resume_path == resume_path)
+    )
+    row = result.first()
+    if row is None:
+        return None, None
+    if row.resume_text is not None:
+        return decompress_text(row.resume_text), row.content_sha256
+    if row.content_sha256:
+        stored = await get_resume_content(pg_db, row.content_sha256)
+        if stored is not None:
+            return stored.extracted_text, row.content_sha256
+    return None, row.content_sha256
@@ -0,0 +1,208 @@
+"""Per-user summary of completed Jobby jobs, kept in Postgres
+
+``jobby_job_summary`` holds one row per user and completed job. It is refreshed
+incrementally from the applications changed since the ``job_summary`` watermark, and
+can be rebuilt from scratch:
+
+    python -m logic.job_summary            # incremental refresh
+    python -m logic.job_summary --rebuild  # full rebuild, for backfills
+"""
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+import os
+import sys
+
+from models.sql import JobbyJobSummary, SyncWatermark
+from services.jobby import JobbyDBService
+
+WATERMARK_NAME = "job_summary"
+JOB_SUMMARY_BATCH_SIZE = int(os.getenv('JOB_SUMMARY_BATCH_SIZE', '500'))
+JOB_SUMMARY_ENABLED = os.getenv('JOB_SUMMARY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+
+async def get_watermark(pg_db: AsyncSession, name: str) -> Optional[SyncWatermark]:
+    result = await pg_db.execute(select(SyncWatermark).where(SyncWatermark.name == name))
+    return result.scalars().first()
+
+
+async def set_watermark(pg_db: AsyncSession, name: str, last_id: int, last_updated_at: Optional[datetime]) -> None:
+    stmt = insert(SyncWatermark).values(name=name, last_id=last_id, last_updated_at=last_updated_at, updated_at=datetime.utcnow())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'last_id': stmt.excluded.last_id, 'last_updated_at': stmt.excluded.last_updated_at, 'updated_at': stmt.excluded.updated_at}
+    )
+    await pg_db.execute(stmt)
+
+
+async def get_summary_watermark(pg_db: AsyncSession) -> Optional[SyncWatermark]:
+    """Point the summary was last refreshed up to, None while it is disabled or never built"""
+    if not JOB_SUMMARY_ENABLED:
+        return None
+    return await get_watermark(pg_db, WATERMARK_NAME)
+
+
+async def refresh_users(db: AsyncSession, pg_db: AsyncSession, user_ids: List[int]) -> int:
+    """Recompute the summary rows of a set of users
+
+    Args:
+        db (AsyncSession): MySQL session
+        pg_db (AsyncSession): PostgreSQL session, committed once per batch
+        user_ids (List[int]): Users to recompute
+
+    Returns:
+        int: Number of summary rows written
+    """
+    jobby_service = JobbyDBService(db)
+    written = 0
+    for i in range(0, len(user_ids), JOB_SUMMARY_BATCH_SIZE):
+        batch = user_ids[i:i + JOB_SUMMARY_BATCH_SIZE]
+        rows = await jobby_service.get_job_summary_rows(batch)
+        now = datetime.utcnow()
+        # Replace the users' rows, a job that lost its completed status must disappear
+        await pg_db.execute(delete(JobbyJobSummary).where(JobbyJobSummary.user_id.in_(batch)))
+        if rows:
+            # executemany, a multi-VALUES insert would exceed the bind parameter limit
+            await pg_db.execute(insert(JobbyJobSummary), [{**row, 'updated_at': now} for row in rows])
+        await pg_db.commit()
+        written += len(rows)
+        logging.info(f"Job summary refreshed for {len(batch)} users ({len(rows)} rows)")
+    return written
+
+
+async def refresh_job_summary(db: AsyncSession, pg_db: AsyncSession) -> int:
+    """Recompute the users whose applications changed since the watermark
+
+    The watermark is read from Jobby before the changed users, and only stored once
+    they are all refreshed, so a crash replays the window instead of skipping it.
+
+    Returns:
+        int: Number of users refreshed
+    """
+    jobby_service = JobbyDBService(db)
+    watermark = await get_watermark(pg_db, WATERMARK_NAME)
+    if watermark is None:
+        logging.info("Job summary has never been built, rebuilding")
+        return await rebuild_job_summary(db, pg_db)
+
+    target = await jobby_service.get_applications_watermark()
+    user_ids = await jobby_service.get_users_with_changed_applications(watermark.last_id, watermark.last_updated_at, target["last_id"])
+    logging.info(f"Refreshing job summary for {len(user_ids)} users changed since application {watermark.last_id}")
+    await refresh_users(db, pg_db, user_ids)
+    await set_watermark(pg_db, WATERMARK_NAME, target["last_id"], target["last_updated_at"])
+    await pg_db.commit()
+    return len(user_ids)
+
+
+async def rebuild_job_summary(db: AsyncSession, pg_db: AsyncSession) -> int:
+    """Rebuild the whole summary from Jobby
+
+    Returns:
+        int: Number of users summarized
+    """
+    jobby_service = JobbyDBService(db)
+    target = await jobby_service.get_applications_watermark()
+    user_ids = await jobby_service.get_users_with_jobs()
+    logging.info(f"Rebuilding job summary for {len(user_ids)} users")
+
+    started_at = datetime.utcnow()
+    await refresh_users(db, pg_db, user_ids)
+    # Rows not rewritten belong to users with no completed job left. Readers keep
+    # seeing a full summary during the rebuild, unlike a truncate up front.
+    await pg_db.execute(delete(JobbyJobSummary).where(JobbyJobSummary.updated_at < started_at))
+    await set_watermark(pg_db, WATERMARK_NAME, target["last_id"], target["last_updated_at"])
+    await pg_db.commit()
+    return len(user_ids)
+
+
+def _format_datetime(value: Optional[datetime]) -> Optional[str]:
+    # Same text MySQL's JSON_OBJECT gives a DATETIME, so both sources read alike
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f') if value else None
+
+
+async def get_jobs_done_from_summary(pg_db: AsyncSession, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Jobs done statistics of several users from the summary, in one indexed lookup
+
+    Same shape and counts as JobbyDBService.get_candidate_jobs_done: a job counts once
+    towards the total and towards each of its category labels, a title counts the
+    user's completed applications.
+
+    Returns:
+        Dict[int, Dict[str, Any]]: Job statistics by user ID, users without jobs get a zero total
+    """
+    result = await pg_db.execute(
+        select(JobbyJobSummary).where(JobbyJobSummary.user_id.in_(list(user_ids)))
+    )
+    rows: Dict[int, List[JobbyJobSummary]] = {}
+    for row in result.scalars():
+        rows.setdefault(row.user_id, []).append(row)
+
+    jobs_done = {}
+    for user_id in user_ids:
+        user_rows = rows.get(user_id, [])
+        if not user_rows:
+            jobs_done[user_id] = {"total": 0, "categories": None, "job_titles": None, "last_job_done": None}
+            continue
+        categories: Dict[str, int] = {}
+        titles: Dict[Optional[str], int] = {}
+        for row in user_rows:
+            for category in row.categories or []:
+                categories[category] = categories.get(category, 0) + 1
+            titles[row.title] = titles.get(row.title, 0) + row.application_count
+        last_job_at = max((row.jobstart_at for row in user_rows if row.jobstart_at), default=None)
+        jobs_done[user_id] = {
+            "total": len(user_rows),
+            "categories": [{"category": category, "count": count} for category, count in sorted(categories.items())] or None,
+            "job_titles": [{"title": title, "count": count} for title, count in sorted(titles.items(), key=lambda item: item[0] or '')],
+            "last_job_done": _format_datetime(last_job_at),
+        }
+    return jobs_done
+
+
+async def get_jobs_done(db: AsyncSession, pg_db: AsyncSession, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Jobs done statistics of several users, from the summary where it is up to date
+
+    The summary is only as fresh as its last refresh. Users with applications past the
+    watermark, and every user while there is no summary, are read from Jobby directly.
+
+    Args:
+        db (AsyncSession): MySQL session
+        pg_db (AsyncSession): PostgreSQL session
+        user_ids (List[int]): The user IDs to fetch jobs done for
+
+    Returns:
+        Dict[int, Dict[str, Any]]: Job statistics by user ID, users without jobs get a zero total
+    """
+    jobby_service = JobbyDBService(db)
+    watermark = await get_summary_watermark(pg_db)
+    if watermark is None:
+        return await jobby_service.get_candidates_jobs_done(user_ids)
+
+    stale = set(await jobby_service.get_users_with_applications_since(user_ids, watermark.last_id, watermark.last_updated_at))
+    jobs_done = await get_jobs_done_from_summary(pg_db, [user_id for user_id in user_ids if user_id not in stale])
+    if stale:
+        logging.info(f"Job summary is behind for {len(stale)} users, reading them from Jobby")
+        jobs_done.update(await jobby_service.get_candidates_jobs_done(list(stale)))
+    return jobs_done
+
+
+async def main(rebuild: bool) -> None:
+    from core.database import AsyncSessionLocal, AsyncPGSessionLocal
+
+    async with AsyncSessionLocal() as db, AsyncPGSessionLocal() as pg_db:
+        if rebuild:
+            count = await rebuild_job_summary(db, pg_db)
+        else:
+            count = await refresh_job_summary(db, pg_db)
+    logging.info(f"Job summary done, {count} users processed")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main('--rebuild' in sys.argv[1:]))
@@ -0,0 +1,145 @@
+"""Keeps the jobby_* columns of candidate_resumes in step with Jobby
+
+Each pass reads the users updated, or whose applications changed, since the last
+pass, recollects only their Jobby data and bulk-updates their resume rows. Resumes
+are not fetched or parsed again, so no S3 or LLM call is made.
+
+    python -m logic.jobby_sync          # one pass
+    python -m logic.jobby_sync --loop   # a pass every JOBBY_SYNC_INTERVAL seconds
+"""
+from typing import Dict, Any, List
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+import os
+import sys
+
+from models.sql import CandidateResume
+from services.jobby import JobbyDBService
+from .collect import collect_candidates_data, COLLECT_BATCH_SIZE
+from .job_summary import get_watermark, set_watermark, refresh_job_summary
+from .resume import build_jobby_fields, build_search_text, sanitize_data
+
+USERS_WATERMARK = "jobby_sync_users"
+APPLICATIONS_WATERMARK = "jobby_sync_applications"
+JOBBY_SYNC_INTERVAL_SECONDS = float(os.getenv('JOBBY_SYNC_INTERVAL', '300'))
+
+
+async def get_changed_users(db: AsyncSession, pg_db: AsyncSession) -> Dict[str, Any]:
+    """Users changed in Jobby since the last pass, and the watermarks to store after it"""
+    jobby_service = JobbyDBService(db)
+    users_watermark = await get_watermark(pg_db, USERS_WATERMARK)
+    applications_watermark = await get_watermark(pg_db, APPLICATIONS_WATERMARK)
+
+    # Read the targets first, anything changed while the pass runs is left for the next one
+    users_target = await jobby_service.get_users_watermark()
+    applications_target = await jobby_service.get_applications_watermark()
+
+    if users_watermark is None or applications_watermark is None:
+        # First pass, every user with a resume rather than every Jobby user
+        result = await pg_db.execute(select(CandidateResume.user_id).distinct())
+        user_ids = list(result.scalars())
+    else:
+        user_ids = await jobby_service.get_users_changed_since(users_watermark.last_updated_at, users_target["last_updated_at"])
+        user_ids += await jobby_service.get_users_with_changed_applications(
+            applications_watermark.last_id, applications_watermark.last_updated_at, applications_target["last_id"]
+        )
+    return {
+        "user_ids": list(dict.fromkeys(user_ids)),
+        "users_target": users_target,
+        "applications_target": applications_target,
+    }
+
+
+async def sync_users(pg_db: AsyncSession, user_ids: List[int]) -> int:
+    """Refresh the jobby_* columns of the resumes of some users
+
+    Args:
+        pg_db (AsyncSession): PostgreSQL session, committed once per batch
+        user_ids (List[int]): Jobby user IDs
+
+    Returns:
+        int: Number of resume rows updated
+    """
+    updated = 0
+    for i in range(0, len(user_ids), COLLECT_BATCH_SIZE):
+        batch = user_ids[i:i + COLLECT_BATCH_SIZE]
+        # Most Jobby users never uploaded a resume, only collect for those who did
+        result = await pg_db.execute(
+            select(CandidateResume.id, CandidateResume.user_id, CandidateResume.certifications)
+            .where(CandidateResume.user_id.in_(batch))
+        )
+        resumes = result.all()
+        if not resumes:
+            continue
+
+        collected = await collect_candidates_data(list({resume.user_id for resume in resumes}))
+        rows = []
+        for resume in resumes:
+            candidate_data = collected.get(resume.user_id)
+            if not candidate_data or not candidate_data.get('basic_info'):
+                continue
+            fields = sanitize_data(build_jobby_fields(candidate_data))
+            # certifications_text also covers the Jobby certifications
+            fields['certifications_text'] = build_search_text({
+                'certifications': resume.certifications,
+                'jobby_certifications': fields['jobby_certifications'],
+            })['certifications_text']
+            rows.append({'id': resume.id, **fields})
+
+        if rows:
+            # Bulk update by primary key, one executemany per batch
+            await pg_db.execute(update(CandidateResume), rows)
+        await pg_db.commit()
+        updated += len(rows)
+        logging.info(f"Jobby sync updated {len(rows)} resumes for {len(batch)} changed users")
+    return updated
+
+
+async def sync_jobby_data(db: AsyncSession, pg_db: AsyncSession) -> int:
+    """Run one sync pass
+
+    The watermarks are only stored once every changed user is written, so a failed
+    pass is replayed by the next one.
+
+    Returns:
+        int: Number of resume rows updated
+    """
+    # The collector reads jobs done from the summary, bring it up to date first
+    await refresh_job_summary(db, pg_db)
+
+    changes = await get_changed_users(db, pg_db)
+    logging.info(f"Jobby sync: {len(changes['user_ids'])} changed users")
+    updated = await sync_users(pg_db, changes["user_ids"])
+
+    users_target = changes["users_target"]
+    applications_target = changes["applications_target"]
+    await set_watermark(pg_db, USERS_WATERMARK, users_target["last_id"], users_target["last_updated_at"])
+    await set_watermark(pg_db, APPLICATIONS_WATERMARK, applications_target["last_id"], applications_target["last_updated_at"])
+    await pg_db.commit()
+    return updated
+
+
+async def main(loop: bool) -> None:
+    from core.database import AsyncSessionLocal, AsyncPGSessionLocal
+
+    while True:
+        try:
+            async with AsyncSessionLocal() as db, AsyncPGSessionLocal() as pg_db:
+                updated = await sync_jobby_data(db, pg_db)
+            logging.info(f"Jobby sync done, {updated} resumes updated")
+        except Exception as e:
+            if not loop:
+                raise
+            logging.error(f"Jobby sync failed: {str(e)}")
+        if not loop:
+            break
+        await asyncio.sleep(JOBBY_SYNC_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main('--loop' in sys.argv[1:]))
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from sqlalchemy import select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+import json
+import logging
+import os
+import random
+
+from models.sql import ResumeParseJob
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+DEFAULT_MAX_ATTEMPTS = int(os.getenv('RESUME_JOB_MAX_ATTEMPTS', '5'))
+BACKOFF_BASE_SECONDS = float(os.getenv('RESUME_JOB_BACKOFF_BASE', '30'))
+BACKOFF_MAX_SECONDS = float(os.getenv('RESUME_JOB_BACKOFF_MAX', '3600'))
+# A running job whose worker has not finished after this long is considered abandoned
+VISIBILITY_TIMEOUT_SECONDS = int(os.getenv('RESUME_JOB_VISIBILITY_TIMEOUT', '600'))
+
+
+async def enqueue_parse_job(pg_db: AsyncSession, candidate_id: int, blend: bool=False, max_attempts: Optional[int]=None) -> ResumeParseJob:
+    """Queue a resume parse for a candidate
+
+    Args:
+        pg_db (AsyncSession): PostgreSQL session
+        candidate_id (int): Jobby user ID of the candidate
+        blend (bool): Whether to blend the resume with the Jobby data
+        max_attempts (Optional[int]): Attempts before the job is dead-lettered
+
+    Returns:
+        ResumeParseJob: The queued job
+    """
+    job = ResumeParseJob(
+        candidate_id=candidate_id,
+        blend=blend,
+        status=QUEUED,
+        attempts=0,
+        max_attempts=max_attempts or DEFAULT_MAX_ATTEMPTS,
+        run_after=datetime.utcnow(),
+    )
+    pg_db.add(job)
+    await pg_db.commit()
+    await pg_db.refresh(job)
+    logging.info(f"Queued resume parse job {job.id} for candidate {candidate_id}")
+    return job
+
+
+async def get_job(pg_db: AsyncSession, job_id: int) -> Optional[ResumeParseJob]:
+    """Get a job by ID"""
+    result = await pg_db.execute(select(ResumeParseJob).where(ResumeParseJob.id == job_id))
+    return result.scalars().first()
+
+
+async def claim_next_job(pg_db: AsyncSession, worker_id: str) -> Optional[ResumeParseJob]:
+    """Claim the next runnable job for a worker
+
+    Uses ``FOR UPDATE SKIP LOCKED`` so concurrent workers never claim the same row.
+    Running jobs whose lock is older than the visibility timeout are reclaimed.
+
+    Args:
+        pg_db (AsyncSession): PostgreSQL session
+        worker_id (str): Identifier of the claiming worker
+
+    Returns:
+        Optional[ResumeParseJob]: The claimed job, or None if the queue is empty
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=VISIBILITY_TIMEOUT_SECONDS)
+    result = await pg_db.execute(
+        select(ResumeParseJob)
+        .where(or_(
+            and_(ResumeParseJob.status == QUEUED, ResumeParseJob.run_after <= now),
+            and_(ResumeParseJob.status == RUNNING, ResumeParseJob.locked_at < stale_before),
+        ))
+        .order_by(ResumeParseJob.run_after, ResumeParseJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalars().first()
+    if not job:
+        await pg_db.rollback()
+        return None
+
+    job.status = RUNNING
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.locked_at = now
+    await pg_db.commit()
+    await pg_db.refresh(job)
+    logging.info(f"Worker {worker_id} claimed job {job.id} (attempt {job.attempts}/{job.max_attempts})")
+    return job
+
+
+async def complete_job(pg_db: AsyncSession, job: ResumeParseJob, result: Dict[str, Any]) -> None:
+    """Mark a job as done and store its result"""
+    job.status = DONE
+    # Profiles carry dates, round-trip through json so the column only holds plain values
+    job.result = json.loads(json.dumps(result, default=str))
+    job.last_error = None
+    job.locked_by = None
+    job.locked_at = None
+    await pg_db.commit()
+    logging.info(f"Job {job.id} completed")
+
+
+async def fail_job(pg_db: AsyncSession, job: ResumeParseJob, error: str) -> None:
+    """Record a failed attempt, rescheduling with backoff or dead-lettering the job"""
+    # The pipeline may have rolled the session back, which expires the job
+    await pg_db.refresh(job)
+    job.last_error = error
+    job.locked_by = None
+    job.locked_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = DEAD
+        logging.error(f"Job {job.id} dead after {job.attempts} attempts: {error}")
+    else:
+        delay = min(BACKOFF_BASE_SECONDS * (2 ** (job.attempts - 1)), BACKOFF_MAX_SECONDS)
+        delay = delay * random.uniform(0.5, 1.0)
+        job.status = QUEUED
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        logging.warning(f"Job {job.id} failed (attempt {job.attempts}), retrying in {delay:.0f}s: {error}")
+    await pg_db.commit()
+
+
+def make_job_response(job: ResumeParseJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "candidate_id": job.candidate_id,
+        "blend": job.blend,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_after": job.run_after,
+        "last_error": job.last_error,
+        "result": job.result,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
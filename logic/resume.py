@@ -1,16 +1,29 @@
-from typing import Dict, Any
-from sqlalchemy.orm import Session
+from typing import Dict, Any, List
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import json
 import logging
+import os
 
 from services import ServiceManager, get_service_manager
 from models.sql import CandidateResume
 from .collect import collect_candidate_data
+from .singleflight import coalesce, claim_lock
+from .contents import content_sha256, get_resume_content, save_resume_content, compress_text, get_stored_resume_text
 from sqlalchemy.dialects.postgresql import insert
+from utils.structure import DataStructureService, RESUME_STRUCTURE_VERSION
+from utils.preprocess import preprocess_resume_text
 
+# "cache" parses from the local resume file cache, "memory" streams from S3 without touching disk
+RESUME_FETCH_MODE = os.getenv('RESUME_FETCH_MODE', 'cache').lower()
+# Give the LLM the previously stored structure when re-parsing a resume
+RESUME_REUSE_PREVIOUS_STRUCTURE = os.getenv('RESUME_REUSE_PREVIOUS_STRUCTURE', 'false').lower() in ('1', 'true', 'yes')
 
-def get_resume_path(service_manager: ServiceManager, candidate_id: int) -> Dict[str, Any]:
+
+async def get_resume_path(service_manager: ServiceManager, candidate_id: int) -> Dict[str, Any]:
     """Get resume path for a candidate"""
-    resume_info = service_manager.jobby.get_resume_paths_by_dom_data_id(candidate_id)
+    resume_info = await service_manager.jobby.get_resume_paths_by_dom_data_id(candidate_id)
     if not resume_info:
         logging.error(f"No resume path found for candidate {candidate_id}")
         return {"error": "Resume path not found for the candidate"}
@@ -21,9 +34,15 @@ def get_resume_path(service_manager: ServiceManager, candidate_id: int) -> Dict[
 
     return {"success": True, "resume_path": resume_path}
 
-def check_existing_resume(pg_db: Session, resume_path: str) -> Dict[str, Any]:
+async def check_existing_resume(pg_db: AsyncSession, resume_path: str) -> Dict[str, Any]:
     """Check if resume already exists in PostgreSQL"""
-    existing_resume = pg_db.query(CandidateResume).filter(CandidateResume.resume_path == resume_path).first()
+    # populate_existing, a row loaded earlier in the session may have been updated by another worker since
+    result = await pg_db.execute(
+        select(CandidateResume)
+        .where(CandidateResume.resume_path == resume_path)
+        .execution_options(populate_existing=True)
+    )
+    existing_resume = result.scalars().first()
     if existing_resume:
         logging.info(f"Resume already processed for path: {resume_path}")
         return make_candidate_profile_response(existing_resume)
@@ -56,7 +75,65 @@ def sanitize_data(data: Dict[str, Any]) -> Dict[str, Any]:
             sanitized[key] = value
     return sanitized
 
-async def store_resume_data(pg_db: Session, candidate_id, candidate_data, resume_path: str, result: Dict[str, Any], blended: bool=False) -> Dict[str, Any]:
+def _collect_text(value: Any) -> List[str]:
+    """Collect the string leaves of a JSON value in order"""
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, dict):
+        return [text for item in value.values() for text in _collect_text(item)]
+    if isinstance(value, list):
+        return [text for item in value for text in _collect_text(item)]
+    return []
+
+def build_search_text(data: Dict[str, Any]) -> Dict[str, str]:
+    """Build the denormalized text columns used by the trigram indexes
+
+    Args:
+        data (Dict[str, Any]): Resume row values
+
+    Returns:
+        Dict[str, str]: skills_text, languages_text, certifications_text, experience_text and tags_text
+    """
+    experience_text = []
+    for experience in data.get('experience') or []:
+        if isinstance(experience, dict):
+            experience_text.extend(_collect_text([experience.get(field) for field in ('title', 'company', 'description', 'location')]))
+        else:
+            experience_text.extend(_collect_text(experience))
+
+    return {
+        'skills_text': ' | '.join(_collect_text(data.get('skills')) + _collect_text(data.get('jobby_skills'))),
+        'languages_text': ' | '.join(_collect_text(data.get('languages'))),
+        'certifications_text': ' | '.join(_collect_text(data.get('certifications')) + _collect_text(data.get('jobby_certifications'))),
+        'experience_text': ' | '.join(experience_text),
+        'tags_text': ' | '.join(_collect_text(data.get('tags'))),
+    }
+
+def build_jobby_fields(candidate_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map collected Jobby data to the jobby_* columns it refreshes
+
+    Args:
+        candidate_data (Dict[str, Any]): Output of the collector
+
+    Returns:
+        Dict[str, Any]: Column values
+    """
+    basic_info = candidate_data.get('basic_info') or {}
+    return {
+        'jobby_name': (basic_info.get('first_name') or '') + ' ' + (basic_info.get('last_name') or ''),
+        'jobby_gender': basic_info.get('gender'),
+        'jobby_telephone': basic_info.get('telephone'),
+        'jobby_email': basic_info.get('email'),
+        'jobby_date_of_birth': basic_info.get('date_of_birth'),
+        'jobby_about': basic_info.get('about'),
+        'jobby_rating': basic_info.get('rating_as_worker'),
+        'jobby_premium': basic_info.get('premium'),
+        'jobby_jobs': candidate_data.get('jobs'),
+        'jobby_language': basic_info.get('language'),
+        'jobby_certifications': candidate_data.get('certifications') or [],
+    }
+
+async def store_resume_data(pg_db: AsyncSession, candidate_id, candidate_data, resume_path: str, result: Dict[str, Any], blended: bool=False) -> Dict[str, Any]:
     """Store resume data in PostgreSQL"""
     try:
         logging.info(f"Storing resume data for path: {resume_path}")
@@ -66,39 +143,39 @@ async def store_resume_data(pg_db: Session, candidate_id, candidate_data, resume
         # Prepare data for insert/update
         data = {
             'has_jobby_data': blended,
-            'jobby_name': candidate_data.get('basic_info', {}).get('first_name', '') + ' ' + candidate_data.get('basic_info', {}).get('last_name', ''),
-            'jobby_gender': candidate_data.get('basic_info', {}).get('gender'),
-            'jobby_telephone': candidate_data.get('basic_info', {}).get('telephone'),
-            'jobby_email': candidate_data.get('basic_info', {}).get('email'),
-            'jobby_date_of_birth': candidate_data.get('basic_info', {}).get('date_of_birth'),
-            'jobby_about': candidate_data.get('basic_info', {}).get('about'),
-            'jobby_rating': candidate_data.get('basic_info', {}).get('rating_as_worker'),
-            'jobby_premium': candidate_data.get('basic_info', {}).get('premium'),
-            'jobby_jobs': candidate_data.get('jobs'),
-            'jobby_language': candidate_data.get('basic_info', {}).get('language'),
-            'jobby_certifications': candidate_data.get('certifications') or [],
+            **build_jobby_fields(candidate_data),
             'jobby_education': candidate_data.get('education') or [],
             'jobby_skills' : candidate_data.get('jobby_skills') or [],
             'tags' : candidate_data.get('tags') or [],
             'resume_path': resume_path,
             'user_id': candidate_id,
+            'content_sha256': result.get('content_sha256'),
+            'resume_text': compress_text(result.get('extracted_text')),
             **result.get('data', {})
         }
 
+        data.update(build_search_text(data))
+
         # Sanitize data before storing
         sanitized_data = sanitize_data(data)
 
         stmt = insert(CandidateResume).values(**sanitized_data)
-        stmt = stmt.on_conflict_do_update(
-            index_elements=['resume_path'],
-            set_={col.name: stmt.excluded[col.name] for col in CandidateResume.__table__.columns if col.name != 'id'}
-        )
+        set_ = {col.name: stmt.excluded[col.name] for col in CandidateResume.__table__.columns if col.name not in ('id', 'search_document')}
+        # Re-parses from the stored text don't carry the file, keep what the row already has
+        for column in ('content_sha256', 'resume_text'):
+            set_[column] = func.coalesce(stmt.excluded[column], CandidateResume.__table__.c[column])
+        stmt = stmt.on_conflict_do_update(index_elements=['resume_path'], set_=set_)
 
-        pg_db.execute(stmt)
-        pg_db.commit()
+        await pg_db.execute(stmt)
+        await pg_db.commit()
 
-        # Get the inserted/updated record
-        updated_record = pg_db.query(CandidateResume).filter(CandidateResume.resume_path == sanitized_data['resume_path']).first()
+        # Get the inserted/updated record, overwriting any copy already loaded in this session
+        result = await pg_db.execute(
+            select(CandidateResume)
+            .where(CandidateResume.resume_path == sanitized_data['resume_path'])
+            .execution_options(populate_existing=True)
+        )
+        updated_record = result.scalars().first()
         return {"success": True, "data": make_candidate_profile_response(updated_record)}
 
     except Exception as e:
@@ -125,21 +202,90 @@ def make_candidate_profile_response(existing_resume) -> Dict[str, Any]:
     return {"exists": True, "blended": existing_resume.has_jobby_data, "resume_id": existing_resume.id, "data": resume_data}
 
 
-async def get_resume_result(service_manager: ServiceManager, resume_path:str, candidate_id: int, structured: bool=True) -> Dict[str, Any]:
-    # Get resume from S3
-    logging.info(f"Fetching resume from path: {resume_path}")
-    temp_resume_path = service_manager.s3.fetch_resume(resume_path)
-    if not temp_resume_path:
-        return None
-    # Process resume
+async def get_resume_result(service_manager: ServiceManager, resume_path:str, candidate_id: int, structured: bool=True, pg_db: AsyncSession=None) -> Dict[str, Any]:
+    """Fetch, extract and optionally structure a resume
+
+    Files are identified by their sha256. When ``pg_db`` is given, a file already seen
+    under another path or candidate reuses its stored extraction and, for unblended
+    parses, its structure if it was made with the current RESUME_STRUCTURE_VERSION,
+    skipping pdfminer and the LLM.
+
+    Returns:
+        Dict[str, Any]: A one element list with the structured result, or ``content``
+        when not structured. Both carry ``content_sha256`` and ``extracted_text``.
+        None if the file can't be fetched.
+    """
+    loop = asyncio.get_event_loop()
+    file_obj = None
+    if RESUME_FETCH_MODE == 'memory':
+        # The file never goes through the local cache directory
+        logging.info(f"Streaming resume from path: {resume_path}")
+        file_obj = await loop.run_in_executor(None, service_manager.s3.fetch_resume_stream, resume_path)
+        if file_obj is None:
+            return None
+        file = file_obj
+    else:
+        logging.info(f"Fetching resume from path: {resume_path}")
+        file = await loop.run_in_executor(None, service_manager.s3.fetch_resume, resume_path)
+        if not file:
+            return None
+
+    try:
+        sha256 = await loop.run_in_executor(None, content_sha256, file)
+        stored = await get_resume_content(pg_db, sha256) if pg_db is not None else None
+
+        if stored is not None and structured and stored.parsed_data and stored.structure_version == RESUME_STRUCTURE_VERSION:
+            logging.info(f"Reusing structured resume {sha256} for candidate {candidate_id}")
+            return [{"success": True, "message": "Resume processed successfully", "candidate_id": candidate_id,
+                     "data": stored.parsed_data, "content_sha256": sha256, "extracted_text": stored.extracted_text}]
+
+        if stored is not None and stored.extracted_text is not None:
+            logging.info(f"Reusing extracted text of resume {sha256}")
+            content = stored.extracted_text
+        else:
+            if file_obj is not None:
+                content = await service_manager.resume_parser.extract_file_obj(file_obj, resume_path)
+            else:
+                content = await service_manager.resume_parser.extract(file)
+            if pg_db is not None:
+                await save_resume_content(pg_db, sha256, extracted_text=content)
+    finally:
+        if file_obj is not None:
+            file_obj.close()
+        else:
+            service_manager.s3.release_resume(file)
+
+    if not structured:
+        return [{"content": content, "content_sha256": sha256, "extracted_text": content}]
+    parsed_result = await service_manager.resume_parser.process_resume_content(content, candidate_id)
+    if parsed_result.get("success") and pg_db is not None:
+        await save_resume_content(pg_db, sha256, parsed_data=parsed_result["data"], structure_version=RESUME_STRUCTURE_VERSION)
+    parsed_result["content_sha256"] = sha256
+    parsed_result["extracted_text"] = content
+    return [parsed_result]
+
+
+async def get_resume_result_from_text(service_manager: ServiceManager, content: str, candidate_id: int, structured: bool=True,
+                                      sha256: str=None, pg_db: AsyncSession=None) -> Dict[str, Any]:
+    """Same as get_resume_result, for text extracted by an earlier parse
 
+    When ``sha256`` and ``pg_db`` are given the new structure replaces the one stored
+    for the file, so forced re-parses refresh what other paths and candidates reuse.
+    """
     if not structured:
-       content = service_manager.resume_parser.parse_file(temp_resume_path)
-       return [{"content": content}]
-    parsed_result = await service_manager.resume_parser.process_resume(temp_resume_path, candidate_id)
+        return [{"content": content}]
+    parsed_result = await service_manager.resume_parser.process_resume_content(content, candidate_id)
+    if parsed_result.get("success") and sha256 and pg_db is not None:
+        await save_resume_content(pg_db, sha256, parsed_data=parsed_result["data"], structure_version=RESUME_STRUCTURE_VERSION)
     return [parsed_result]
 
 
+def with_previous_structure(content: str, previous: Dict[str, Any]) -> str:
+    """Append the previously stored structure to the LLM input as a starting point"""
+    resume_fields = {key: value for key, value in previous.items() if not key.startswith('jobby_') and key != 'blended'}
+    return f"{content}\nPrevious Structured Data: \n{json.dumps(resume_fields, default=str)}"
+
+
 def blend_data(resume_data: Dict[str, Any], candidate_data: Dict[str, Any]):
     """Blend resume data with candidate data"""
     jobby_certifications=candidate_data.get('certifications'),
@@ -150,4 +296,99 @@ def blend_data(resume_data: Dict[str, Any], candidate_data: Dict[str, Any]):
     data_to_send = f"Jobby Data: \nAbout {jobby_about} \n Certifications {jobby_certifications} \n Language {jobby_language}"
     resume_content = f"Resume Data: \n{resume_data.get('content', '')}"
 
-    return data_to_send + resume_content
\ No newline at end of file
+    return data_to_send + resume_content
+
+
+async def parse_candidate_resume(service_manager: ServiceManager, pg_db: AsyncSession, candidate_id: int, blend: bool=False, force: bool=False) -> Dict[str, Any]:
+    """Run the full parse pipeline for a single candidate
+
+    Resolves the resume path, short-circuits on an already stored resume with the
+    same blend mode, otherwise fetches and structures the resume alongside the
+    Jobby data and upserts the result. Re-parses of a stored resume start from its
+    stored text and skip S3 and extraction.
+
+    Concurrent parses of the same resume and blend mode are coalesced: within the
+    process followers await the leader's result, across processes they wait on a
+    claim row and then find the leader's stored row. Forced and regular parses are
+    coalesced separately, a forced parse never gets a non-forced result.
+
+    Args:
+        service_manager (ServiceManager): Service manager used for Jobby and S3 access
+        pg_db (AsyncSession): PostgreSQL session used to read and store the resume
+        candidate_id (int): Jobby user ID of the candidate
+        blend (bool): Whether to blend the resume with the Jobby data
+        force (bool): Re-structure a stored resume even if its blend mode matches, e.g. after a prompt change
+
+    Returns:
+        Dict[str, Any]: Stored candidate profile or an error payload
+    """
+    try:
+        path_result = await get_resume_path(service_manager, candidate_id)
+        if "error" in path_result:
+            return path_result
+        resume_path = path_result["resume_path"]
+
+        # Check if resume exists
+        existing_result = await check_existing_resume(pg_db, resume_path)
+        if existing_result["exists"] and existing_result["blended"] == blend and not force:
+            return existing_result
+
+        return await coalesce(
+            (resume_path, blend, force),
+            lambda: _parse_resume_locked(service_manager, pg_db, candidate_id, resume_path, blend, force),
+        )
+
+    except Exception as e:
+        if pg_db and hasattr(pg_db, 'is_active') and pg_db.is_active:
+            await pg_db.rollback()
+        logging.error(f"Error processing resume for candidate {candidate_id}: {str(e)}")
+        return {"success": False, "error": f"Failed to process resume: {str(e)}"}
+
+
+async def _parse_resume_locked(service_manager: ServiceManager, pg_db: AsyncSession, candidate_id: int, resume_path: str, blend: bool, force: bool) -> Dict[str, Any]:
+    # Don't sit idle in a transaction while waiting for the lock
+    await pg_db.commit()
+    async with claim_lock(f"parse_resume:{resume_path}:{blend}"):
+        existing_result = await check_existing_resume(pg_db, resume_path)
+        if existing_result["exists"] and existing_result["blended"] == blend and not force:
+            # Another worker parsed it while we waited
+            return existing_result
+        return await _parse_resume(service_manager, pg_db, candidate_id, resume_path, blend, existing_result)
+
+
+async def _parse_resume(service_manager: ServiceManager, pg_db: AsyncSession, candidate_id: int, resume_path: str, blend: bool, existing_result: Dict[str, Any]) -> Dict[str, Any]:
+    stored_text, sha256 = await get_stored_resume_text(pg_db, resume_path) if existing_result["exists"] else (None, None)
+    previous = existing_result["data"]["data"] if existing_result["exists"] and RESUME_REUSE_PREVIOUS_STRUCTURE else None
+
+    # Process resume and collect candidate data concurrently
+    if stored_text is not None:
+        logging.info(f"Re-parsing stored resume text for path: {resume_path}")
+        if previous and not blend:
+            stored_text = with_previous_structure(stored_text, previous)
+        resume_task = get_resume_result_from_text(service_manager, stored_text, candidate_id, structured=not blend,
+                                                  sha256=sha256, pg_db=pg_db)
+    else:
+        resume_task = get_resume_result(service_manager, resume_path, candidate_id, structured=not blend, pg_db=pg_db)
+    tasks = [
+        resume_task,
+        collect_candidate_data(service_manager, candidate_id)
+    ]
+    resume_result, candidate_data = await asyncio.gather(*tasks)
+
+    if not resume_result:
+        return {"error": "Failed to process resume"}
+    data_to_store = resume_result[0]
+    if blend:
+        structureService = DataStructureService()
+        resume_content = await asyncio.get_event_loop().run_in_executor(None, preprocess_resume_text, data_to_store.get('content', ''))
+        content = blend_data({**data_to_store, 'content': resume_content}, candidate_data)
+        if previous:
+            content = with_previous_structure(content, previous)
+        structured_data = await structureService.struture_resume_with_blended_jobby_data(content)
+        store_result = await store_resume_data(pg_db, candidate_id, candidate_data, resume_path,
+                                               {"data" : structured_data["parsed_data"], "content_sha256": data_to_store.get("content_sha256"),
+                                                "extracted_text": data_to_store.get("extracted_text")}, blended=blend)
+        return store_result["data"]
+    # Store resume data
+    store_result = await store_resume_data(pg_db, candidate_id, candidate_data, resume_path, resume_result[0], blended=blend)
+    return store_result["data"]
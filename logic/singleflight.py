@@ -0,0 +1,134 @@
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from sqlalchemy import text
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+
+from core.database import AsyncPGSessionLocal
+
+# Longest a worker waits for another process's parse of the same resume before doing it itself
+PARSE_LOCK_TIMEOUT_SECONDS = int(os.getenv('PARSE_LOCK_TIMEOUT', '300'))
+# A claim not extended for this long is considered abandoned by a crashed worker
+PARSE_CLAIM_TTL_SECONDS = int(os.getenv('PARSE_CLAIM_TTL', '60'))
+# Seconds between two attempts to take a claim held by another process
+PARSE_CLAIM_POLL_SECONDS = float(os.getenv('PARSE_CLAIM_POLL_INTERVAL', '1'))
+
+_inflight: Dict[Hashable, asyncio.Future] = {}
+
+
+async def coalesce(key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """Run ``fn`` once per key at a time within the process
+
+    The first caller for a key runs ``fn``; callers arriving while it runs await the
+    same result, or the same exception, instead of repeating the work.
+    """
+    while key in _inflight:
+        future = _inflight[key]
+        logging.info(f"Joining in-flight work for {key}")
+        try:
+            # shield, so a follower's cancellation (e.g. client disconnect) doesn't cancel the leader
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            # The leader was cancelled, the next caller in line takes over
+
+    future = asyncio.get_event_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await fn()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        # Mark the exception retrieved when nobody joined
+        future.exception()
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _inflight.pop(key, None)
+
+
+# Claim statements, each a single short transaction on the parse_claims row. Expiry uses
+# the database clock, so hosts with skewed clocks agree on it.
+_CLAIM_SQL = text("""
+    INSERT INTO parse_claims (name, owner, expires_at)
+    VALUES (:name, :owner, now() AT TIME ZONE 'utc' + make_interval(secs => :ttl))
+    ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+    WHERE parse_claims.expires_at < now() AT TIME ZONE 'utc'
+    RETURNING owner
+""")
+_EXTEND_SQL = text("""
+    UPDATE parse_claims SET expires_at = now() AT TIME ZONE 'utc' + make_interval(secs => :ttl)
+    WHERE name = :name AND owner = :owner
+""")
+_RELEASE_SQL = text("DELETE FROM parse_claims WHERE name = :name AND owner = :owner")
+
+
+async def _execute(statement, params: Dict[str, Any]) -> Any:
+    """Run one claim statement on a pooled connection that is returned right after"""
+    async with AsyncPGSessionLocal() as session:
+        result = await session.execute(statement, params)
+        row = result.first() if result.returns_rows else None
+        await session.commit()
+        return row
+
+
+async def _heartbeat(name: str, owner: str) -> None:
+    """Keep extending a held claim, so only a dead holder's claim expires"""
+    while True:
+        await asyncio.sleep(PARSE_CLAIM_TTL_SECONDS / 3)
+        try:
+            await _execute(_EXTEND_SQL, {"name": name, "owner": owner, "ttl": PARSE_CLAIM_TTL_SECONDS})
+        except Exception as e:
+            logging.warning(f"Failed to extend the claim on {name}: {str(e)}")
+
+
+@asynccontextmanager
+async def claim_lock(name: str, timeout: int = PARSE_LOCK_TIMEOUT_SECONDS):
+    """Hold a claim row on ``name`` for the block, serializing the work across processes
+
+    The claim is a row in ``parse_claims`` taken with a conditional upsert, and waiters
+    poll it. No connection is held while waiting or while the block runs, so slow
+    blocks such as LLM calls don't tie up the pool. The holder extends the claim
+    every third of PARSE_CLAIM_TTL_SECONDS; a crashed holder's claim expires and is taken over.
+    If the claim can't be taken in time, or Postgres is unreachable, the block runs
+    without it: duplicate work is preferable to a failed parse.
+
+    Yields:
+        bool: Whether the claim was taken
+    """
+    owner = uuid.uuid4().hex
+    params = {"name": name, "owner": owner, "ttl": PARSE_CLAIM_TTL_SECONDS}
+    deadline = time.monotonic() + timeout
+    acquired = False
+    try:
+        while True:
+            if await _execute(_CLAIM_SQL, params) is not None:
+                acquired = True
+                break
+            if time.monotonic() >= deadline:
+                logging.warning(f"Running {name} without the claim, still held after {timeout}s")
+                break
+            await asyncio.sleep(min(PARSE_CLAIM_POLL_SECONDS, max(deadline - time.monotonic(), 0)) + random.uniform(0, 0.1))
+    except Exception as e:
+        logging.warning(f"Running {name} without the claim: {str(e)}")
+
+    heartbeat = asyncio.ensure_future(_heartbeat(name, owner)) if acquired else None
+    try:
+        yield acquired
+    finally:
+        if heartbeat is not None:
+            heartbeat.cancel()
+            try:
+                await _execute(_RELEASE_SQL, params)
+            except Exception as e:
+                # It expires on its own
+                logging.warning(f"Failed to release the claim on {name}: {str(e)}")
@@ -43,23 +43,35 @@ class Experience(BaseModel):
             }
         }
 
-class ResumeData(BaseModel):
+# Sections of ResumeData, long resumes are structured section by section with them
+
+class ProfileSection(BaseModel):
     name: str = Field(..., description="Nome completo del candidato")
     email: Optional[str] = Field(None, description="Indirizzo email professionale")
     phone: Optional[str] = Field(None, description="Numero di telefono")
     location: Optional[str] = Field(None, description="Località attuale (Città, Regione, Paese)")
     gender: Optional[Literal["M", "F", "0"]] = Field(None, description="Genere (M: Maschio, F: Femmina, 0: Altro)")
     about: Optional[str] = Field(None, description="Background personale e professionale dettagliato del candidato")
-    skills: List[str] = Field(default_factory=list, description="Competenze tecniche e trasversali")
-    projects: List[str] = Field(default_factory=list, description="Progetti significativi completati")
-    achievements: List[str] = Field(default_factory=list, description="Risultati personali, professionali e accademici")
-    publications: List[str] = Field(default_factory=list, description="Pubblicazioni e articoli di ricerca")
+    tags: List[str] = Field(default_factory=list, description="10 tag per descrivere il candidato che verranno utilizzati per la ricerca")
+
+class ExperienceSection(BaseModel):
     experience: List[Experience] = Field(default_factory=list, description="Esperienza professionale e lavorativa")
+
+class EducationSection(BaseModel):
     education: List[Education] = Field(default_factory=list, description="Background formativo")
+
+class SkillsSection(BaseModel):
+    skills: List[str] = Field(default_factory=list, description="Competenze tecniche e trasversali")
     languages: List[str] = Field(default_factory=list, description="Lingue conosciute con livello di competenza")
     certifications: List[str] = Field(default_factory=list, description="Certificazioni e licenze")
-    tags: List[str] = Field(default_factory=List, description="10 tag per descrivere il candidato che verranno utilizzati per la ricerca")
 
+class ExtrasSection(BaseModel):
+    projects: List[str] = Field(default_factory=list, description="Progetti significativi completati")
+    achievements: List[str] = Field(default_factory=list, description="Risultati personali, professionali e accademici")
+    publications: List[str] = Field(default_factory=list, description="Pubblicazioni e articoli di ricerca")
+
+# The whole resume is the union of its sections, bases are listed in reverse so the profile fields come first
+class ResumeData(EducationSection, ExperienceSection, ExtrasSection, SkillsSection, ProfileSection):
     class Config:
         json_schema_extra = {
             "example": {
@@ -109,4 +121,4 @@ class ResumeData(BaseModel):
                     "multilingue"
                 ]
             }
-        }
\ No newline at end of file
+        }
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Date, Float, Boolean, Text, BigInteger
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Date, Float, Boolean, Text, BigInteger, Index, LargeBinary, DDL, event
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
 from datetime import datetime
 from core.database import Base, PGBase
 
@@ -28,12 +30,42 @@ class User(Base):
     parent_id = Column(BigInteger)
     rating = Column(Float(4, 2))
 
+# Weighted Italian + English full-text document: names and skills/tags rank above
+# experience/certifications, which rank above the free-form about texts
+SEARCH_DOCUMENT_SQL = (
+    "setweight(to_tsvector('simple', coalesce(NEW.name, '') || ' ' || coalesce(NEW.jobby_name, '')), 'A') || "
+    "setweight(to_tsvector('italian', coalesce(NEW.skills_text, '') || ' ' || coalesce(NEW.tags_text, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(NEW.skills_text, '') || ' ' || coalesce(NEW.tags_text, '')), 'A') || "
+    "setweight(to_tsvector('italian', coalesce(NEW.experience_text, '') || ' ' || coalesce(NEW.certifications_text, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(NEW.experience_text, '') || ' ' || coalesce(NEW.certifications_text, '')), 'B') || "
+    "setweight(to_tsvector('italian', coalesce(NEW.about, '') || ' ' || coalesce(NEW.jobby_about, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(NEW.about, '') || ' ' || coalesce(NEW.jobby_about, '')), 'C')"
+)
+
 class CandidateResume(PGBase):
     __tablename__ = 'candidate_resumes'
+    __table_args__ = (
+        # GIN indexes serving the @> containment the text-to-SQL prompt uses on tags and jobby_jobs
+        Index('ix_candidate_resumes_tags_gin', 'tags', postgresql_using='gin', postgresql_ops={'tags': 'jsonb_path_ops'}),
+        Index('ix_candidate_resumes_jobby_jobs_gin', 'jobby_jobs', postgresql_using='gin', postgresql_ops={'jobby_jobs': 'jsonb_path_ops'}),
+        # GIN trigram indexes serving ILIKE '%term%' (requires the pg_trgm extension)
+        Index('ix_candidate_resumes_location_trgm', 'location', postgresql_using='gin', postgresql_ops={'location': 'gin_trgm_ops'}),
+        Index('ix_candidate_resumes_about_trgm', 'about', postgresql_using='gin', postgresql_ops={'about': 'gin_trgm_ops'}),
+        Index('ix_candidate_resumes_jobby_about_trgm', 'jobby_about', postgresql_using='gin', postgresql_ops={'jobby_about': 'gin_trgm_ops'}),
+        Index('ix_candidate_resumes_skills_text_trgm', 'skills_text', postgresql_using='gin', postgresql_ops={'skills_text': 'gin_trgm_ops'}),
+        Index('ix_candidate_resumes_languages_text_trgm', 'languages_text', postgresql_using='gin', postgresql_ops={'languages_text': 'gin_trgm_ops'}),
+        Index('ix_candidate_resumes_certifications_text_trgm', 'certifications_text', postgresql_using='gin', postgresql_ops={'certifications_text': 'gin_trgm_ops'}),
+        Index('ix_candidate_resumes_experience_text_trgm', 'experience_text', postgresql_using='gin', postgresql_ops={'experience_text': 'gin_trgm_ops'}),
+        Index('ix_candidate_resumes_tags_text_trgm', 'tags_text', postgresql_using='gin', postgresql_ops={'tags_text': 'gin_trgm_ops'}),
+        # Full-text index for ranked search
+        Index('ix_candidate_resumes_search_document', 'search_document', postgresql_using='gin'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(BigInteger, nullable=False, index=True)  # Reference to User.id in MySQL
     resume_path = Column(String(255), unique=True, index=True)
+    # sha256 of the resume file, links the row to its extraction in resume_contents
+    content_sha256 = Column(String(64), index=True)
 
     #data from jobby for faster search
     has_jobby_data = Column(Boolean, default=False)
@@ -45,14 +77,14 @@ class CandidateResume(PGBase):
     jobby_location = Column(String(255),default="")  # GPS or preferred cities
     jobby_availability = Column(String(255))  # e.g., "Monday Morning, Tuesday Evening"
     jobby_about = Column(Text,default="")  # Professional about/objective
-    jobby_skills = Column(JSON,default=[] )  # List of skills
+    jobby_skills = Column(JSONB,default=[] )  # List of skills
     jobby_language = Column(String(45),default=[])  # List of languages
-    jobby_certifications = Column(JSON,default=[])  # List of certifications
-    jobby_education = Column(JSON,default=[])  # List of education records with institution, degree, dates, etc.
-    jobby_jobs = Column(JSON,default={})  # List of jobs with company, title, dates, etc.
+    jobby_certifications = Column(JSONB,default=[])  # List of certifications
+    jobby_education = Column(JSONB,default=[])  # List of education records with institution, degree, dates, etc.
+    jobby_jobs = Column(JSONB,default={})  # List of jobs with company, title, dates, etc.
     jobby_rating = Column(Float(4, 2))
     jobby_premium = Column(Boolean, default=False)
-    jobby_reviews = Column(JSON,default=[])
+    jobby_reviews = Column(JSONB,default=[])
 
     # data from resume
     name = Column(String(255))
@@ -64,21 +96,133 @@ class CandidateResume(PGBase):
     about = Column(Text,default="")  # Professional about/objective
 
     # Skills and Languages
-    skills = Column(JSON,default=[])  # List of skills
-    languages = Column(JSON,default=[])  # List of languages
-    certifications = Column(JSON,default=[])  # List of certifications
+    skills = Column(JSONB,default=[])  # List of skills
+    languages = Column(JSONB,default=[])  # List of languages
+    certifications = Column(JSONB,default=[])  # List of certifications
 
     # Education and Experience
-    education = Column(JSON,default=[])  # List of education records with institution, degree, dates, etc.
-    experience = Column(JSON,default=[])  # List of work experiences with company, title, dates, etc.
-    projects = Column(JSON,default=[])  # Projects worked on
+    education = Column(JSONB,default=[])  # List of education records with institution, degree, dates, etc.
+    experience = Column(JSONB,default=[])  # List of work experiences with company, title, dates, etc.
+    projects = Column(JSONB,default=[])  # Projects worked on
 
     # Additional Professional Information
-    achievements = Column(JSON, default=[])  # List of professional achievements
-    publications = Column(JSON, default=[])  # List of publications if any
-    volunteer_work = Column(JSON, default=[])  # Volunteer experience
-    professional_links = Column(JSON, default=[])  # LinkedIn, portfolio, etc.
-    tags = Column(JSON,default=[])
+    achievements = Column(JSONB, default=[])  # List of professional achievements
+    publications = Column(JSONB, default=[])  # List of publications if any
+    volunteer_work = Column(JSONB, default=[])  # Volunteer experience
+    professional_links = Column(JSONB, default=[])  # LinkedIn, portfolio, etc.
+    tags = Column(JSONB,default=[])
+
+    # Denormalized text of the array fields for trigram search, kept in sync by store_resume_data
+    skills_text = Column(Text,default="")
+    languages_text = Column(Text,default="")
+    certifications_text = Column(Text,default="")
+    experience_text = Column(Text,default="")
+    tags_text = Column(Text,default="")
+
+    # Filled by the candidate_resumes_search_document trigger from the columns above, never
+    # written by the application and deferred so ORM loads don't ship it back
+    search_document = deferred(Column(TSVECTOR))
+
+    # zlib compressed text extracted from the resume file, lets re-parses skip S3 and extraction
+    resume_text = deferred(Column(LargeBinary))
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# create_all gets the same trigger the f20c8b5d3e91 migration installs
+event.listen(CandidateResume.__table__, 'after_create', DDL(
+    "CREATE FUNCTION candidate_resumes_search_document() RETURNS trigger AS $$ BEGIN "
+    f"NEW.search_document := {SEARCH_DOCUMENT_SQL}; RETURN NEW; END; $$ LANGUAGE plpgsql"
+))
+event.listen(CandidateResume.__table__, 'after_create', DDL(
+    "CREATE TRIGGER candidate_resumes_search_document BEFORE INSERT OR UPDATE ON candidate_resumes "
+    "FOR EACH ROW EXECUTE FUNCTION candidate_resumes_search_document()"
+))
+
+class ResumeContent(PGBase):
+    __tablename__ = 'resume_contents'
+
+    # Extraction and unblended structure of a resume file, shared by every path and candidate with the same bytes
+    content_sha256 = Column(String(64), primary_key=True)
+    extracted_text = Column(Text)
+    parsed_data = Column(JSONB)
+    # RESUME_STRUCTURE_VERSION parsed_data was produced with, it is only reused while this matches
+    structure_version = Column(String(100))
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ResumeParseJob(PGBase):
+    __tablename__ = 'resume_parse_jobs'
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    candidate_id = Column(BigInteger, nullable=False, index=True)  # Reference to User.id in MySQL
+    blend = Column(Boolean, nullable=False, default=False)
+
+    # queued -> running -> done, or back to queued on retry, dead once attempts are exhausted
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    locked_by = Column(String(255))
+    locked_at = Column(DateTime)
+    last_error = Column(Text)
+    result = Column(JSON)
 
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SQLTranslation(PGBase):
+    __tablename__ = 'sql_translation_cache'
+
+    # sha256 of the normalized query and the prompt/schema fingerprint
+    cache_key = Column(String(64), primary_key=True)
+    normalized_query = Column(Text, nullable=False)
+    sql = Column(Text, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    last_hit_at = Column(DateTime)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class LLMRateBudget(PGBase):
+    __tablename__ = 'llm_rate_budgets'
+
+    # Token buckets shared by every process calling the model, refilled continuously at limit/minute
+    model = Column(String(100), primary_key=True)
+    tokens_limit = Column(Integer, nullable=False)
+    requests_limit = Column(Integer, nullable=False)
+    tokens_available = Column(Float, nullable=False)
+    requests_available = Column(Float, nullable=False)
+    refilled_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class JobbyJobSummary(PGBase):
+    __tablename__ = 'jobby_job_summary'
+
+    # Completed Jobby jobs, one row per user and job, maintained by logic.job_summary
+    user_id = Column(BigInteger, primary_key=True)  # Reference to User.id in MySQL
+    job_id = Column(BigInteger, primary_key=True)  # Reference to jobs.id in MySQL
+    title = Column(Text)
+    categories = Column(JSONB, default=[])  # Every translation label of the job's macro category
+    application_count = Column(Integer, nullable=False, default=0)  # The user's completed applications to the job
+    jobstart_at = Column(DateTime)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ParseClaim(PGBase):
+    __tablename__ = 'parse_claims'
+
+    # Cross-process claim on a unit of work, taken over by another process once it expires
+    name = Column(String(255), primary_key=True)
+    owner = Column(String(64), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class SyncWatermark(PGBase):
+    __tablename__ = 'sync_watermarks'
+
+    # How far a MySQL -> Postgres sync has read, one row per sync
+    name = Column(String(100), primary_key=True)
+    last_id = Column(BigInteger, nullable=False, default=0)
+    last_updated_at = Column(DateTime)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,25 +1,73 @@
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from utils.structure import DataStructureService
 from utils.text_to_sql import TextToSQLConverter
-from openai import OpenAI
 from models.evaluator import CandidateEvaluation
 from models.evaluator_it import CandidateEvaluation as CandidateEvalIt
 import os
+import time
+import asyncio
 from sqlalchemy import text
+from core.database import AsyncPGSessionLocal
+from models.sql import CandidateResume
+from utils.prescreen import PreScreener, PRESCREEN_TOP_N
+from utils.pagination import encode_cursor, decode_cursor
 from utils.system_prompts import english as system_english, italian as system_it
 import logging
 
+# Default seconds to wait for the text-to-SQL branch before falling back to filter results
+SEARCH_LLM_DEADLINE = float(os.getenv('SEARCH_LLM_DEADLINE')) if os.getenv('SEARCH_LLM_DEADLINE') else None
+
+# Every column but the search_document tsvector, which is only useful inside Postgres
+CANDIDATE_COLUMNS = [column.name for column in CandidateResume.__table__.columns if column.name not in ('search_document', 'resume_text')]
+
+
 class CandidateEvaluator:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.text_to_sql = TextToSQLConverter(db)
         self.table_names = ['candidate_resumes']
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         self.structure = DataStructureService()
+        self.prescreener = PreScreener()
 
-    def get_candidates(self, candidate_ids: List):
-        all_candidates = self.db.execute(text(f"SELECT * FROM candidate_resumes WHERE user_id IN ({','.join([str(id) for id in candidate_ids])})"))
+    def resolve_fields(self, fields: Optional[List[str]] = None) -> str:
+        """Validate a column projection and render it as a SELECT list
+
+        ``id`` and ``user_id`` are always included since pagination and callers key on them.
+        """
+        if not fields:
+            return ', '.join(CANDIDATE_COLUMNS)
+        unknown = [field for field in fields if field not in CANDIDATE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown candidate fields: {', '.join(unknown)}")
+        return ', '.join(dict.fromkeys(['id', 'user_id', *fields]))
+
+    async def get_candidates(self, candidate_ids: List,
+                             fields: Optional[List[str]] = None,
+                             after: Optional[Dict[str, Any]] = None,
+                             limit: Optional[int] = None):
+        """Fetch candidate rows for a list of user IDs
+
+        Args:
+            candidate_ids (List): User IDs to fetch, bound as a single array parameter
+            fields (Optional[List[str]]): Columns to return, all of them by default
+            after (Optional[Dict[str, Any]]): Decoded cursor, rows sort after ``(user_id, id)``
+            limit (Optional[int]): Maximum number of rows
+
+        Returns:
+            List[Dict]: Candidate rows ordered by ``(user_id, id)``
+        """
+        query = f"SELECT {self.resolve_fields(fields)} FROM candidate_resumes WHERE user_id = ANY(:candidate_ids)"
+        params = {'candidate_ids': [int(candidate_id) for candidate_id in candidate_ids]}
+        if after:
+            query += " AND (user_id, id) > (:after_user_id, :after_id)"
+            params.update({'after_user_id': after['u'], 'after_id': after['i']})
+        query += " ORDER BY user_id, id"
+        if limit:
+            query += " LIMIT :limit"
+            params['limit'] = limit
+
+        all_candidates = await self.db.execute(text(query), params)
 
         # Format the data
         rows = all_candidates.fetchall()
@@ -30,17 +78,83 @@ class CandidateEvaluator:
         columns = all_candidates.keys()
         candidates_data = [dict(zip(columns, row)) for row in rows]
         return candidates_data
+
     async def search_candidates(self, search_query: str, 
                                location: Optional[List[str]] = None,
                                experience_level: Optional[List[str]] = None,
                                soft_skills: Optional[List[str]] = None,
                                hard_skills: Optional[List[str]] = None,
                                languages: Optional[List[str]] = None,
-                               certifications: Optional[List[str]] = None) -> Dict[str, Any]:
-        """Search and evaluate candidates based on the search query with optimized performance and filters"""
+                               certifications: Optional[List[str]] = None,
+                               llm_deadline: Optional[float] = None,
+                               mode: str = 'llm',
+                               page_size: int = 50,
+                               cursor: Optional[str] = None,
+                               fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Search and evaluate candidates based on the search query with optimized performance and filters
+
+        The text-to-SQL branch and the structured filters run concurrently. When
+        ``llm_deadline`` (seconds, defaults to SEARCH_LLM_DEADLINE) passes before the
+        LLM branch finishes, it is cancelled and the filter results are returned alone.
+
+        With ``mode='ranked'`` the LLM is skipped and a page of full-text matches ordered
+        by relevance is returned instead, see ``ranked_search``.
+
+        Results are paged with an opaque keyset ``cursor`` (``next_cursor`` of the previous
+        page) and can be restricted to a list of ``fields``. Repeating the query for the
+        next page hits the SQL translation cache, so the LLM runs once per search.
+        """
+        if mode == 'ranked':
+            return await self.ranked_search(
+                search_query,
+                location=location,
+                experience_level=experience_level,
+                soft_skills=soft_skills,
+                hard_skills=hard_skills,
+                languages=languages,
+                certifications=certifications,
+                page_size=page_size,
+                cursor=cursor,
+                fields=fields
+            )
+        if llm_deadline is None:
+            llm_deadline = SEARCH_LLM_DEADLINE
+        timings = {}
+
+        async def timed(name: str, coro):
+            started_at = time.perf_counter()
+            try:
+                return await coro
+            finally:
+                timings[f"{name}_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+
+        async def run_text_to_sql():
+            # Both branches run at once and an AsyncSession can't be shared, so the LLM branch gets its own
+            async with AsyncPGSessionLocal() as session:
+                return await TextToSQLConverter(session).execute_query(search_query, self.table_names)
+
+        started = time.perf_counter()
+        llm_task = asyncio.ensure_future(timed('text_to_sql', run_text_to_sql()))
         try:
+            # Apply direct database filters
+            filtered_candidate_ids = await timed('filters', self.apply_filters(
+                location=location,
+                experience_level=experience_level,
+                soft_skills=soft_skills,
+                hard_skills=hard_skills,
+                languages=languages,
+                certifications=certifications
+            ))
+
             # Convert natural language query to SQL
-            sql_result = self.text_to_sql.execute_query(search_query, self.table_names)
+            llm_timed_out = False
+            try:
+                remaining = None if llm_deadline is None else max(llm_deadline - (time.perf_counter() - started), 0)
+                sql_result = await asyncio.wait_for(llm_task, remaining)
+            except asyncio.TimeoutError:
+                logging.warning(f"Text to SQL exceeded the {llm_deadline}s deadline, returning filter results only")
+                llm_timed_out = True
+                sql_result = {'error': 'LLM deadline exceeded'}
 
             llm_results = []
             if 'error' not in sql_result:
@@ -51,16 +165,6 @@ class CandidateEvaluator:
             else:
                 llm_candidate_ids = [candidate['user_id'] for candidate in llm_results]
             
-            # Apply direct database filters
-            filtered_candidate_ids = self.apply_filters(
-                location=location,
-                experience_level=experience_level,
-                soft_skills=soft_skills,
-                hard_skills=hard_skills,
-                languages=languages,
-                certifications=certifications
-            )
-            
             # Merge results from LLM query and direct filters
             if llm_candidate_ids and filtered_candidate_ids:
                 # Intersection of both result sets if both have results
@@ -73,24 +177,115 @@ class CandidateEvaluator:
                 final_candidate_ids = llm_candidate_ids
             
             if not final_candidate_ids:
+                timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
                 return {
                     'sql': sql_result.get('sql', ''),
                     'candidates': [],
+                    'next_cursor': None,
+                    'llm_timed_out': llm_timed_out,
+                    'timings': timings,
                 }
             
-            # Get full candidate data
-            candidates = self.get_candidates(final_candidate_ids)
+            # Get a page of candidate data, one extra row tells whether there is a next page
+            candidates = await timed('candidates', self.get_candidates(
+                final_candidate_ids,
+                fields=fields,
+                after=decode_cursor(cursor, keys=('u', 'i')) if cursor else None,
+                limit=page_size + 1
+            ))
+            next_cursor = None
+            if len(candidates) > page_size:
+                candidates = candidates[:page_size]
+                next_cursor = encode_cursor({'u': candidates[-1]['user_id'], 'i': candidates[-1]['id']})
+            timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
             
             return {
                 'sql': sql_result.get('sql', ''),
                 'candidates': candidates,
+                'next_cursor': next_cursor,
+                'llm_timed_out': llm_timed_out,
+                'timings': timings,
             }
             
         except Exception as e:
             logging.error(f"Error in search_candidates: {str(e)}")
             return {'error': str(e)}
+        finally:
+            if not llm_task.done():
+                llm_task.cancel()
     
-    def apply_filters(self, 
+    async def ranked_search(self, search_query: str,
+                            location: Optional[List[str]] = None,
+                            experience_level: Optional[List[str]] = None,
+                            soft_skills: Optional[List[str]] = None,
+                            hard_skills: Optional[List[str]] = None,
+                            languages: Optional[List[str]] = None,
+                            certifications: Optional[List[str]] = None,
+                            page_size: int = 50,
+                            cursor: Optional[str] = None,
+                            fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Full-text search over ``search_document`` ordered by ``ts_rank_cd``
+
+        The query is parsed with both the Italian and English configurations and the
+        direct filters are applied in the same statement, so the GIN indexes serve the
+        whole search without an LLM round trip.
+
+        Args:
+            search_query (str): Free text query, web search syntax ("quoted phrases", -exclusions, or)
+            page_size (int): Number of candidates per page
+            cursor (Optional[str]): ``next_cursor`` of the previous page
+            fields (Optional[List[str]]): Columns to return, all of them by default
+
+        Returns:
+            Dict[str, Any]: Ranked candidates, each with its ``rank``, and the next page cursor
+        """
+        started = time.perf_counter()
+        try:
+            conditions, params = self.build_filter_conditions(
+                location=location,
+                experience_level=experience_level,
+                soft_skills=soft_skills,
+                hard_skills=hard_skills,
+                languages=languages,
+                certifications=certifications
+            )
+            columns = self.resolve_fields(fields)
+            query = f"""
+                SELECT * FROM (
+                    SELECT {columns}, ts_rank_cd(search_document, ts_query) AS rank
+                    FROM candidate_resumes,
+                         (SELECT websearch_to_tsquery('italian', :search_query) || websearch_to_tsquery('english', :search_query) AS ts_query) q
+                    WHERE search_document @@ ts_query{conditions}
+                ) ranked
+            """
+            params.update({'search_query': search_query, 'limit': page_size + 1})
+            if cursor:
+                after = decode_cursor(cursor, keys=('r', 'i'))
+                query += " WHERE rank < :after_rank OR (rank = :after_rank AND id > :after_id)"
+                params.update({'after_rank': after['r'], 'after_id': after['i']})
+            query += " ORDER BY rank DESC, id LIMIT :limit"
+
+            result = await self.db.execute(text(query), params)
+            rows = result.fetchall()
+            keys = result.keys()
+            candidates = [dict(zip(keys, row)) for row in rows]
+
+            next_cursor = None
+            if len(candidates) > page_size:
+                candidates = candidates[:page_size]
+                next_cursor = encode_cursor({'r': candidates[-1]['rank'], 'i': candidates[-1]['id']})
+
+            return {
+                'mode': 'ranked',
+                'candidates': candidates,
+                'next_cursor': next_cursor,
+                'timings': {'total_ms': round((time.perf_counter() - started) * 1000, 1)},
+            }
+        except Exception as e:
+            logging.error(f"Error in ranked_search: {str(e)}")
+            return {'error': str(e)}
+
+    async def apply_filters(self, 
                      location: Optional[List[str]] = None,
                      experience_level: Optional[List[str]] = None,
                      soft_skills: Optional[List[str]] = None,
@@ -101,7 +296,35 @@ class CandidateEvaluator:
         if not any([location, experience_level, soft_skills, hard_skills, languages, certifications]):
             return []  # No filters applied
         
-        query = "SELECT user_id FROM candidate_resumes WHERE 1=1"
+        conditions, params = self.build_filter_conditions(
+            location=location,
+            experience_level=experience_level,
+            soft_skills=soft_skills,
+            hard_skills=hard_skills,
+            languages=languages,
+            certifications=certifications
+        )
+        query = "SELECT user_id FROM candidate_resumes WHERE 1=1" + conditions
+        
+        try:
+            logging.info(f"Filter query: {query}")
+            logging.info(f"Filter params: {params}")
+            result = await self.db.execute(text(query), params)
+            rows = result.fetchall()
+            return [row[0] for row in rows]  # Extract user_ids
+        except Exception as e:
+            logging.error(f"Error applying filters: {str(e)}")
+            return []
+
+    def build_filter_conditions(self, 
+                     location: Optional[List[str]] = None,
+                     experience_level: Optional[List[str]] = None,
+                     soft_skills: Optional[List[str]] = None,
+                     hard_skills: Optional[List[str]] = None,
+                     languages: Optional[List[str]] = None,
+                     certifications: Optional[List[str]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Build the ``AND ...`` SQL conditions and bind parameters for the direct filters"""
+        query = ""
         params = {}
         
         # Location filter
@@ -118,7 +341,7 @@ class CandidateEvaluator:
         # Experience level filter (assuming it's stored in the experience JSON field)
         if experience_level and len(experience_level) > 0:
             query += """ AND EXISTS (
-                SELECT 1 FROM jsonb_array_elements(experience::jsonb) AS exp
+                SELECT 1 FROM jsonb_array_elements(experience) AS exp
                 WHERE """
             
             exp_conditions = []
@@ -129,98 +352,93 @@ class CandidateEvaluator:
             
             query += f"{' OR '.join(exp_conditions)})"
         
-        # Skills filters (assuming skills are stored in the skills JSON field)
+        # Skills filters, matched against the trigram indexed skills_text column
         if soft_skills and len(soft_skills) > 0:
             soft_skill_conditions = []
             for i, skill in enumerate(soft_skills):
                 param_name = f"soft_skill_{i}"
-                soft_skill_conditions.append(f"skill ILIKE :{param_name}")
+                soft_skill_conditions.append(f"skills_text ILIKE :{param_name}")
                 params[param_name] = f"%{skill}%"
             
             if soft_skill_conditions:
-                query += f""" AND EXISTS (
-                    SELECT 1 FROM jsonb_array_elements_text(skills::jsonb) AS skill
-                    WHERE {' OR '.join(soft_skill_conditions)}
-                )"""
+                query += f" AND ({' OR '.join(soft_skill_conditions)})"
         
         if hard_skills and len(hard_skills) > 0:
             hard_skill_conditions = []
             for i, skill in enumerate(hard_skills):
                 param_name = f"hard_skill_{i}"
-                hard_skill_conditions.append(f"skill ILIKE :{param_name}")
+                hard_skill_conditions.append(f"skills_text ILIKE :{param_name}")
                 params[param_name] = f"%{skill}%"
             
             if hard_skill_conditions:
-                query += f""" AND EXISTS (
-                    SELECT 1 FROM jsonb_array_elements_text(skills::jsonb) AS skill
-                    WHERE {' OR '.join(hard_skill_conditions)}
-                )"""
+                query += f" AND ({' OR '.join(hard_skill_conditions)})"
         
         # Languages filter
         if languages and len(languages) > 0:
             lang_conditions = []
             for i, lang in enumerate(languages):
                 param_name = f"language_{i}"
-                lang_conditions.append(f"lang_item->>'language' ILIKE :{param_name}")
+                lang_conditions.append(f"languages_text ILIKE :{param_name}")
                 params[param_name] = f"%{lang}%"
             
             if lang_conditions:
-                query += f""" AND EXISTS (
-                    SELECT 1 FROM jsonb_array_elements(languages::jsonb) AS lang_item
-                    WHERE {' OR '.join(lang_conditions)}
-                )"""
+                query += f" AND ({' OR '.join(lang_conditions)})"
         
         # Certifications filter
         if certifications and len(certifications) > 0:
             cert_conditions = []
             for i, cert in enumerate(certifications):
                 param_name = f"cert_{i}"
-                cert_conditions.append(f"cert_item->>'name' ILIKE :{param_name}")
+                cert_conditions.append(f"certifications_text ILIKE :{param_name}")
                 params[param_name] = f"%{cert}%"
             
             if cert_conditions:
-                query += f""" AND EXISTS (
-                    SELECT 1 FROM jsonb_array_elements(certifications::jsonb) AS cert_item
-                    WHERE {' OR '.join(cert_conditions)}
-                )"""
+                query += f" AND ({' OR '.join(cert_conditions)})"
         
-        try:
-            logging.info(f"Filter query: {query}")
-            logging.info(f"Filter params: {params}")
-            result = self.db.execute(text(query), params)
-            rows = result.fetchall()
-            return [row[0] for row in rows]  # Extract user_ids
-        except Exception as e:
-            logging.error(f"Error applying filters: {str(e)}")
-            return []
+        return query, params
+
+    async def evaluate_candidate_list(self, candidate_ids: List, compare_with: str,
+                                      top_n: Optional[int] = None, min_score: Optional[float] = None):
+          """Evaluate candidates against requirements with the LLM
+
+          Candidates are first ranked by the local pre-screen, only the best ``top_n``
+          (PRESCREEN_TOP_N by default) and those scoring at least ``min_score`` are sent
+          to the LLM. The others are returned with their pre-screen score only.
 
-    async def evaluate_candidate_list(self, candidate_ids:List, compare_with:str):
-          import asyncio
-          from concurrent.futures import ThreadPoolExecutor
-
-          candidates_data = self.get_candidates(candidate_ids)
-          async def evaluate_candidates_parallel():
-              with ThreadPoolExecutor() as executor:
-                  loop = asyncio.get_event_loop()
-                  evaluation_tasks = [
-                      loop.run_in_executor(executor, self.evaluate_candidate, candidate, compare_with)
-                      for candidate in candidates_data
-                  ]
-                  return await asyncio.gather(*evaluation_tasks)
-
-          # Execute parallel evaluations
-          evaluations = await evaluate_candidates_parallel()
+          Args:
+              candidate_ids (List): User IDs of the candidates
+              compare_with (str): Search text or requirements to compare against
+              top_n (Optional[int]): Most candidates to evaluate
+              min_score (Optional[float]): Lowest pre-screen score to evaluate, between 0 and 1
+
+          Returns:
+              Dict: Evaluations best pre-screen score first, and the candidates left out
+          """
+          candidates_data = await self.get_candidates(candidate_ids)
+
+          if top_n is None:
+              top_n = PRESCREEN_TOP_N
+          selected, rest = self.prescreener.select(candidates_data, compare_with, top_n, min_score)
+
+          # Execute parallel evaluations, the LLM layer bounds how many run at once
+          evaluations = await asyncio.gather(*[
+              self.evaluate_candidate(candidate, compare_with)
+              for candidate, _ in selected
+          ])
+          for evaluation, (_, score) in zip(evaluations, selected):
+              evaluation['prescreen_score'] = score
           logging.info(f"Evaluations completed for {len(evaluations)} candidates")
 
           return {
               'compare_with' : compare_with,
-              'evaluations': evaluations
+              'evaluations': evaluations,
+              'prescreened_out': [
+                  {'candidate_id': candidate.get('user_id'), 'prescreen_score': score}
+                  for candidate, score in rest
+              ],
           }
 
-
-
-
-    def evaluate_candidate(self, candidate: Dict, compare_with: str) -> Dict:
+    async def evaluate_candidate(self, candidate: Dict, compare_with: str) -> Dict:
         """Evaluate a single candidate using weighted criteria
         Args:
             candidate (Dict): Candidate data from database
@@ -278,7 +496,7 @@ class CandidateEvaluator:
 
             # evaluation_result = response.choices[0].message.content
 
-            evaluation_result = self.structure.structure_data(
+            evaluation_result = await self.structure.structure_data(
                 content = content,
                 model_class= CandidateEvalIt,
                 system_prompt=system_prompt,
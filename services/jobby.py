@@ -1,15 +1,28 @@
-from typing import Optional, List, Dict
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from typing import Optional, List, Dict, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, bindparam
 import logging
 import json
+import os
+from datetime import datetime, timedelta
+
+# Incremental syncs re-read this much before their updated_at watermark. MAX(updated_at)
+# doesn't cover transactions still open when it was read, which commit later with an
+# earlier updated_at; they are picked up by the next pass as long as they commit within it.
+SYNC_WATERMARK_OVERLAP = timedelta(seconds=int(os.getenv('SYNC_WATERMARK_OVERLAP', '300')))
+
+
+def _since(last_updated_at: Optional[datetime]) -> datetime:
+    """Lower updated_at bound of an incremental read, overlapping the previous pass"""
+    return last_updated_at - SYNC_WATERMARK_OVERLAP if last_updated_at else datetime.min
+
 
 class JobbyDBService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
 
-    def get_resume_paths_by_dom_data_id(self, user_id: int) -> List[Dict]:
+    async def get_resume_paths_by_dom_data_id(self, user_id: int) -> List[Dict]:
         """Retrieve resume paths using dom_user_data_id
 
         Args:
@@ -29,11 +42,11 @@ class JobbyDBService:
  				        users_has_dom_user_data.users_id = :id;
         """)
         logging.info(f"Query: {user_id}")
-        result = self.db.execute(query, {"id": user_id})
+        result = await self.db.execute(query, {"id": user_id})
         results = [dict(zip(result.keys(), row)) for row in result]
         return results if results else None
 
-    def get_candidate_certifications(self, user_id: int) -> List[Dict]:
+    async def get_candidate_certifications(self, user_id: int) -> List[Dict]:
         """Retrieve certifications for a candidate
 
         Args:
@@ -54,11 +67,11 @@ class JobbyDBService:
                 jobby_users.users_has_dom_user_data.users_id = :id;
         """)
         logging.info(f"Fetching certifications for user: {user_id}")
-        result = self.db.execute(query, {"id": user_id})
+        result = await self.db.execute(query, {"id": user_id})
         results = [row[0] for row in result]
         return results if results else None
 
-    def get_job_details(self, job_id: int) -> Dict:
+    async def get_job_details(self, job_id: int) -> Dict:
         """Retrieve job details from the ads table
 
         Args:
@@ -77,13 +90,13 @@ class JobbyDBService:
             WHERE
                 jobby_jobs.ads.id = :id;
         """)
-        result = self.db.execute(query, {"id": job_id})
+        result = await self.db.execute(query, {"id": job_id})
         row = result.fetchone()
         return dict(zip(result.keys(), row)) if row else None
 
 
 
-    def get_candidate_jobs_done(self, user_id: int) -> List[Dict]:
+    async def get_candidate_jobs_done(self, user_id: int) -> List[Dict]:
         """Retrieve jobs done for a candidate with statistics
 
         Args:
@@ -155,13 +168,13 @@ class JobbyDBService:
             ) stats;
         """)
         logging.info(f"Fetching jobs done for user: {user_id}")
-        result = self.db.execute(query, {"id": user_id})
+        result = await self.db.execute(query, {"id": user_id})
         row = result.fetchone()
         return json.loads(row.result) if row and row.result else None
 
 
 
-    def get_candidate_basic_info(self, user_id: int) -> Dict:
+    async def get_candidate_basic_info(self, user_id: int) -> Dict:
       """Retrieve basic information for a candidate
 
       Args:
@@ -189,6 +202,350 @@ class JobbyDBService:
           WHERE users.id = :id
       """)
       logging.info(f"Fetching basic information for user: {user_id}")
-      result = self.db.execute(query, {"id": user_id})
+      result = await self.db.execute(query, {"id": user_id})
       row = result.fetchone()
-      return dict(zip(result.keys(), row)) if row else None
\ No newline at end of file
+      return dict(zip(result.keys(), row)) if row else None
+
+    async def get_candidate_version(self, user_id: int) -> Optional[Tuple]:
+        """Cheap fingerprint of a candidate's Jobby data, it changes whenever the data may have changed
+
+        The application aggregates are a single index range read with an index on
+        ``applications(users_id, updated_at)``. With only ``users_id`` indexed they read
+        each of the user's application rows, still bounded by one user's history.
+
+        Args:
+            user_id (int): The user ID to fingerprint
+
+        Returns:
+            Optional[Tuple]: users.updated_at, latest application ID and update, None for unknown users
+        """
+        query = text("""
+            SELECT
+                users.updated_at,
+                apps.last_id,
+                apps.last_updated_at
+            FROM jobby_users.users users
+            LEFT JOIN (
+                SELECT MAX(id) as last_id, MAX(updated_at) as last_updated_at
+                FROM jobby_jobs.applications
+                WHERE users_id = :id
+            ) apps ON TRUE
+            WHERE users.id = :id
+        """)
+        result = await self.db.execute(query, {"id": user_id})
+        row = result.fetchone()
+        return tuple(row) if row else None
+
+    # Batch variants: one round trip for a list of users, results grouped by user ID
+
+    async def get_candidates_certifications(self, user_ids: List[int]) -> Dict[int, List[str]]:
+        """Retrieve certifications for several candidates
+
+        Args:
+            user_ids (List[int]): The user IDs to fetch certifications for
+
+        Returns:
+            Dict[int, List[str]]: Certifications by user ID, users without any are left out
+        """
+        query = text("""
+            SELECT
+                jobby_users.users_has_dom_user_data.users_id as user_id,
+                jobby_users.dom_certifications.label as certification
+            FROM
+                jobby_users.users_has_dom_user_data
+            INNER JOIN
+                jobby_users.dom_certifications ON jobby_users.users_has_dom_user_data.value = jobby_users.dom_certifications.id
+            WHERE
+                jobby_users.users_has_dom_user_data.dom_user_data_id = 5 AND
+                jobby_users.users_has_dom_user_data.users_id IN :ids;
+        """).bindparams(bindparam('ids', expanding=True))
+        logging.info(f"Fetching certifications for {len(user_ids)} users")
+        result = await self.db.execute(query, {"ids": list(user_ids)})
+        certifications: Dict[int, List[str]] = {}
+        for row in result:
+            certifications.setdefault(row.user_id, []).append(row.certification)
+        return certifications
+
+    async def get_candidates_jobs_done(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """Retrieve jobs done statistics for several candidates
+
+        Same shape as get_candidate_jobs_done, computed for every user in one query.
+
+        Args:
+            user_ids (List[int]): The user IDs to fetch jobs done for
+
+        Returns:
+            Dict[int, Dict]: Job statistics by user ID, users without jobs get a zero total
+        """
+        query = text("""
+            SELECT
+                stats.users_id as user_id,
+                JSON_OBJECT(
+                    'total', stats.total_jobs,
+                    'categories', category_stats.categories_json,
+                    'job_titles', title_stats.job_titles_json,
+                    'last_job_done', stats.last_job_date
+                ) as result
+            FROM (
+                SELECT
+                    apps.users_id,
+                    COUNT(DISTINCT jobs.id) as total_jobs,
+                    MAX(jobs.jobstart_at) as last_job_date
+                FROM jobby_jobs.jobs jobs
+                INNER JOIN jobby_jobs.applications apps
+                    ON apps.jobs_id = jobs.id
+                    AND apps.dom_application_status_id IN (2,6)
+                WHERE apps.users_id IN :ids
+                GROUP BY apps.users_id
+            ) stats
+            LEFT JOIN (
+                SELECT
+                    users_id,
+                    JSON_ARRAYAGG(JSON_OBJECT('category', category, 'count', job_count)) as categories_json
+                FROM (
+                    SELECT
+                        apps.users_id,
+                        job_macro_category_translations.label as category,
+                        COUNT(DISTINCT jobs.id) as job_count
+                    FROM jobby_jobs.jobs jobs
+                    INNER JOIN jobby_jobs.applications apps
+                        ON apps.jobs_id = jobs.id
+                        AND apps.dom_application_status_id IN (2,6)
+                    INNER JOIN jobby_jobs.job_micro_categories micro
+                        ON jobs.job_micro_categories_id = micro.id
+                    INNER JOIN jobby_jobs.job_macro_categories macro
+                        ON macro.id = micro.job_macro_categories_id
+                    INNER JOIN jobby_jobs.job_macro_category_translations
+                        ON job_macro_category_translations.job_macro_categories_id = macro.id
+                    WHERE apps.users_id IN :ids
+                    GROUP BY apps.users_id, job_macro_category_translations.label
+                ) per_category
+                GROUP BY users_id
+            ) category_stats ON category_stats.users_id = stats.users_id
+            LEFT JOIN (
+                SELECT
+                    users_id,
+                    JSON_ARRAYAGG(JSON_OBJECT('title', title, 'count', job_count)) as job_titles_json
+                FROM (
+                    SELECT
+                        apps.users_id,
+                        jobs.title,
+                        COUNT(*) as job_count
+                    FROM jobby_jobs.jobs jobs
+                    INNER JOIN jobby_jobs.applications apps
+                        ON apps.jobs_id = jobs.id
+                        AND apps.dom_application_status_id IN (2,6)
+                    WHERE apps.users_id IN :ids
+                    GROUP BY apps.users_id, jobs.title
+                ) per_title
+                GROUP BY users_id
+            ) title_stats ON title_stats.users_id = stats.users_id;
+        """).bindparams(bindparam('ids', expanding=True))
+        logging.info(f"Fetching jobs done for {len(user_ids)} users")
+        result = await self.db.execute(query, {"ids": list(user_ids)})
+        jobs_done = {row.user_id: json.loads(row.result) for row in result if row.result}
+        # The single user query reports users without jobs with a zero total, match it
+        for user_id in user_ids:
+            jobs_done.setdefault(user_id, {"total": 0, "categories": None, "job_titles": None, "last_job_done": None})
+        return jobs_done
+
+    async def get_candidates_basic_info(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """Retrieve basic information for several candidates
+
+        Args:
+            user_ids (List[int]): The user IDs to fetch basic information for
+
+        Returns:
+            Dict[int, Dict]: Basic information by user ID, unknown users are left out
+        """
+        query = text("""
+            SELECT
+                users.id as user_id,
+                users.updated_at,
+                users.date_of_birth,
+                users.first_name,
+                users.last_name,
+                users.email,
+                users.telephone,
+                users.gender,
+                users.language,
+                users.about,
+                users.rating_as_worker,
+                users.premium
+            FROM jobby_users.users users
+            WHERE users.id IN :ids
+        """).bindparams(bindparam('ids', expanding=True))
+        logging.info(f"Fetching basic information for {len(user_ids)} users")
+        result = await self.db.execute(query, {"ids": list(user_ids)})
+        basic_info = {}
+        for row in result:
+            info = dict(row._mapping)
+            basic_info[info.pop('user_id')] = info
+        return basic_info
+
+    # Sources of the jobby_job_summary table in Postgres, see logic.job_summary
+
+    async def get_applications_watermark(self) -> Dict:
+        """Highest application ID and update time, the point a sync can safely read up to"""
+        query = text("""
+            SELECT
+                MAX(apps.id) as last_id,
+                MAX(apps.updated_at) as last_updated_at
+            FROM jobby_jobs.applications apps;
+        """)
+        result = await self.db.execute(query)
+        row = result.fetchone()
+        return {"last_id": row.last_id or 0, "last_updated_at": row.last_updated_at}
+
+    async def get_users_with_changed_applications(self, last_id: int, last_updated_at, max_id: int) -> List[int]:
+        """Users with applications created or updated since a watermark
+
+        Rows updated in the SYNC_WATERMARK_OVERLAP before ``last_updated_at`` are read
+        again, so users of late committing transactions aren't skipped.
+
+        Args:
+            last_id (int): Highest application ID already processed
+            last_updated_at (datetime): Latest application update already processed, None for all
+            max_id (int): Highest application ID to consider
+
+        Returns:
+            List[int]: IDs of the users whose job history may have changed
+        """
+        query = text("""
+            SELECT DISTINCT apps.users_id as user_id
+            FROM jobby_jobs.applications apps
+            WHERE apps.id <= :max_id
+              AND (apps.id > :last_id OR apps.updated_at >= :last_updated_at);
+        """)
+        result = await self.db.execute(query, {
+            "last_id": last_id,
+            "max_id": max_id,
+            # Also covers applications inserted below last_id by transactions that committed late
+            "last_updated_at": _since(last_updated_at),
+        })
+        return [row.user_id for row in result]
+
+    async def get_users_with_applications_since(self, user_ids: List[int], last_id: int, last_updated_at) -> List[int]:
+        """Which of several users have applications created or updated since a watermark
+
+        Uses the same SYNC_WATERMARK_OVERLAP as get_users_with_changed_applications, a
+        user is reported until a refresh has read their changes.
+
+        Args:
+            user_ids (List[int]): The user IDs to check
+            last_id (int): Highest application ID already processed
+            last_updated_at (datetime): Latest application update already processed, None for all
+
+        Returns:
+            List[int]: IDs of the users whose job history may have changed
+        """
+        query = text("""
+            SELECT DISTINCT apps.users_id as user_id
+            FROM jobby_jobs.applications apps
+            WHERE apps.users_id IN :ids
+              AND (apps.id > :last_id OR apps.updated_at >= :last_updated_at);
+        """).bindparams(bindparam('ids', expanding=True))
+        result = await self.db.execute(query, {
+            "ids": list(user_ids),
+            "last_id": last_id,
+            "last_updated_at": _since(last_updated_at),
+        })
+        return [row.user_id for row in result]
+
+    async def get_users_with_jobs(self) -> List[int]:
+        """Every user with at least one completed job, for full rebuilds"""
+        query = text("""
+            SELECT DISTINCT apps.users_id as user_id
+            FROM jobby_jobs.applications apps
+            WHERE apps.dom_application_status_id IN (2,6);
+        """)
+        result = await self.db.execute(query)
+        return [row.user_id for row in result]
+
+    async def get_job_summary_rows(self, user_ids: List[int]) -> List[Dict]:
+        """Completed jobs of several users, one row per user and job
+
+        Each row carries what get_candidate_jobs_done aggregates: every translation
+        label of the job's macro category, and the user's completed applications to it.
+
+        Args:
+            user_ids (List[int]): The user IDs to summarize
+
+        Returns:
+            List[Dict]: user_id, job_id, title, categories, application_count and jobstart_at rows
+        """
+        query = text("""
+            SELECT
+                apps.users_id as user_id,
+                jobs.id as job_id,
+                jobs.title,
+                jobs.jobstart_at,
+                job_macro_category_translations.label as category,
+                COUNT(DISTINCT apps.id) as application_count
+            FROM jobby_jobs.jobs jobs
+            INNER JOIN jobby_jobs.applications apps
+                ON apps.jobs_id = jobs.id
+                AND apps.dom_application_status_id IN (2,6)
+            LEFT JOIN jobby_jobs.job_micro_categories micro
+                ON jobs.job_micro_categories_id = micro.id
+            LEFT JOIN jobby_jobs.job_macro_categories macro
+                ON macro.id = micro.job_macro_categories_id
+            LEFT JOIN jobby_jobs.job_macro_category_translations
+                ON job_macro_category_translations.job_macro_categories_id = macro.id
+            WHERE apps.users_id IN :ids
+            GROUP BY apps.users_id, jobs.id, job_macro_category_translations.label;
+        """).bindparams(bindparam('ids', expanding=True))
+        logging.info(f"Summarizing jobs done for {len(user_ids)} users")
+        result = await self.db.execute(query, {"ids": list(user_ids)})
+        jobs: Dict[tuple, Dict] = {}
+        for row in result:
+            job = jobs.setdefault((row.user_id, row.job_id), {
+                "user_id": row.user_id,
+                "job_id": row.job_id,
+                "title": row.title,
+                "categories": [],
+                "application_count": row.application_count,
+                "jobstart_at": row.jobstart_at,
+            })
+            if row.category is not None:
+                job["categories"].append(row.category)
+        return list(jobs.values())
+
+    # Sources of the jobby_* columns sync, see logic.jobby_sync
+
+    async def get_users_watermark(self) -> Dict:
+        """Latest user update time, the point a sync can safely read up to"""
+        query = text("""
+            SELECT
+                MAX(users.id) as last_id,
+                MAX(users.updated_at) as last_updated_at
+            FROM jobby_users.users users;
+        """)
+        result = await self.db.execute(query)
+        row = result.fetchone()
+        return {"last_id": row.last_id or 0, "last_updated_at": row.last_updated_at}
+
+    async def get_users_changed_since(self, last_updated_at, until) -> List[int]:
+        """Users updated since a watermark
+
+        Rows updated in the SYNC_WATERMARK_OVERLAP before ``last_updated_at`` are read
+        again, so users of late committing transactions aren't skipped.
+
+        Args:
+            last_updated_at (datetime): Latest user update already processed, None for all
+            until (datetime): Latest user update to consider
+
+        Returns:
+            List[int]: IDs of the updated users
+        """
+        query = text("""
+            SELECT users.id as user_id
+            FROM jobby_users.users users
+            WHERE users.updated_at >= :last_updated_at
+              AND users.updated_at <= :until;
+        """)
+        result = await self.db.execute(query, {
+            "last_updated_at": _since(last_updated_at),
+            "until": until or datetime.min,
+        })
+        return [row.user_id for row in result]
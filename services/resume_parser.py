@@ -1,14 +1,14 @@
+import asyncio
 import logging
 import os
-from typing import Dict, Any
-from docx import Document
-from pdfminer.high_level import extract_text
-from sqlalchemy.orm import Session
+from typing import Dict, Any, BinaryIO
+from utils.extraction import extraction_pool, extract_text, ExtractionError
+from utils.preprocess import preprocess_resume_text
 from utils.structure import DataStructureService
 
 class ResumeParserService:
-    def __init__(self, db: Session):
-        self.db = db
+    # Holds no database session, so one instance is shared by every ServiceManager in the process
+    def __init__(self):
         self.data_structure_service = DataStructureService()
 
     def parse_file(self, file_path: str) -> Dict[str, Any]:
@@ -17,25 +17,26 @@ class ResumeParserService:
         content = self._extract_text(file_path, file_ext)
         return content
 
+    async def extract(self, file_path: str) -> str:
+        """Extract the text of a resume file in the extraction process pool"""
+        return await extraction_pool.extract_file(file_path)
+
+    async def extract_file_obj(self, file_obj: BinaryIO, file_name: str) -> str:
+        """Extract the text of an open resume file in the extraction process pool"""
+        file_obj.seek(0, os.SEEK_END)
+        size = file_obj.tell()
+        if size > extraction_pool.max_bytes:
+            raise ExtractionError(f"Resume {file_name} is {size} bytes, over the {extraction_pool.max_bytes} byte limit")
+        file_obj.seek(0)
+        return await extraction_pool.extract_bytes(file_obj.read(), file_name)
+
     def _extract_text_from_file_obj(self, file_obj: Any, file_ext: str) -> str:
         """Extract text content from file object"""
-        if file_ext == '.pdf':
-            return extract_text(file_obj)
-        elif file_ext in ['.docx', '.doc']:
-            doc = Document(file_obj)
-            return '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-        else:
-            raise ValueError(f'Unsupported file type: {file_ext}')
+        return extract_text(file_obj, file_ext)
 
     def _extract_text(self, file_path: str, file_ext: str) -> str:
         """Extract text content from different file types"""
-        if file_ext == '.pdf':
-            return extract_text(file_path)
-        elif file_ext in ['.docx', '.doc']:
-            doc = Document(file_path)
-            return '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-        else:
-            raise ValueError(f'Unsupported file type: {file_ext}')
+        return extract_text(file_path, file_ext)
 
     async def process_resume(self, file_path: str, candidate_id: int = None) -> Dict[str, Any]:
         """Process resume file and save to database"""
@@ -44,11 +45,24 @@ class ResumeParserService:
                 logging.error(f"Invalid or missing file path: {file_path}")
                 return {"error": "Invalid or missing file path"}
 
-            content = self.parse_file(file_path)
-            sturcted_data = self.data_structure_service.structure_resume_data(content)
+            # Extraction is CPU bound, keep it out of the API process
+            content = await self.extract(file_path)
+            return await self.process_resume_content(content, candidate_id)
+
+        except Exception as e:
+            logging.error(f"Error processing resume: {str(e)}")
+            return {"error": f"Failed to process resume: {str(e)}"}
+
+    async def process_resume_content(self, content: str, candidate_id: int = None) -> Dict[str, Any]:
+        """Structure the text extracted from a resume"""
+        try:
+            # Cleaning and trimming is CPU bound on long resumes, keep it off the event loop
+            loop = asyncio.get_event_loop()
+            content = await loop.run_in_executor(None, preprocess_resume_text, content)
+            sturcted_data = await self.data_structure_service.structure_resume_data(content)
 
             if not sturcted_data:
-                logging.error(f"Failed to parse resume file: {file_path}")
+                logging.error(f"Failed to parse resume for candidate {candidate_id}")
                 return {"error": "Failed to parse resume file"}
 
             logging.info(f"Resume parsed: {sturcted_data}")
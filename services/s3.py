@@ -3,6 +3,13 @@ import boto3
 from botocore.exceptions import ClientError
 from typing import Union, BinaryIO
 import logging
+import tempfile
+
+from utils.file_cache import resume_file_cache
+
+# Resumes up to this size are kept in memory, larger ones spill to a temporary file
+RESUME_SPOOL_MAX_BYTES = int(os.getenv('RESUME_SPOOL_MAX_BYTES', str(8 * 1024 * 1024)))
+COPY_CHUNK_SIZE = 1024 * 1024
 
 class S3Service:
     def __init__(self):
@@ -15,43 +22,50 @@ class S3Service:
         )
         self.bucket_name = os.getenv('AWS_S3_BUCKET')
 
-    def fetch_resume(self, file_path: str) -> Union[BinaryIO, None]:
-        temp_file_path = None
+    def fetch_resume(self, file_path: str) -> Union[str, None]:
+        """Get a local copy of a resume, downloading it only when the cached copy is missing or stale
+
+        Args:
+            file_path (str): S3 key of the resume
+
+        Returns:
+            Union[str, None]: Path of the local file, or None if it can't be fetched.
+            The file is kept from eviction until passed to ``release_resume``.
+        """
         try:
             if not file_path:
                 logging.error("Empty file path provided")
                 return None
 
-            # Create resumes directory if it doesn't exist
-            resume_dir = os.path.join(os.getcwd(), "resumes", os.path.dirname(file_path))
-            os.makedirs(resume_dir, exist_ok=True)
-
-            # Create a temporary file to store the downloaded content
-            temp_file_path = os.path.join(resume_dir, os.path.basename(file_path))
-            
-            # Check if file already exists locally
-            if os.path.exists(temp_file_path):
-                logging.info(f"File already exists locally: {temp_file_path}")
-                return temp_file_path
-            
-            # Check if file exists in S3 before downloading
+            entry = resume_file_cache.get(file_path)
+            if entry and entry["fresh"]:
+                logging.info(f"Resume served from cache: {entry['path']}")
+                return resume_file_cache.hit(file_path)
+
+            # A conditional GET replaces the separate existence check: 304 keeps the cached copy,
+            # 404 means the object is gone, anything else streams the new version
+            params = {"Bucket": self.bucket_name, "Key": file_path}
+            if entry and entry["etag"]:
+                params["IfNoneMatch"] = entry["etag"]
             try:
-                self.s3_client.head_object(Bucket=self.bucket_name, Key=file_path)
+                response = self.s3_client.get_object(**params)
             except ClientError as e:
-                if e.response['Error']['Code'] == '404':
+                error_code = e.response['Error']['Code']
+                if entry and error_code in ('304', 'NotModified'):
+                    logging.info(f"Cached resume still current: {entry['path']}")
+                    return resume_file_cache.hit(file_path, revalidated=True)
+                if error_code in ('404', 'NoSuchKey'):
                     logging.error(f"File not found in S3: {file_path}")
+                    if entry:
+                        resume_file_cache.remove(file_path)
                     return None
                 raise
-           
-            # Download the file from S3
-            self.s3_client.download_file(
-                self.bucket_name,
-                file_path,
-                temp_file_path
-            )
-            
-            return temp_file_path
-            
+
+            try:
+                return resume_file_cache.put(file_path, response['Body'], response.get('ETag', ''))
+            finally:
+                response['Body'].close()
+
         except ClientError as e:
             error_code = e.response['Error']['Code']
             if error_code == 'NoSuchBucket':
@@ -62,11 +76,52 @@ class S3Service:
 
         except Exception as e:
             logging.error(f"Unexpected error fetching file from S3: {str(e)}")
-            # Cleanup temporary file if something went wrong
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    logging.warning(f"Cleaning up temporary file: {temp_file_path}")
-                    os.remove(temp_file_path)
-                except Exception as e:
-                    logging.warning(f"Failed to cleanup temporary file {temp_file_path}: {str(e)}")
+            return None
+
+    def release_resume(self, local_path: str) -> None:
+        """Let the cache evict a file returned by ``fetch_resume`` again"""
+        resume_file_cache.release(local_path)
+
+    def fetch_resume_stream(self, file_path: str) -> Union[BinaryIO, None]:
+        """Read a resume straight from S3 into memory, without touching the cache directory
+
+        The body is copied into a ``SpooledTemporaryFile``, which only goes to disk above
+        ``RESUME_SPOOL_MAX_BYTES``. The caller owns the returned file and must close it.
+
+        Args:
+            file_path (str): S3 key of the resume
+
+        Returns:
+            Union[BinaryIO, None]: Seekable file object positioned at the start, or None
+        """
+        try:
+            if not file_path:
+                logging.error("Empty file path provided")
+                return None
+
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=file_path)
+            buffer = tempfile.SpooledTemporaryFile(max_size=RESUME_SPOOL_MAX_BYTES)
+            try:
+                for chunk in iter(lambda: response['Body'].read(COPY_CHUNK_SIZE), b''):
+                    buffer.write(chunk)
+            except Exception:
+                buffer.close()
+                raise
+            finally:
+                response['Body'].close()
+            buffer.seek(0)
+            return buffer
+
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in ('404', 'NoSuchKey'):
+                logging.error(f"File not found in S3: {file_path}")
+            elif error_code == 'NoSuchBucket':
+                logging.error(f"S3 bucket not found: {self.bucket_name}")
+            else:
+                logging.error(f"Error accessing S3: {str(e)}")
+            return None
+
+        except Exception as e:
+            logging.error(f"Unexpected error fetching file from S3: {str(e)}")
             return None
@@ -0,0 +1,31 @@
+import pytest
+
+from utils.pagination import encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip():
+    values = {'u': 1234, 'i': 98765}
+    assert decode_cursor(encode_cursor(values), keys=('u', 'i')) == values
+
+
+def test_rank_cursor_keeps_float_exact():
+    # The next page filters on rank = :after_rank, any rounding would skip or repeat rows
+    rank = 0.1 + 0.2
+    assert decode_cursor(encode_cursor({'r': rank, 'i': 7}))['r'] == rank
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({'u': 2 ** 62, 'i': 2 ** 62 - 1})
+    assert all(c.isalnum() or c in '-_=' for c in cursor)
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', '!!!', encode_cursor([1, 2]).replace('=', ''), encode_cursor([1, 2])])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_cursor_missing_keys():
+    # A search cursor reused on the ranked endpoint
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(encode_cursor({'u': 1, 'i': 2}), keys=('r', 'i'))
@@ -0,0 +1,89 @@
+import pytest
+
+from utils import preprocess
+from utils.preprocess import dedupe_lines, fit_to_budget, preprocess_resume_text, split_sections, strip_page_furniture
+
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    """Count one token per word, so budgets don't depend on the tokenizer files being available"""
+    def count_tokens(text, model='gpt-4o'):
+        return len(text.split())
+    monkeypatch.setattr(preprocess, 'count_tokens', count_tokens)
+    return count_tokens
+
+
+def test_strip_page_furniture_drops_page_numbers_and_repeated_headers():
+    pages = [
+        "Mario Rossi - Curriculum Vitae\nEsperienza\nCuoco presso Trattoria Da Gino\nPagina 1 di 2",
+        "Mario Rossi - Curriculum Vitae\nIstruzione\nDiploma alberghiero\n2",
+    ]
+    text = strip_page_furniture('\f'.join(pages))
+    assert "Curriculum Vitae" not in text
+    assert "Pagina 1" not in text
+    assert text.split('\n')[-1] == "Diploma alberghiero"
+    assert "Cuoco presso Trattoria Da Gino" in text
+
+
+def test_strip_page_furniture_keeps_headings_repeated_on_every_page():
+    pages = ["Esperienza\nCuoco a Milano", "Esperienza\nCameriere a Roma"]
+    text = strip_page_furniture('\f'.join(pages))
+    assert text.count("Esperienza") == 2
+
+
+def test_strip_page_furniture_keeps_single_page_lines():
+    text = "Mario Rossi\nCuoco\n3 anni di esperienza"
+    assert strip_page_furniture(text) == text
+
+
+def test_dedupe_lines_drops_consecutive_and_same_section_repeats():
+    line = "Responsabile di sala presso Hotel Excelsior, Milano"
+    text = f"Esperienza\n{line}\n{line}\nGestione del personale\n{line}"
+    assert dedupe_lines(text).split('\n') == ["Esperienza", line, "Gestione del personale"]
+
+
+def test_dedupe_lines_keeps_long_lines_repeated_in_other_sections():
+    line = "Responsabile di sala presso Hotel Excelsior, Milano"
+    text = f"Esperienza\n{line}\nProgetti\n{line}"
+    assert dedupe_lines(text).split('\n') == ["Esperienza", line, "Progetti", line]
+
+
+def test_dedupe_lines_keeps_short_repeats():
+    text = "Competenze\nInglese\nLingue\nInglese"
+    assert dedupe_lines(text) == text
+
+
+def test_fit_to_budget_leaves_short_text_alone(word_tokens):
+    text = "Esperienza\nCuoco a Milano"
+    assert fit_to_budget(text, 100) == text
+
+
+def test_fit_to_budget_trims_sections_proportionally(word_tokens, monkeypatch):
+    monkeypatch.setattr(preprocess, 'MIN_SECTION_TOKENS', 5)
+    experience = '\n'.join(f"Ruolo {i} presso azienda" for i in range(50))
+    education = '\n'.join(f"Corso {i}" for i in range(10))
+    text = f"Esperienza\n{experience}\nIstruzione\n{education}"
+    trimmed = fit_to_budget(text, 60)
+
+    assert word_tokens(trimmed) <= 60
+    sections = dict(split_sections(trimmed))
+    # Each section keeps its beginning
+    assert sections['experience'].startswith("Esperienza\nRuolo 0 presso azienda")
+    assert sections['education'].startswith("Istruzione\nCorso 0")
+    assert word_tokens(sections['experience']) > word_tokens(sections['education'])
+
+
+def test_fit_to_budget_floors_never_exceed_the_budget(word_tokens, monkeypatch):
+    monkeypatch.setattr(preprocess, 'MIN_SECTION_TOKENS', 150)
+    headings = ["Esperienza", "Istruzione", "Competenze", "Lingue", "Progetti", "Volontariato"]
+    text = '\n'.join(f"{heading}\n" + ' '.join(['parola'] * 200) for heading in headings)
+    for budget in (100, 300, 600):
+        assert word_tokens(fit_to_budget(text, budget)) <= budget
+
+
+def test_preprocess_resume_text_fits_the_budget(word_tokens):
+    page = "Mario Rossi - CV\nEsperienza\n" + '\n'.join(f"Cuoco presso ristorante numero {i}" for i in range(100))
+    text = '\f'.join([page, page])
+    cleaned = preprocess_resume_text(text, budget=200)
+    assert word_tokens(cleaned) <= 200
+    assert "Mario Rossi - CV" not in cleaned
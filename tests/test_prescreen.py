@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+from utils.prescreen import PreScreener
+
+REQUIREMENTS = "Cerchiamo cuoco con esperienza in cucina italiana e pasticceria a Milano"
+
+
+def candidate(user_id, **fields):
+    return {'user_id': user_id, **fields}
+
+
+@pytest.fixture
+def candidates():
+    return [
+        candidate(1, skills=['Cameriere']),
+        candidate(2, skills=['Cuoco', 'Cucina italiana', 'Pasticceria'], location='Milano'),
+        candidate(3, skills=['Cuoco'], location='Roma'),
+        candidate(4, skills=['Cuoco', 'Pasticceria']),
+    ]
+
+
+def ids(pairs):
+    return [pair[0]['user_id'] for pair in pairs]
+
+
+def test_select_ranks_best_match_first(candidates):
+    selected, rest = PreScreener().select(candidates, REQUIREMENTS)
+    assert ids(selected) == [2, 4, 3, 1]
+    assert rest == []
+    scores = [score for _, score in selected]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_select_keeps_top_n(candidates):
+    selected, rest = PreScreener().select(candidates, REQUIREMENTS, top_n=2)
+    assert ids(selected) == [2, 4]
+    # Left out candidates come back best first too
+    assert ids(rest) == [3, 1]
+
+
+def test_select_drops_candidates_below_min_score(candidates):
+    screener = PreScreener()
+    scores = dict(zip([c['user_id'] for c in candidates], screener.score(candidates, REQUIREMENTS)))
+    selected, rest = screener.select(candidates, REQUIREMENTS, min_score=float(scores[3]))
+    assert ids(selected) == [2, 4, 3]
+    assert ids(rest) == [1]
+
+
+def test_select_applies_min_score_before_top_n(candidates):
+    selected, rest = PreScreener().select(candidates, REQUIREMENTS, top_n=3, min_score=1.0)
+    assert selected == []
+    assert ids(rest) == [2, 4, 3, 1]
+
+
+def test_select_keeps_requested_order_on_ties():
+    tied = [candidate(user_id, skills=['Cuoco']) for user_id in (5, 3, 9)]
+    selected, _ = PreScreener().select(tied, REQUIREMENTS, top_n=2)
+    assert ids(selected) == [5, 3]
+
+
+def test_select_without_candidates():
+    assert PreScreener().select([], REQUIREMENTS, top_n=5) == ([], [])
+
+
+def test_recency_halves_every_half_life():
+    now = datetime(2026, 1, 1)
+    screener = PreScreener(weights={'recency': 1.0}, half_life_days=10)
+    candidates = [
+        candidate(1, jobby_jobs={'last_job_done': '2026-01-01 00:00:00.000000'}),
+        candidate(2, jobby_jobs={'last_job_done': '2025-12-22 00:00:00.000000'}),
+        candidate(3),
+    ]
+    assert screener.score(candidates, REQUIREMENTS, now=now).tolist() == pytest.approx([1.0, 0.5, 0.0])
@@ -0,0 +1,29 @@
+from utils.sql_cache import normalize_query, make_cache_key
+
+
+def test_normalize_query_ignores_case_spacing_and_stop_words():
+    assert normalize_query("Cuochi a  Milano") == "cuochi milano"
+    assert normalize_query("Trova candidati che parlano inglese") == "parlano inglese"
+    assert normalize_query("Find me candidates with Python") == "python"
+
+
+def test_normalize_query_strips_accents_and_punctuation():
+    assert normalize_query("Caffè, Perché?") == "caffe perche"
+    assert normalize_query("Cuochi a Milano!") == normalize_query("cuochi milano")
+
+
+def test_normalize_query_keeps_technology_names():
+    assert normalize_query("Sviluppatori C++ e C# a Roma") == "sviluppatori c++ c# roma"
+    assert normalize_query("Node.js developer.") == "node.js developer"
+
+
+def test_normalize_query_of_stop_words_only_is_empty():
+    assert normalize_query("  ") == ""
+    assert normalize_query("trova i candidati") == ""
+
+
+def test_cache_key_depends_on_query_and_fingerprint():
+    key = make_cache_key(normalize_query("Cuochi a Milano"), "schema-v1")
+    assert key == make_cache_key(normalize_query("cuochi milano"), "schema-v1")
+    assert key != make_cache_key(normalize_query("cuochi milano"), "schema-v2")
+    assert key != make_cache_key(normalize_query("cuochi roma"), "schema-v1")
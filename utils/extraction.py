@@ -0,0 +1,176 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+# Processes extracting resume text, 0 runs extraction on the default thread pool instead
+EXTRACT_WORKERS = int(os.getenv('EXTRACT_WORKERS', str(min(os.cpu_count() or 1, 4))))
+EXTRACT_TIMEOUT = float(os.getenv('EXTRACT_TIMEOUT', '30'))
+EXTRACT_MAX_PAGES = int(os.getenv('EXTRACT_MAX_PAGES', '20'))
+EXTRACT_MAX_BYTES = int(os.getenv('EXTRACT_MAX_BYTES', str(20 * 1024 * 1024)))
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.doc')
+
+
+class ExtractionError(Exception):
+    """A resume could not be extracted: unsupported, too large, or timed out"""
+
+
+def extract_text(file: Union[str, BinaryIO], file_ext: str, max_pages: int = EXTRACT_MAX_PAGES) -> str:
+    """Extract the text of a PDF or DOCX resume from a path or a binary file object
+
+    Only the first ``max_pages`` pages of a PDF are read.
+    """
+    if file_ext == '.pdf':
+        from pdfminer.high_level import extract_text as extract_pdf_text
+        return extract_pdf_text(file, maxpages=max_pages)
+    elif file_ext in ['.docx', '.doc']:
+        from docx import Document
+        doc = Document(file)
+        return '\n'.join([paragraph.text for paragraph in doc.paragraphs])
+    else:
+        raise ValueError(f'Unsupported file type: {file_ext}')
+
+
+def _extract_bytes(data: bytes, file_ext: str, max_pages: int) -> str:
+    return extract_text(io.BytesIO(data), file_ext, max_pages)
+
+
+def _worker_main(conn) -> None:
+    """Entry point of an extraction process, runs the jobs sent on the pipe one at a time"""
+    while True:
+        try:
+            fn, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            result = (True, fn(*args))
+        except Exception as e:
+            result = (False, e)
+        try:
+            conn.send(result)
+        except Exception:
+            # The exception couldn't be pickled, send its text instead
+            conn.send((False, RuntimeError(f"{type(result[1]).__name__}: {result[1]}")))
+
+
+class _Worker:
+    """One extraction process and the parent's end of its pipe"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def call(self, fn, args: tuple) -> tuple:
+        """Run a job and wait for its ``(ok, result)``, blocking, so it runs in a thread"""
+        self.conn.send((fn, args))
+        return self.conn.recv()
+
+    def kill(self) -> None:
+        # A thread still waiting on the pipe gets EOFError and returns
+        self.process.kill()
+        self.conn.close()
+
+
+class ExtractionPool:
+    """Runs resume text extraction in a set of worker processes
+
+    pdfminer is pure Python and CPU bound, so extraction in the API process would block
+    the event loop and hold the GIL. Each worker runs one document at a time and the
+    pool tracks which worker runs which document. A document that times out, crashes
+    its worker or whose caller is cancelled gets that one worker killed and replaced,
+    the extractions running on the other workers carry on.
+    """
+
+    def __init__(self, workers: int = EXTRACT_WORKERS, timeout: float = EXTRACT_TIMEOUT,
+                 max_pages: int = EXTRACT_MAX_PAGES, max_bytes: int = EXTRACT_MAX_BYTES):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        # spawn, so the workers don't inherit the event loop or pooled connections
+        self._context = multiprocessing.get_context('spawn')
+        self._idle: List[_Worker] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.extracted = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        return self._slots
+
+    def _check_input(self, name: str, size: int) -> str:
+        file_ext = os.path.splitext(name)[1].lower()
+        if file_ext not in SUPPORTED_EXTENSIONS:
+            self.rejected += 1
+            raise ExtractionError(f"Unsupported file type: {file_ext}")
+        if size > self.max_bytes:
+            self.rejected += 1
+            raise ExtractionError(f"Resume {name} is {size} bytes, over the {self.max_bytes} byte limit")
+        return file_ext
+
+    async def _run(self, name: str, fn, *args) -> str:
+        loop = asyncio.get_event_loop()
+        if self.workers <= 0:
+            try:
+                text = await asyncio.wait_for(loop.run_in_executor(None, fn, *args), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise ExtractionError(f"Extraction of {name} timed out after {self.timeout}s")
+            self.extracted += 1
+            return text
+
+        async with self._semaphore():
+            worker = self._idle.pop() if self._idle else await loop.run_in_executor(None, _Worker, self._context)
+            try:
+                ok, result = await asyncio.wait_for(loop.run_in_executor(None, worker.call, fn, args), self.timeout)
+            except BaseException as e:
+                # Only this worker is left mid-document, replace it and keep the others
+                worker.kill()
+                self.restarts += 1
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                    logging.warning(f"Extraction worker {worker.process.pid} killed after {self.timeout}s on {name}")
+                    raise ExtractionError(f"Extraction of {name} timed out after {self.timeout}s")
+                if isinstance(e, (EOFError, OSError)):
+                    # The worker died, e.g. on a pathological file
+                    raise ExtractionError(f"Extraction worker crashed on {name}")
+                raise
+            self._idle.append(worker)
+
+        if not ok:
+            raise result
+        self.extracted += 1
+        return result
+
+    async def extract_file(self, file_path: str) -> str:
+        """Extract the text of a local resume file"""
+        file_ext = self._check_input(file_path, os.path.getsize(file_path))
+        return await self._run(file_path, extract_text, file_path, file_ext, self.max_pages)
+
+    async def extract_bytes(self, data: bytes, file_name: str) -> str:
+        """Extract the text of a resume held in memory, ``file_name`` picks the parser"""
+        file_ext = self._check_input(file_name, len(data))
+        return await self._run(file_name, _extract_bytes, data, file_ext, self.max_pages)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "idle_workers": len(self._idle),
+            "extracted": self.extracted,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+        }
+
+
+# Shared by every ResumeParserService in the process
+extraction_pool = ExtractionPool()
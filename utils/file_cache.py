@@ -0,0 +1,259 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+RESUME_CACHE_DIR = os.getenv('RESUME_CACHE_DIR', os.path.join(os.getcwd(), 'cache', 'resumes'))
+RESUME_CACHE_MAX_BYTES = int(os.getenv('RESUME_CACHE_MAX_BYTES', str(2 * 1024 * 1024 * 1024)))
+# Entries checked against S3 more recently than this are served without a request
+RESUME_CACHE_REVALIDATE_AFTER = int(os.getenv('RESUME_CACHE_REVALIDATE_AFTER', str(24 * 3600)))
+
+# Seconds between rebuilds of the index from the directory, which pick up the other processes' files
+RESUME_CACHE_RESCAN_INTERVAL = float(os.getenv('RESUME_CACHE_RESCAN_INTERVAL', '300'))
+# Files read more recently than this are never evicted, another process may be about to open them
+RESUME_CACHE_MIN_AGE = float(os.getenv('RESUME_CACHE_MIN_AGE', '60'))
+
+ETAG_SUFFIX = '.etag'
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class ResumeFileCache:
+    """Byte bounded on-disk cache of resume files downloaded from S3
+
+    Each file is stored with a ``.etag`` sidecar holding the S3 ETag; the sidecar's mtime
+    is the last time the entry was validated against S3. Files are written to a temporary
+    file and renamed into place, so readers never see a partial download. When the
+    directory grows past the byte budget the least recently read files are evicted.
+
+    Sizes and access times are kept in an in-memory index ordered by access, so a put
+    doesn't walk the directory. The index is rebuilt from the directory every
+    ``rescan_interval`` seconds, so processes sharing it share the budget. The paths
+    returned by ``hit`` and ``put`` are pinned until ``release``, and files read in the
+    last ``min_age`` seconds, possibly by another process, are never evicted.
+    """
+
+    def __init__(self, directory: str = RESUME_CACHE_DIR, max_bytes: int = RESUME_CACHE_MAX_BYTES,
+                 revalidate_after: int = RESUME_CACHE_REVALIDATE_AFTER,
+                 rescan_interval: float = RESUME_CACHE_RESCAN_INTERVAL, min_age: float = RESUME_CACHE_MIN_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.rescan_interval = rescan_interval
+        self.min_age = min_age
+        # Never held during file I/O, only while touching the index and counters
+        self._lock = threading.Lock()
+        # path -> (size, last access), least recently read first
+        self._index: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._total_bytes = 0
+        self._pins: Dict[str, int] = {}
+        self._scanned_at: Optional[float] = None
+        self._scanning = False
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key: str) -> str:
+        """Local path of an S3 key, keeping its extension for the parser"""
+        normalized = os.path.normpath(key).lstrip(os.sep)
+        if normalized.startswith('..'):
+            # Never let a key escape the cache directory
+            normalized = hashlib.sha256(key.encode('utf-8')).hexdigest() + os.path.splitext(key)[1]
+        return os.path.join(self.directory, normalized)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up an entry
+
+        Returns:
+            Optional[Dict[str, Any]]: ``path``, ``etag`` and whether the entry is ``fresh``
+            (validated within the revalidation window), or None if the key isn't cached
+        """
+        path = self.path(key)
+        try:
+            with open(path + ETAG_SUFFIX, 'r', encoding='utf-8') as f:
+                etag = f.read().strip()
+            checked_at = os.stat(path + ETAG_SUFFIX).st_mtime
+            if not os.path.exists(path):
+                return None
+        except FileNotFoundError:
+            return None
+        return {
+            "path": path,
+            "etag": etag,
+            "fresh": time.time() - checked_at <= self.revalidate_after,
+        }
+
+    def hit(self, key: str, revalidated: bool = False) -> str:
+        """Record a hit, bumping the access time used for eviction
+
+        Returns:
+            str: Local path of the file, pinned until ``release``
+        """
+        path = self.path(key)
+        now = time.time()
+        size = None
+        try:
+            stat = os.stat(path)
+            size = stat.st_size
+            os.utime(path, (now, stat.st_mtime))
+            if revalidated:
+                os.utime(path + ETAG_SUFFIX, (now, now))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._pin(path)
+            if size is not None:
+                self._touch(path, size, now)
+            if revalidated:
+                self.revalidations += 1
+            else:
+                self.hits += 1
+        return path
+
+    def release(self, path: str) -> None:
+        """Unpin a path returned by ``hit`` or ``put`` once the caller is done reading it"""
+        with self._lock:
+            count = self._pins.get(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+            else:
+                self._pins.pop(path, None)
+
+    def put(self, key: str, body: BinaryIO, etag: str) -> str:
+        """Store a file from a readable stream, replacing any previous version
+
+        Returns:
+            str: Local path of the stored file, pinned until ``release``
+        """
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: body.read(COPY_CHUNK_SIZE), b''):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._write_etag(path, etag)
+
+        with self._lock:
+            self._pin(path)
+            self._touch(path, size, time.time())
+            self.misses += 1
+        self._evict()
+        return path
+
+    def _write_etag(self, path: str, etag: str) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(etag or '')
+        os.replace(temp_path, path + ETAG_SUFFIX)
+
+    def remove(self, key: str) -> None:
+        path = self.path(key)
+        with self._lock:
+            self._forget(path)
+        for target in (path, path + ETAG_SUFFIX):
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
+
+    def _pin(self, path: str) -> None:
+        """Caller holds the lock"""
+        self._pins[path] = self._pins.get(path, 0) + 1
+
+    def _touch(self, path: str, size: int, accessed_at: float) -> None:
+        """Record an access, caller holds the lock"""
+        previous = self._index.get(path)
+        self._total_bytes += size - (previous[0] if previous else 0)
+        self._index[path] = (size, accessed_at)
+        self._index.move_to_end(path)
+
+    def _forget(self, path: str) -> None:
+        """Drop a path from the index, caller holds the lock"""
+        previous = self._index.pop(path, None)
+        if previous:
+            self._total_bytes -= previous[0]
+
+    def _rescan(self) -> None:
+        """Rebuild the index from the directory, ordered by the files' access times
+
+        Runs on the first put and then every ``rescan_interval`` seconds, so the files
+        written by other processes count against the budget.
+        """
+        with self._lock:
+            if self._scanning or (self._scanned_at is not None and time.time() - self._scanned_at < self.rescan_interval):
+                return
+            self._scanning = True
+        try:
+            files = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith(ETAG_SUFFIX) or name.endswith('.tmp'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_atime, path, stat.st_size))
+            files.sort()
+            with self._lock:
+                self._index = OrderedDict((path, (size, atime)) for atime, path, size in files)
+                self._total_bytes = sum(size for size, _ in self._index.values())
+                self._scanned_at = time.time()
+        finally:
+            self._scanning = False
+
+    def _evict(self) -> None:
+        """Drop the least recently read files until the directory fits the byte budget"""
+        self._rescan()
+        victims = []
+        with self._lock:
+            oldest_access = time.time() - self.min_age
+            for path, (size, accessed_at) in list(self._index.items()):
+                # The index is in access order, every file after this one is more recent
+                if self._total_bytes <= self.max_bytes or accessed_at > oldest_access:
+                    break
+                if path in self._pins:
+                    continue
+                self._forget(path)
+                victims.append(path)
+            self.evictions += len(victims)
+
+        for path in victims:
+            for target in (path, path + ETAG_SUFFIX):
+                try:
+                    os.remove(target)
+                except FileNotFoundError:
+                    pass
+            logging.info(f"Evicted cached resume {path}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.revalidations + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated_hits": self.revalidations,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._index),
+            "pinned": len(self._pins),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round((self.hits + self.revalidations) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared by every S3Service in the process
+resume_file_cache = ResumeFileCache()
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import random
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from .llm_scheduler import llm_scheduler
+from .tokens import estimate_request_tokens
+
+LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', '16'))
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '64'))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '120'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '5'))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '1'))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', '60'))
+# Output allowance charged to the token budget when a request sets no max_tokens
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv('LLM_EXPECTED_OUTPUT_TOKENS', '1500'))
+
+_client: Optional[AsyncOpenAI] = None
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_async_client() -> AsyncOpenAI:
+    """Process wide AsyncOpenAI client sharing one keep-alive connection pool
+
+    Retries are disabled on the client, ``call_llm`` handles them so a waiting retry
+    doesn't hold a concurrency slot.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            max_retries=0,
+            timeout=LLM_TIMEOUT,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                ),
+                timeout=LLM_TIMEOUT,
+            ),
+        )
+    return _client
+
+
+def model_concurrency(model: str) -> int:
+    """Concurrency limit of a model, e.g. LLM_CONCURRENCY_GPT_4O overrides LLM_CONCURRENCY for gpt-4o"""
+    env_name = 'LLM_CONCURRENCY_' + re.sub(r'[^A-Z0-9]', '_', model.upper())
+    return int(os.getenv(env_name, str(LLM_CONCURRENCY)))
+
+
+def _semaphore(model: str) -> asyncio.Semaphore:
+    # Created lazily so it binds to the running event loop
+    if model not in _semaphores:
+        _semaphores[model] = asyncio.Semaphore(model_concurrency(model))
+    return _semaphores[model]
+
+
+def _retry_after(error: RateLimitError) -> Optional[float]:
+    """Seconds the API asked us to wait, if it said so"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        return None
+    return None
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter exponential backoff
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+async def call_llm(model: str, request: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+    """Run an LLM request under the model's rate budget and concurrency limit, retrying transient failures
+
+    Each attempt first takes its estimated cost from the shared token buckets. Requests
+    returning a raw response have their rate limit headers fed back to the scheduler.
+
+    Args:
+        model (str): Model name, used to pick the concurrency limit and rate budget
+        request (Callable[[], Awaitable[Any]]): Issues the API call, invoked once per attempt
+        tokens (int): Estimated tokens the request counts against the TPM limit
+
+    Returns:
+        Any: The API response
+    """
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await llm_scheduler.acquire(model, tokens)
+        async with _semaphore(model):
+            try:
+                response = await request()
+                if hasattr(response, 'headers') and hasattr(response, 'parse'):
+                    await llm_scheduler.record(model, response.headers)
+                    return response.parse()
+                return response
+            except RateLimitError as e:
+                await llm_scheduler.record(model, getattr(e.response, 'headers', None), rate_limited=True)
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                retry_after = _retry_after(e)
+                delay = retry_after + random.uniform(0, 1) if retry_after is not None else _backoff(attempt)
+                logging.warning(f"LLM rate limited on {model}, retrying in {delay:.1f}s")
+            except (APIConnectionError, APITimeoutError, InternalServerError) as e:
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                delay = _backoff(attempt)
+                logging.warning(f"LLM request to {model} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+
+async def chat_completion(model: str, messages: List[Dict[str, str]], **kwargs) -> Any:
+    """Chat completion through the shared client and governor"""
+    client = get_async_client()
+    tokens = estimate_request_tokens(model, messages, max_output_tokens=kwargs.get('max_tokens') or LLM_EXPECTED_OUTPUT_TOKENS)
+    return await call_llm(model, lambda: client.chat.completions.with_raw_response.create(
+        model=model, messages=messages, **kwargs
+    ), tokens=tokens)
+
+
+async def parse_completion(model: str, messages: List[Dict[str, str]], response_format: Any, **kwargs) -> Any:
+    """Structured output completion through the shared client and governor"""
+    client = get_async_client()
+    tokens = estimate_request_tokens(model, messages, response_format=response_format,
+                                     max_output_tokens=kwargs.get('max_tokens') or LLM_EXPECTED_OUTPUT_TOKENS)
+    return await call_llm(model, lambda: client.beta.chat.completions.with_raw_response.parse(
+        model=model, messages=messages, response_format=response_format, **kwargs
+    ), tokens=tokens)
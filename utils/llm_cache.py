@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .cache import LRUCache
+
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR', os.path.join(os.getcwd(), 'cache', 'llm'))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(30 * 24 * 3600)))
+LLM_CACHE_MEMORY_SIZE = int(os.getenv('LLM_CACHE_MEMORY_SIZE', '512'))
+# Seconds between rebuilds of the disk index, which pick up the other processes' entries
+LLM_CACHE_RESCAN_INTERVAL = float(os.getenv('LLM_CACHE_RESCAN_INTERVAL', '300'))
+
+
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def make_llm_cache_key(model: str, system_prompt: str, model_class: Any, content: str) -> str:
+    """Content address of a structured completion
+
+    Any change to the model, the prompt, the response schema or the content yields a new key.
+    """
+    schema = json.dumps(model_class.model_json_schema(), sort_keys=True)
+    parts = [model, _sha256(system_prompt or ''), _sha256(schema), _sha256(content)]
+    return _sha256('|'.join(parts))
+
+
+class LLMResponseCache:
+    """Two tier cache of parsed LLM responses
+
+    Entries live in an in-process LRU in front of a directory of JSON files. The disk tier
+    is bounded in bytes and evicts the least recently read files first; entries older than
+    the TTL are ignored and removed. Writes go to a temporary file renamed into place, so
+    concurrent readers never see a partial entry.
+
+    The disk tier is tracked by an in-memory index ordered by access, updated on every
+    read and write, so an eviction only pops from its head. Processes sharing the
+    directory share the budget: the index is rebuilt from the directory every
+    ``rescan_interval`` seconds, counting and evicting the entries the other processes
+    wrote. All file I/O runs in the default executor, off the event loop.
+    """
+
+    def __init__(self, directory: str = LLM_CACHE_DIR, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 ttl: int = LLM_CACHE_TTL, memory_size: int = LLM_CACHE_MEMORY_SIZE,
+                 rescan_interval: float = LLM_CACHE_RESCAN_INTERVAL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.rescan_interval = rescan_interval
+        self.memory = LRUCache(max_size=memory_size, ttl=ttl)
+        # Never held during file I/O, only while touching the index and counters
+        self._lock = threading.Lock()
+        # key -> size in bytes, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._scanned_at: Optional[float] = None
+        self._scanning = False
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _touch(self, key: str, size: int) -> None:
+        """Record an access, caller holds the lock"""
+        self._total_bytes += size - self._index.get(key, 0)
+        self._index[key] = size
+        self._index.move_to_end(key)
+
+    def _forget(self, key: str) -> None:
+        """Drop a key from the index, caller holds the lock"""
+        self._total_bytes -= self._index.pop(key, 0)
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            self._forget(key)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _rescan(self) -> None:
+        """Rebuild the index from the directory, ordered by the files' access times
+
+        Runs on the first write and then every ``rescan_interval`` seconds, so the
+        entries written by other processes count against the budget.
+        """
+        with self._lock:
+            if self._scanning or (self._scanned_at is not None and time.time() - self._scanned_at < self.rescan_interval):
+                return
+            self._scanning = True
+        try:
+            entries = []
+            if os.path.isdir(self.directory):
+                for root, _, files in os.walk(self.directory):
+                    for name in files:
+                        if not name.endswith('.json'):
+                            continue
+                        try:
+                            stat = os.stat(os.path.join(root, name))
+                        except FileNotFoundError:
+                            continue
+                        entries.append((stat.st_atime, name[:-5], stat.st_size))
+            entries.sort()
+            with self._lock:
+                self._index = OrderedDict((key, size) for _, key, size in entries)
+                self._total_bytes = sum(self._index.values())
+                self._scanned_at = time.time()
+        finally:
+            self._scanning = False
+
+    def _evict(self) -> None:
+        """Drop the least recently read files until the directory fits the byte budget"""
+        victims = []
+        with self._lock:
+            while self._total_bytes > self.max_bytes and self._index:
+                key, size = self._index.popitem(last=False)
+                self._total_bytes -= size
+                victims.append(key)
+            self.evictions += len(victims)
+        for key in victims:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.ttl:
+                self._remove(key)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            # Bump the access time so rescans order by recency across processes,
+            # the mtime keeps the write time for the TTL
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            # Evicted by another process
+            with self._lock:
+                self._forget(key)
+            return None
+        except Exception as e:
+            logging.warning(f"Dropping unreadable LLM cache entry {path}: {str(e)}")
+            self._remove(key)
+            return None
+        with self._lock:
+            self._touch(key, stat.st_size)
+        return value
+
+    def _write(self, key: str, data: bytes) -> None:
+        self._rescan()
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        with self._lock:
+            self._touch(key, len(data))
+        self._evict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        value = await asyncio.get_event_loop().run_in_executor(None, self._read, key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.memory.set(key, value)
+        try:
+            data = json.dumps(value, default=str).encode('utf-8')
+            await asyncio.get_event_loop().run_in_executor(None, self._write, key, data)
+        except Exception as e:
+            logging.warning(f"Failed to write LLM cache entry {self._path(key)}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + self.disk_hits + self.misses
+        return {
+            "memory": memory,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_entries": len(self._index),
+            "disk_bytes": self._total_bytes,
+            "disk_max_bytes": self.max_bytes,
+            "disk_evictions": self.evictions,
+            "hit_rate": round((memory["hits"] + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared by every DataStructureService in the process
+llm_response_cache = LLMResponseCache()
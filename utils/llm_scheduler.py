@@ -0,0 +1,218 @@
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from core.database import AsyncPGSessionLocal
+from models.sql import LLMRateBudget
+
+INTERACTIVE = "interactive"
+BACKFILL = "backfill"
+
+# Priority of the LLM calls made by the current task, API requests are interactive by default
+llm_priority: contextvars.ContextVar = contextvars.ContextVar('llm_priority', default=INTERACTIVE)
+
+LLM_SCHEDULER_ENABLED = os.getenv('LLM_SCHEDULER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+LLM_TPM_LIMIT = int(os.getenv('LLM_TPM_LIMIT', '800000'))
+LLM_RPM_LIMIT = int(os.getenv('LLM_RPM_LIMIT', '5000'))
+# Share of the budget backfill work may use, the rest is kept for interactive requests
+LLM_BACKFILL_SHARE = float(os.getenv('LLM_BACKFILL_SHARE', '0.7'))
+LLM_SCHEDULER_MAX_WAIT = float(os.getenv('LLM_SCHEDULER_MAX_WAIT', '30'))
+# Seconds between two rate limit header corrections of a model's buckets by one process
+LLM_SCHEDULER_RECORD_INTERVAL = float(os.getenv('LLM_SCHEDULER_RECORD_INTERVAL', '1'))
+
+
+@contextmanager
+def backfill():
+    """Mark the LLM calls made inside the block (and tasks created in it) as backfill"""
+    token = llm_priority.set(BACKFILL)
+    try:
+        yield
+    finally:
+        llm_priority.reset(token)
+
+
+def _model_limit(prefix: str, model: str, default: int) -> int:
+    env_name = f"{prefix}_" + re.sub(r'[^A-Z0-9]', '_', model.upper())
+    return int(os.getenv(env_name, str(default)))
+
+
+def _parse_header(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        return float(headers[name]) if headers.get(name) is not None else None
+    except ValueError:
+        return None
+
+
+# Bucket levels refilled up to :now. They are computed from the row being updated, so an
+# UPDATE that waited on a concurrent one works from the committed levels, not a stale read.
+_TOKENS = "LEAST(tokens_limit, tokens_available + GREATEST(EXTRACT(EPOCH FROM (CAST(:now AS timestamp) - refilled_at)), 0) * tokens_limit / 60.0)"
+_REQUESTS = "LEAST(requests_limit, requests_available + GREATEST(EXTRACT(EPOCH FROM (CAST(:now AS timestamp) - refilled_at)), 0) * requests_limit / 60.0)"
+# A request bigger than the whole bucket could never be admitted, its cost is capped
+_COST = "LEAST(CAST(:tokens AS double precision), tokens_limit * CAST(:share AS double precision))"
+
+# Takes a request from the buckets only if they stay above the reserve, in one statement
+_ADMIT_SQL = text(f"""
+    UPDATE llm_rate_budgets
+    SET tokens_available = {_TOKENS} - {_COST},
+        requests_available = {_REQUESTS} - 1,
+        refilled_at = GREATEST(refilled_at, CAST(:now AS timestamp))
+    WHERE model = :model
+      AND {_TOKENS} - {_COST} >= tokens_limit * (1 - CAST(:share AS double precision))
+      AND {_REQUESTS} - 1 >= requests_limit * (1 - CAST(:share AS double precision))
+    RETURNING model
+""")
+
+# LEAST ignores NULLs, so a missing header leaves its bucket alone
+_RECORD_SQL = text(f"""
+    UPDATE llm_rate_budgets
+    SET tokens_available = LEAST({_TOKENS}, CAST(:tokens_remaining AS double precision), CASE WHEN CAST(:rate_limited AS boolean) THEN 0 END),
+        requests_available = LEAST({_REQUESTS}, CAST(:requests_remaining AS double precision), CASE WHEN CAST(:rate_limited AS boolean) THEN 0 END),
+        tokens_limit = COALESCE(CAST(:tokens_limit AS integer), tokens_limit),
+        requests_limit = COALESCE(CAST(:requests_limit AS integer), requests_limit),
+        refilled_at = GREATEST(refilled_at, CAST(:now AS timestamp))
+    WHERE model = :model
+""")
+
+
+class LLMScheduler:
+    """Token bucket admission control for LLM requests, shared across processes
+
+    Each model has a tokens-per-minute and a requests-per-minute bucket in the
+    ``llm_rate_budgets`` table. The buckets refill continuously and every process takes
+    from them with a single conditional ``UPDATE``, so no row lock outlives a statement.
+    Responses correct the buckets with the ``x-ratelimit-*`` headers, at most every
+    ``LLM_SCHEDULER_RECORD_INTERVAL`` seconds per model and process and on every 429, so
+    the shared view tracks what OpenAI actually sees. Backfill requests may only drain
+    the buckets down to a reserve kept for interactive ones.
+    """
+
+    def __init__(self, enabled: bool = LLM_SCHEDULER_ENABLED, record_interval: float = LLM_SCHEDULER_RECORD_INTERVAL):
+        self.enabled = enabled
+        self.record_interval = record_interval
+        # Models whose budget row this process has made sure exists
+        self._models = set()
+        self._recorded_at: Dict[str, float] = {}
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    @staticmethod
+    def _refilled(budget: LLMRateBudget, now: datetime) -> Tuple[float, float]:
+        elapsed = max((now - budget.refilled_at).total_seconds(), 0)
+        tokens = min(budget.tokens_limit, budget.tokens_available + elapsed * budget.tokens_limit / 60)
+        requests = min(budget.requests_limit, budget.requests_available + elapsed * budget.requests_limit / 60)
+        return tokens, requests
+
+    async def _create_budget(self, session, model: str) -> None:
+        tokens_limit = _model_limit('LLM_TPM_LIMIT', model, LLM_TPM_LIMIT)
+        requests_limit = _model_limit('LLM_RPM_LIMIT', model, LLM_RPM_LIMIT)
+        await session.execute(
+            insert(LLMRateBudget).values(
+                model=model,
+                tokens_limit=tokens_limit,
+                requests_limit=requests_limit,
+                tokens_available=tokens_limit,
+                requests_available=requests_limit,
+                refilled_at=datetime.utcnow(),
+            ).on_conflict_do_nothing(index_elements=['model'])
+        )
+        await session.commit()
+        self._models.add(model)
+
+    async def acquire(self, model: str, tokens: int) -> None:
+        """Wait until the model's buckets can pay for a request of ``tokens`` tokens"""
+        if not self.enabled:
+            return
+        priority = llm_priority.get()
+        share = 1.0 if priority == INTERACTIVE else LLM_BACKFILL_SHARE
+        waited = 0.0
+        while True:
+            try:
+                async with AsyncPGSessionLocal() as session:
+                    if model not in self._models:
+                        await self._create_budget(session, model)
+                    now = datetime.utcnow()
+                    result = await session.execute(_ADMIT_SQL, {'model': model, 'tokens': float(tokens), 'share': share, 'now': now})
+                    admitted = result.first() is not None
+                    await session.commit()
+                    if admitted:
+                        break
+
+                    # Only on the waiting path: read the buckets, without a lock, to size the wait
+                    result = await session.execute(select(LLMRateBudget).where(LLMRateBudget.model == model))
+                    budget = result.scalars().first()
+                    if budget is None:
+                        self._models.discard(model)
+                        continue
+                    tokens_available, requests_available = self._refilled(budget, now)
+                    cost = min(tokens, budget.tokens_limit * share)
+                    token_deficit = cost + budget.tokens_limit * (1 - share) - tokens_available
+                    request_deficit = 1 + budget.requests_limit * (1 - share) - requests_available
+                    delay = max(
+                        token_deficit * 60 / budget.tokens_limit,
+                        request_deficit * 60 / budget.requests_limit,
+                        0,
+                    )
+            except Exception as e:
+                # Fail open, the API's own 429s and the retry loop still protect us
+                logging.error(f"LLM scheduler unavailable, dispatching without admission control: {str(e)}")
+                return
+
+            if waited >= LLM_SCHEDULER_MAX_WAIT:
+                logging.warning(f"LLM scheduler waited {waited:.1f}s for {model}, dispatching anyway")
+                break
+            delay = min(delay, LLM_SCHEDULER_MAX_WAIT - waited) + random.uniform(0, 0.25)
+            logging.info(f"LLM scheduler holding {priority} request for {model} ({tokens} tokens) {delay:.2f}s")
+            self.waits += 1
+            self.waited_seconds += delay
+            waited += delay
+            await asyncio.sleep(delay)
+
+    async def record(self, model: str, headers: Mapping[str, str], rate_limited: bool = False) -> None:
+        """Correct the shared buckets with the rate limit headers of a response"""
+        if not self.enabled or headers is None:
+            return
+        tokens_limit = _parse_header(headers, 'x-ratelimit-limit-tokens')
+        tokens_remaining = _parse_header(headers, 'x-ratelimit-remaining-tokens')
+        requests_limit = _parse_header(headers, 'x-ratelimit-limit-requests')
+        requests_remaining = _parse_header(headers, 'x-ratelimit-remaining-requests')
+        if not rate_limited and tokens_remaining is None and requests_remaining is None:
+            return
+        # The headers are a correction, sampling them is enough outside of 429s
+        if not rate_limited and time.monotonic() - self._recorded_at.get(model, float('-inf')) < self.record_interval:
+            return
+        self._recorded_at[model] = time.monotonic()
+        try:
+            async with AsyncPGSessionLocal() as session:
+                await session.execute(_RECORD_SQL, {
+                    'model': model,
+                    'now': datetime.utcnow(),
+                    'tokens_remaining': tokens_remaining,
+                    'requests_remaining': requests_remaining,
+                    'tokens_limit': int(tokens_limit) if tokens_limit else None,
+                    'requests_limit': int(requests_limit) if requests_limit else None,
+                    'rate_limited': rate_limited,
+                })
+                await session.commit()
+        except Exception as e:
+            logging.error(f"Failed to record LLM rate limit headers: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "waits": self.waits,
+            "waited_seconds": round(self.waited_seconds, 2),
+        }
+
+
+# Shared by every LLM call in the process
+llm_scheduler = LLMScheduler()
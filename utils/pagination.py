@@ -0,0 +1,30 @@
+from typing import Dict, Any, Iterable
+import base64
+import json
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode the sort key of the last returned row as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str, keys: Iterable[str] = ()) -> Dict[str, Any]:
+    """Decode a cursor made by ``encode_cursor``
+
+    Args:
+        cursor (str): Opaque cursor from a previous page
+        keys (Iterable[str]): Sort key fields the cursor must carry
+
+    Returns:
+        Dict[str, Any]: Sort key of the last row of the previous page
+
+    Raises:
+        ValueError: The cursor is malformed or wasn't made by ``encode_cursor``
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict) or any(key not in values for key in keys):
+        raise ValueError("Invalid cursor")
+    return values
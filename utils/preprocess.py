@@ -0,0 +1,217 @@
+import logging
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from .tokens import count_tokens
+
+RESUME_PREPROCESS_ENABLED = os.getenv('RESUME_PREPROCESS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Prompt tokens a resume may use once cleaned, longer resumes are trimmed section by section
+RESUME_TOKEN_BUDGET = int(os.getenv('RESUME_TOKEN_BUDGET', '6000'))
+# Every section keeps at least this many tokens when trimming
+MIN_SECTION_TOKENS = int(os.getenv('RESUME_MIN_SECTION_TOKENS', '150'))
+# Lines shorter than this may legitimately repeat, e.g. a skill listed in two sections
+DEDUPE_MIN_CHARS = 30
+# Longest line still considered a section heading or page furniture
+MAX_HEADING_CHARS = 60
+MAX_FURNITURE_CHARS = 120
+
+# Heading text of each section, Italian and English, compared after normalize_heading
+SECTION_HEADINGS: Dict[str, List[str]] = {
+    'about': ['profilo', 'profilo personale', 'profilo professionale', 'chi sono', 'presentazione', 'sommario',
+              'obiettivi', 'obiettivo professionale', 'about', 'about me', 'summary', 'profile', 'objective'],
+    'contact': ['contatti', 'informazioni personali', 'dati personali', 'recapiti', 'contact', 'contacts',
+                'personal information', 'personal details'],
+    'experience': ['esperienza', 'esperienze', 'esperienza lavorativa', 'esperienze lavorative',
+                   'esperienza professionale', 'esperienze professionali', 'carriera', 'experience',
+                   'work experience', 'professional experience', 'employment', 'employment history', 'work history'],
+    'education': ['istruzione', 'formazione', 'istruzione e formazione', 'titolo di studio', 'titoli di studio',
+                  'percorso di studi', 'studi', 'education', 'education and training', 'academic background'],
+    'skills': ['competenze', 'capacita', 'capacita e competenze', 'competenze tecniche', 'competenze personali',
+               'competenze professionali', 'competenze digitali', 'competenze informatiche', 'conoscenze informatiche',
+               'hard skills', 'soft skills', 'skills', 'technical skills', 'key skills'],
+    'languages': ['lingue', 'lingue straniere', 'lingua madre', 'altre lingue', 'conoscenze linguistiche',
+                  'competenze linguistiche', 'languages', 'language skills'],
+    'certifications': ['certificazioni', 'certificati', 'attestati', 'corsi', 'corsi e certificazioni', 'patente',
+                       'patenti', 'certifications', 'certificates', 'licenses', 'courses'],
+    'projects': ['progetti', 'progetti personali', 'projects', 'personal projects'],
+    'achievements': ['risultati', 'riconoscimenti', 'premi', 'premi e riconoscimenti', 'achievements', 'awards',
+                     'honors'],
+    'publications': ['pubblicazioni', 'publications'],
+    'volunteer_work': ['volontariato', 'esperienze di volontariato', 'volunteer', 'volunteering', 'volunteer work'],
+}
+
+_HEADINGS = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+_PAGE_NUMBER = re.compile(r'^(?:pag(?:ina|e)?\.?\s*)?-?\s*\d{1,3}\s*(?:(?:/|di|of)\s*\d{1,3})?\s*-?$', re.IGNORECASE)
+_HYPHEN_BREAK = re.compile(r'(\w)-\n(?=[a-zà-ù])')
+_SPACES = re.compile(r'[ \t\u00a0\u2000-\u200b\u202f\u3000]+')
+
+
+def normalize_heading(line: str) -> str:
+    """Lowercase a line, strip accents, punctuation and bullets, for heading and furniture matching"""
+    line = unicodedata.normalize('NFKD', line.lower())
+    line = ''.join(c for c in line if not unicodedata.combining(c))
+    line = re.sub(r'[^a-z0-9 ]+', ' ', line)
+    return ' '.join(line.split())
+
+
+def heading_section(line: str) -> str:
+    """Section a heading line opens, or '' if the line isn't a heading"""
+    if not line or len(line) > MAX_HEADING_CHARS:
+        return ''
+    normalized = normalize_heading(line)
+    return _HEADINGS.get(normalized, '')
+
+
+def normalize_whitespace(text: str) -> str:
+    """Join hyphenated line breaks, collapse space runs and blank line runs, keep page breaks"""
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = _HYPHEN_BREAK.sub(r'\1', text)
+    pages = []
+    for page in text.split('\f'):
+        lines = [_SPACES.sub(' ', line).strip() for line in page.split('\n')]
+        page = '\n'.join(lines)
+        pages.append(re.sub(r'\n{3,}', '\n\n', page).strip('\n'))
+    return '\f'.join(pages)
+
+
+def strip_page_furniture(text: str) -> str:
+    """Drop page numbers and the header/footer lines repeated on most pages"""
+    pages = [page.split('\n') for page in text.split('\f')]
+    repeated = set()
+    if len(pages) >= 2:
+        # Lines seen on at least half the pages, compared with the digits masked so "Page 2" matches "Page 3"
+        seen = Counter()
+        for lines in pages:
+            seen.update({re.sub(r'\d+', '#', normalize_heading(line)) for line in lines
+                         if line and len(line) <= MAX_FURNITURE_CHARS})
+        threshold = max(2, (len(pages) + 1) // 2)
+        repeated = {line for line, count in seen.items() if count >= threshold and line}
+
+    kept = []
+    for lines in pages:
+        for line in lines:
+            if _PAGE_NUMBER.match(line):
+                continue
+            if line and len(line) <= MAX_FURNITURE_CHARS and re.sub(r'\d+', '#', normalize_heading(line)) in repeated \
+                    and not heading_section(line):
+                continue
+            kept.append(line)
+        kept.append('')
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(kept)).strip()
+
+
+def dedupe_lines(text: str) -> str:
+    """Drop consecutive duplicate lines, and repeats of long lines within a section
+
+    A long line repeated under another heading is kept, e.g. a company named in both
+    the experience and the projects sections.
+    """
+    seen = set()
+    kept = []
+    previous = None
+    for line in text.split('\n'):
+        key = normalize_heading(line)
+        if line and key == previous:
+            continue
+        if heading_section(line.strip()):
+            seen = set()
+        elif len(line) >= DEDUPE_MIN_CHARS:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+        previous = key if line else previous
+    return '\n'.join(kept)
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """Split resume text on recognised section headings
+
+    Returns:
+        List[Tuple[str, str]]: (section, text) pairs in document order. Text before the
+        first heading is the ``header`` section; a heading repeated later in the document
+        starts a new pair with the same name.
+    """
+    sections: List[Tuple[str, List[str]]] = [('header', [])]
+    for line in text.split('\n'):
+        section = heading_section(line.strip())
+        if section:
+            sections.append((section, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, '\n'.join(lines).strip()) for name, lines in sections if '\n'.join(lines).strip()]
+
+
+def _truncate_to_tokens(text: str, budget: int, model: str) -> str:
+    """Keep whole lines from the start of a section until the budget is spent"""
+    kept = []
+    used = 0
+    for line in text.split('\n'):
+        tokens = count_tokens(line, model) + 1
+        if used + tokens > budget:
+            break
+        kept.append(line)
+        used += tokens
+    return '\n'.join(kept)
+
+
+def fit_to_budget(text: str, budget: int, model: str = 'gpt-4o') -> str:
+    """Trim each section to a share of the budget proportional to its size
+
+    Sections keep their beginning, which in a resume holds the most recent roles. Each
+    first gets a floor of MIN_SECTION_TOKENS, lowered when there are too many sections
+    for the floors to fit, so no section disappears entirely; the rest of the budget
+    is shared in proportion to what the sections need beyond their floor.
+    """
+    sections = split_sections(text)
+    sizes = [count_tokens(section_text, model) for _, section_text in sections]
+    total = sum(sizes)
+    if total <= budget:
+        return text
+
+    # One token for the blank line joining each pair of sections
+    available = max(budget - (len(sections) - 1), 0)
+    floor = min(MIN_SECTION_TOKENS, available // len(sections))
+    floors = [min(size, floor) for size in sizes]
+    remaining = available - sum(floors)
+    wanted = total - sum(floors)
+
+    trimmed = []
+    for (name, section_text), size, section_floor in zip(sections, sizes, floors):
+        share = section_floor + (remaining * (size - section_floor) // wanted if wanted else 0)
+        if size > share:
+            logging.info(f"Trimming resume section {name} from {size} to {share} tokens")
+            section_text = _truncate_to_tokens(section_text, share, model)
+        if section_text:
+            trimmed.append(section_text)
+    return '\n\n'.join(trimmed)
+
+
+def preprocess_resume_text(text: str, budget: int = RESUME_TOKEN_BUDGET, model: str = 'gpt-4o') -> str:
+    """Clean extracted resume text and fit it to the prompt token budget
+
+    Args:
+        text (str): Text extracted by pdfminer or python-docx
+        budget (int): Maximum prompt tokens of the cleaned text
+        model (str): Model whose tokenizer counts the tokens
+
+    Returns:
+        str: The cleaned text
+    """
+    if not RESUME_PREPROCESS_ENABLED or not text:
+        return text
+
+    before = count_tokens(text, model)
+    cleaned = normalize_whitespace(text)
+    cleaned = strip_page_furniture(cleaned)
+    cleaned = dedupe_lines(cleaned)
+    cleaned = fit_to_budget(cleaned, budget, model)
+    after = count_tokens(cleaned, model)
+
+    saved = round(100 * (before - after) / before, 1) if before else 0.0
+    logging.info(f"Resume preprocessing: {before} -> {after} tokens ({saved}% saved)")
+    return cleaned
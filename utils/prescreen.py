@@ -0,0 +1,164 @@
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import logging
+import os
+import re
+
+# Candidates evaluated by the LLM when the request doesn't say, unset evaluates everyone
+PRESCREEN_TOP_N = int(os.getenv('PRESCREEN_TOP_N')) if os.getenv('PRESCREEN_TOP_N') else None
+# Days after which a candidate's last Jobby job counts half as recent
+PRESCREEN_RECENCY_HALF_LIFE_DAYS = float(os.getenv('PRESCREEN_RECENCY_HALF_LIFE_DAYS', '180'))
+
+# Share of each signal in the pre-screen score, they add up to 1
+PRESCREEN_WEIGHTS = {
+    'skills': 0.35,
+    'keywords': 0.25,
+    'location': 0.15,
+    'rating': 0.10,
+    'completeness': 0.05,
+    'recency': 0.10,
+}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+# Words too common in requirement texts to tell candidates apart
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'who', 'are', 'has', 'have', 'from', 'our', 'you', 'your', 'will', 'can',
+    'years', 'year', 'experience', 'required', 'looking', 'candidate', 'candidates',
+    'che', 'per', 'con', 'del', 'della', 'delle', 'dei', 'degli', 'nel', 'nella', 'una', 'uno', 'gli',
+    'anni', 'anno', 'esperienza', 'cerchiamo', 'candidato', 'candidata', 'candidati', 'richiesta', 'richiesto',
+}
+
+# Fields that make a profile complete, each counts the same
+COMPLETENESS_FIELDS = [
+    'name', 'email', 'phone', 'location', 'about', 'skills', 'experience', 'education', 'languages',
+    'jobby_name', 'jobby_email', 'jobby_telephone', 'jobby_gender',
+]
+
+
+def tokenize(value: Any) -> set:
+    """Lowercase words of the string leaves of a JSON value, without stopwords and short words"""
+    if isinstance(value, str):
+        return {word for word in _WORD.findall(value.lower()) if len(word) > 2 and word not in STOPWORDS}
+    if isinstance(value, dict):
+        return set().union(*[tokenize(item) for item in value.values()]) if value else set()
+    if isinstance(value, (list, tuple)):
+        return set().union(*[tokenize(item) for item in value]) if value else set()
+    return set()
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace('T', ' ')[:26])
+        except ValueError:
+            return None
+    return None
+
+
+class PreScreener:
+    """Cheap local ranking of candidates against a requirement text
+
+    Scores the whole candidate set at once with NumPy, so the LLM evaluation can be
+    spent on the most promising candidates only. Every signal is scaled to 0-1 and
+    combined with PRESCREEN_WEIGHTS:
+
+    - skills: share of requirement words found in skills, tags and certifications
+    - keywords: share of requirement words found anywhere in the profile
+    - location: the candidate's location is mentioned in the requirements
+    - rating: Jobby rating out of 5
+    - completeness: share of the profile fields filled in
+    - recency: halves every PRESCREEN_RECENCY_HALF_LIFE_DAYS since the last Jobby job
+    """
+
+    def __init__(self, weights: Dict[str, float] = None, half_life_days: float = PRESCREEN_RECENCY_HALF_LIFE_DAYS):
+        self.weights = weights or PRESCREEN_WEIGHTS
+        self.half_life_days = half_life_days
+
+    def score(self, candidates: List[Dict], compare_with: str, now: Optional[datetime] = None) -> np.ndarray:
+        """Pre-screen score of each candidate
+
+        Args:
+            candidates (List[Dict]): Candidate rows
+            compare_with (str): Search text or requirements to compare against
+            now (Optional[datetime]): Reference time for recency, the current time by default
+
+        Returns:
+            np.ndarray: Scores between 0 and 1, in the order of ``candidates``
+        """
+        if not candidates:
+            return np.zeros(0)
+        now = now or datetime.now()
+        vocabulary = sorted(tokenize(compare_with))
+        index = {word: i for i, word in enumerate(vocabulary)}
+
+        # One row per candidate, one column per requirement word
+        skill_matrix = np.zeros((len(candidates), len(vocabulary)), dtype=bool)
+        profile_matrix = np.zeros((len(candidates), len(vocabulary)), dtype=bool)
+        location = np.zeros(len(candidates))
+        rating = np.zeros(len(candidates))
+        completeness = np.zeros(len(candidates))
+        days_since_job = np.full(len(candidates), np.inf)
+
+        for row, candidate in enumerate(candidates):
+            skill_words = tokenize([candidate.get(field) for field in ('skills', 'jobby_skills', 'tags', 'certifications', 'jobby_certifications')])
+            profile_words = skill_words | tokenize([candidate.get(field) for field in ('about', 'jobby_about', 'experience', 'education', 'languages', 'jobby_jobs', 'projects')])
+            skill_matrix[row, [index[word] for word in skill_words if word in index]] = True
+            profile_matrix[row, [index[word] for word in profile_words if word in index]] = True
+
+            location_words = tokenize([candidate.get('jobby_location'), candidate.get('location')])
+            location[row] = 1.0 if location_words and location_words & index.keys() else 0.0
+            rating[row] = candidate.get('jobby_rating') or 0.0
+            completeness[row] = sum(1 for field in COMPLETENESS_FIELDS if candidate.get(field)) / len(COMPLETENESS_FIELDS)
+
+            jobby_jobs = candidate.get('jobby_jobs')
+            last_job_done = _parse_datetime(jobby_jobs.get('last_job_done')) if isinstance(jobby_jobs, dict) else None
+            if last_job_done:
+                days_since_job[row] = max((now - last_job_done).total_seconds() / 86400, 0.0)
+
+        if vocabulary:
+            skills = skill_matrix.mean(axis=1)
+            keywords = profile_matrix.mean(axis=1)
+        else:
+            skills = keywords = np.zeros(len(candidates))
+
+        signals = {
+            'skills': skills,
+            'keywords': keywords,
+            'location': location,
+            'rating': np.clip(rating / 5.0, 0.0, 1.0),
+            'completeness': completeness,
+            # 0.5 ** inf is 0, candidates without jobs get no recency
+            'recency': np.power(0.5, days_since_job / self.half_life_days),
+        }
+        return sum(self.weights.get(name, 0.0) * values for name, values in signals.items())
+
+    def select(self, candidates: List[Dict], compare_with: str,
+               top_n: Optional[int] = None, min_score: Optional[float] = None) -> Tuple[List[Tuple[Dict, float]], List[Tuple[Dict, float]]]:
+        """Split candidates into those worth an LLM evaluation and the rest
+
+        Args:
+            candidates (List[Dict]): Candidate rows
+            compare_with (str): Search text or requirements to compare against
+            top_n (Optional[int]): Keep at most this many of the best candidates
+            min_score (Optional[float]): Keep only candidates scoring at least this
+
+        Returns:
+            Tuple: (candidate, score) pairs kept and left out, each best first
+        """
+        scores = self.score(candidates, compare_with)
+        # Stable sort, ties keep the requested order
+        order = np.argsort(-scores, kind='stable')
+        keep = np.ones(len(candidates), dtype=bool)
+        if min_score is not None:
+            keep &= scores[order] >= min_score
+        if top_n is not None:
+            keep[top_n:] = False
+
+        ranked = [(candidates[i], round(float(scores[i]), 4)) for i in order]
+        selected = [pair for pair, kept in zip(ranked, keep) if kept]
+        rest = [pair for pair, kept in zip(ranked, keep) if not kept]
+        logging.info(f"Pre-screen kept {len(selected)} of {len(candidates)} candidates")
+        return selected, rest
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+
+from .cache import LRUCache
+
+SQL_CACHE_SIZE = int(os.getenv('SQL_CACHE_SIZE', '1024'))
+SQL_CACHE_TTL = int(os.getenv('SQL_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Words that don't change the intent of a recruiter query
+STOP_WORDS = {
+    # Italian
+    'a', 'ad', 'al', 'alla', 'alle', 'allo', 'ai', 'agli', 'che', 'chi', 'con', 'cui', 'da', 'dal',
+    'dalla', 'dei', 'del', 'della', 'delle', 'dello', 'degli', 'di', 'e', 'ed', 'gli', 'i', 'il',
+    'in', 'la', 'le', 'lo', 'nei', 'nel', 'nella', 'per', 'su', 'sul', 'sulla', 'tra', 'fra', 'un',
+    'una', 'uno', 'trova', 'trovami', 'cerca', 'cerco', 'candidati', 'candidato',
+    # English
+    'an', 'and', 'the', 'of', 'for', 'with', 'to', 'at', 'on', 'who', 'find', 'me', 'search',
+    'candidates', 'candidate', 'show', 'list',
+}
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a natural language query for cache lookups
+
+    Lowercases, strips accents and punctuation, drops stop words and collapses whitespace,
+    so "Cuochi a  Milano" and "cuochi milano" share an entry.
+    """
+    query = unicodedata.normalize('NFKD', query.lower())
+    query = ''.join(c for c in query if not unicodedata.combining(c))
+    words = re.findall(r"[a-z0-9+#.]+", query)
+    words = [word.strip('.') for word in words if word.strip('.') and word.strip('.') not in STOP_WORDS]
+    return ' '.join(words)
+
+
+def make_cache_key(normalized_query: str, fingerprint: str) -> str:
+    return hashlib.sha256(f"{fingerprint}|{normalized_query}".encode('utf-8')).hexdigest()
+
+
+class SQLTranslationCache:
+    """Two tier cache for natural language to SQL translations
+
+    An in-process LRU answers repeated queries on the same worker, the
+    ``sql_translation_cache`` table shares translations across workers and restarts.
+    Only SQL that passed validation and executed is ever stored.
+    """
+
+    def __init__(self, max_size: int = SQL_CACHE_SIZE, ttl: int = SQL_CACHE_TTL):
+        self.ttl = ttl
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.db_hits = 0
+        self.misses = 0
+
+    async def get(self, db: AsyncSession, query: str, fingerprint: str) -> Optional[str]:
+        """Get the cached SQL for a query, or None on a miss"""
+        from models.sql import SQLTranslation
+
+        normalized = normalize_query(query)
+        key = make_cache_key(normalized, fingerprint)
+
+        sql = self.memory.get(key)
+        if sql is not None:
+            logging.info(f"SQL cache hit (memory) for: {normalized}")
+            return sql
+
+        try:
+            # Count the hit and fetch the SQL in a single round trip
+            result = await db.execute(
+                update(SQLTranslation)
+                .where(SQLTranslation.cache_key == key, SQLTranslation.expires_at > datetime.utcnow())
+                .values(hits=SQLTranslation.hits + 1, last_hit_at=datetime.utcnow())
+                .returning(SQLTranslation.sql, SQLTranslation.expires_at)
+            )
+            row = result.first()
+            await db.commit()
+        except Exception as e:
+            logging.error(f"Error reading SQL cache: {str(e)}")
+            await db.rollback()
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.db_hits += 1
+        logging.info(f"SQL cache hit (database) for: {normalized}")
+        remaining = (row.expires_at - datetime.utcnow()).total_seconds()
+        self.memory.set(key, row.sql, ttl=max(remaining, 0))
+        return row.sql
+
+    async def set(self, db: AsyncSession, query: str, fingerprint: str, sql: str) -> None:
+        """Store a validated SQL translation in both tiers"""
+        from models.sql import SQLTranslation
+
+        normalized = normalize_query(query)
+        key = make_cache_key(normalized, fingerprint)
+        self.memory.set(key, sql)
+
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        stmt = insert(SQLTranslation).values(
+            cache_key=key,
+            normalized_query=normalized,
+            sql=sql,
+            hits=0,
+            expires_at=expires_at,
+            created_at=datetime.utcnow(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['cache_key'],
+            set_={'sql': stmt.excluded.sql, 'expires_at': stmt.excluded.expires_at}
+        )
+        try:
+            await db.execute(stmt)
+            await db.commit()
+        except Exception as e:
+            logging.error(f"Error writing SQL cache: {str(e)}")
+            await db.rollback()
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + self.db_hits + self.misses
+        return {
+            "memory": memory,
+            "database_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round((memory["hits"] + self.db_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared by every converter in the process
+sql_translation_cache = SQLTranslationCache()
@@ -1,15 +1,122 @@
+import asyncio
+import hashlib
+import json
+import logging
 import os
-from typing import Dict, Any
-from openai import OpenAI
-from models.resume_it import ResumeData
+from typing import Dict, Any, List, Tuple
+from models.resume_it import ResumeData, ProfileSection, ExperienceSection, EducationSection, SkillsSection, ExtrasSection
 from .system_prompts import resume_english, resume_italian
+from .llm_cache import llm_response_cache, make_llm_cache_key, LLM_CACHE_ENABLED
+from .llm import parse_completion
+from .preprocess import split_sections, fit_to_budget
+from .tokens import count_tokens
+
+STRUCTURE_MODEL = "gpt-4o-2024-08-06"
+# Bump when the resume prompts, the chunking or the preprocessing change what a resume text structures to
+RESUME_PROMPT_VERSION = "1"
+# Stored next to reusable structures, ResumeData schema changes bump it on their own
+RESUME_STRUCTURE_VERSION = f"{STRUCTURE_MODEL}:{RESUME_PROMPT_VERSION}:" + hashlib.sha256(
+    json.dumps(ResumeData.model_json_schema(), sort_keys=True).encode('utf-8')
+).hexdigest()[:12]
+
+# Resumes longer than this are structured section by section, concurrently
+RESUME_CHUNKED_THRESHOLD = int(os.getenv('RESUME_CHUNKED_THRESHOLD', '3000'))
+# Largest chunk sent in one request, long sections are split on line boundaries
+RESUME_CHUNK_MAX_TOKENS = int(os.getenv('RESUME_CHUNK_MAX_TOKENS', '1500'))
+# Sample of the whole resume given to the profile chunk, for the name, contacts and tags
+PROFILE_CONTEXT_TOKENS = 1200
+
+# Sub-model structuring each detected section, undetected sections only feed the profile
+SECTION_MODELS = {
+    'experience': ExperienceSection,
+    'volunteer_work': ExperienceSection,
+    'education': EducationSection,
+    'skills': SkillsSection,
+    'languages': SkillsSection,
+    'certifications': SkillsSection,
+    'projects': ExtrasSection,
+    'achievements': ExtrasSection,
+    'publications': ExtrasSection,
+}
+
+
+def _split_chunk(text: str, max_tokens: int) -> List[str]:
+    """Split a section into pieces of at most max_tokens, on blank lines where possible"""
+    chunks, current, used = [], [], 0
+    for line in text.split('\n'):
+        tokens = count_tokens(line) + 1
+        # Prefer to cut at a blank line once the chunk is half full, an entry usually ends there
+        if current and (used + tokens > max_tokens or (not line.strip() and used > max_tokens // 2)):
+            chunks.append('\n'.join(current).strip())
+            current, used = [], 0
+        current.append(line)
+        used += tokens
+    if current and '\n'.join(current).strip():
+        chunks.append('\n'.join(current).strip())
+    return chunks
+
+
+def plan_resume_chunks(content: str) -> List[Tuple[Any, str]]:
+    """Split a resume into (sub-model, text) requests, in document order, profile first"""
+    grouped: Dict[Any, List[str]] = {}
+    for section, text in split_sections(content):
+        model_class = SECTION_MODELS.get(section)
+        if model_class is not None:
+            grouped.setdefault(model_class, []).append(text)
+
+    plan = [(ProfileSection, fit_to_budget(content, PROFILE_CONTEXT_TOKENS))]
+    for model_class, texts in grouped.items():
+        for chunk in _split_chunk('\n\n'.join(texts), RESUME_CHUNK_MAX_TOKENS):
+            plan.append((model_class, chunk))
+    return plan
+
+
+def _dedupe(items: List[Any], key) -> List[Any]:
+    seen = set()
+    unique = []
+    for item in items:
+        item_key = key(item)
+        if item_key in seen:
+            continue
+        seen.add(item_key)
+        unique.append(item)
+    return unique
+
+
+def merge_resume_chunks(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge structured chunks into one ResumeData, deterministically
+
+    Lists are concatenated in chunk order and deduplicated, scalars keep the first
+    non-empty value, experiences are renumbered in order.
+    """
+    merged: Dict[str, Any] = {}
+    for part in parts:
+        for field, value in part.items():
+            if isinstance(value, list):
+                merged.setdefault(field, []).extend(value)
+            elif merged.get(field) in (None, '') and value not in (None, ''):
+                merged[field] = value
+
+    for field, value in merged.items():
+        if isinstance(value, list) and all(isinstance(item, str) for item in value):
+            merged[field] = _dedupe(value, lambda item: item.strip().lower())
+    merged['experience'] = _dedupe(
+        merged.get('experience', []),
+        lambda item: (item['company'].strip().lower(), item['title'].strip().lower(), item['start_date']),
+    )
+    merged['education'] = _dedupe(
+        merged.get('education', []),
+        lambda item: (item['institution'].strip().lower(), item['degree'].strip().lower(), item.get('start_date')),
+    )
+    for index, experience in enumerate(merged['experience'], start=1):
+        experience['experience_id'] = str(index)
+    return ResumeData.model_validate(merged).model_dump()
 
 class DataStructureService:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         self.system_prompt = "Extract structured information from the provided text."
 
-    def structure_data(self, content: str, model_class: Any, system_prompt: str = None) -> Dict[str, ResumeData]:
+    async def structure_data(self, content: str, model_class: Any, system_prompt: str = None, use_cache: bool = True) -> Dict[str, ResumeData]:
         """Extract structured information from unstructured text using OpenAI
 
         Args:
@@ -17,6 +124,7 @@ class DataStructureService:
             model_class (Any): The Pydantic model class to use for structuring the data
             system_prompt (str, optional): Custom system prompt for the extraction.
                                          Defaults to a generic extraction prompt.
+            use_cache (bool, optional): Serve and store the result in the LLM response cache.
 
         Returns:
             Dict[str, Any]: Dictionary containing the original content and structured data
@@ -24,9 +132,19 @@ class DataStructureService:
         if system_prompt is not None:
             self.system_prompt = system_prompt
 
-        # Use OpenAI to extract structured information
-        completion = self.client.beta.chat.completions.parse(
-            model="gpt-4o-2024-08-06",
+        use_cache = use_cache and LLM_CACHE_ENABLED
+        if use_cache:
+            cache_key = make_llm_cache_key(STRUCTURE_MODEL, self.system_prompt, model_class, content)
+            cached = await llm_response_cache.get(cache_key)
+            if cached is not None:
+                return {
+                    'content': content,
+                    'parsed_data': cached
+                }
+
+        # Use OpenAI to extract structured information, through the shared client and governor
+        completion = await parse_completion(
+            model=STRUCTURE_MODEL,
             messages=[
                 {"role": "system", "content": self.system_prompt},
                 {"role": "user", "content": content}
@@ -34,25 +152,71 @@ class DataStructureService:
             response_format=model_class,
         )
 
-        parsed_data = completion.choices[0].message.parsed
+        parsed_data = completion.choices[0].message.parsed.model_dump()
+        if use_cache:
+            await llm_response_cache.set(cache_key, parsed_data)
 
         return {
             'content': content,
-            'parsed_data': parsed_data.model_dump()
+            'parsed_data': parsed_data
         }
 
-    def structure_resume_data(self, content: str) -> Dict[str, ResumeData]:
-        """Legacy method for resume parsing, uses the generic structure_data method"""
-        return self.structure_data(
+    async def structure_resume_data(self, content: str) -> Dict[str, ResumeData]:
+        """Legacy method for resume parsing, uses the generic structure_data method
+
+        Long resumes go through structure_resume_chunked instead.
+        """
+        if count_tokens(content) > RESUME_CHUNKED_THRESHOLD:
+            plan = plan_resume_chunks(content)
+            if len(plan) > 2:
+                return await self.structure_resume_chunked(content, plan)
+        return await self.structure_data(
             content=content,
             model_class=ResumeData,
             system_prompt="Extract structured information from the resume text."
         )
+
+    async def structure_resume_chunked(self, content: str, plan: List[Tuple[Any, str]]) -> Dict[str, Any]:
+        """Structure each section of a long resume concurrently and merge the results
+
+        Falls back to a single request over the whole text if any chunk fails.
+
+        Args:
+            content (str): The whole resume text
+            plan (List[Tuple[Any, str]]): (sub-model, text) pairs from plan_resume_chunks
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the original content and the merged ResumeData
+        """
+        logging.info(f"Structuring long resume in {len(plan)} chunks")
+        results = await asyncio.gather(*[
+            # A fresh service per chunk, structure_data keeps the prompt on the instance
+            DataStructureService().structure_data(
+                content=text,
+                model_class=model_class,
+                system_prompt="Extract structured information from this part of the resume text. Only extract what it contains."
+            )
+            for model_class, text in plan
+        ], return_exceptions=True)
+
+        failed = [result for result in results if isinstance(result, BaseException)]
+        if failed:
+            logging.error(f"{len(failed)} of {len(plan)} resume chunks failed, structuring the whole resume: {str(failed[0])}")
+            return await self.structure_data(
+                content=content,
+                model_class=ResumeData,
+                system_prompt="Extract structured information from the resume text."
+            )
+
+        return {
+            'content': content,
+            'parsed_data': merge_resume_chunks([result['parsed_data'] for result in results])
+        }
     
-    def struture_resume_with_blended_jobby_data(self, content: str) -> Dict[str, Any]:
+    async def struture_resume_with_blended_jobby_data(self, content: str) -> Dict[str, Any]:
         """Blend resume data with jobby data for a comprehensive profile"""
         # Placeholder for blending logic
-        return self.structure_data(
+        return await self.structure_data(
             content=content,
             model_class=ResumeData,
             system_prompt=resume_english
@@ -1,16 +1,19 @@
 from typing import Dict, Any, Optional, List
-from openai import OpenAI
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import PGBase
+from utils.sql_cache import sql_translation_cache
+from utils.llm import chat_completion
+import hashlib
 import logging
 import os
 
+# Bump whenever the prompts in convert_to_sql/execute_query change so cached translations are not reused
+PROMPT_VERSION = "4"
+
 class TextToSQLConverter:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
     def get_table_schema(self, table_names: Optional[List[str]] = None) -> str:
         """Get database schema information for context"""
@@ -71,8 +74,27 @@ class TextToSQLConverter:
             volunteer_work JSONB,
             professional_links JSONB,
             created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
-        );"""]
+            updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+
+            -- ' | ' separated text of the JSONB arrays, trigram indexed for ILIKE
+            skills_text TEXT, -- skills and jobby_skills
+            languages_text TEXT, -- languages
+            certifications_text TEXT, -- certifications and jobby_certifications
+            experience_text TEXT, -- experience titles, companies, descriptions and locations
+            tags_text TEXT -- tags
+        );
+        -- GIN trigram (gin_trgm_ops) indexes, used by ILIKE '%term%'
+        CREATE INDEX ix_candidate_resumes_location_trgm ON candidate_resumes USING GIN (location gin_trgm_ops);
+        CREATE INDEX ix_candidate_resumes_about_trgm ON candidate_resumes USING GIN (about gin_trgm_ops);
+        CREATE INDEX ix_candidate_resumes_jobby_about_trgm ON candidate_resumes USING GIN (jobby_about gin_trgm_ops);
+        CREATE INDEX ix_candidate_resumes_skills_text_trgm ON candidate_resumes USING GIN (skills_text gin_trgm_ops);
+        CREATE INDEX ix_candidate_resumes_languages_text_trgm ON candidate_resumes USING GIN (languages_text gin_trgm_ops);
+        CREATE INDEX ix_candidate_resumes_certifications_text_trgm ON candidate_resumes USING GIN (certifications_text gin_trgm_ops);
+        CREATE INDEX ix_candidate_resumes_experience_text_trgm ON candidate_resumes USING GIN (experience_text gin_trgm_ops);
+        CREATE INDEX ix_candidate_resumes_tags_text_trgm ON candidate_resumes USING GIN (tags_text gin_trgm_ops);
+        -- GIN (jsonb_path_ops) indexes, used by the @> containment operator
+        CREATE INDEX ix_candidate_resumes_tags_gin ON candidate_resumes USING GIN (tags jsonb_path_ops);
+        CREATE INDEX ix_candidate_resumes_jobby_jobs_gin ON candidate_resumes USING GIN (jobby_jobs jsonb_path_ops);"""]
         return '\n'.join(schema)
         logging.info(f"Table names: {table_names}")
         for table in PGBase.metadata.sorted_tables:
@@ -83,7 +105,12 @@ class TextToSQLConverter:
             schema.append(f"CREATE TABLE {table.name} ({', '.join(columns)})")
         return '\n'.join(schema)
 
-    def convert_to_sql(self, query: str, table_names: Optional[List[str]] = None, additional_context: str="") -> str:
+    def prompt_fingerprint(self, table_names: Optional[List[str]] = None, additional_context: str="") -> str:
+        """Hash of everything besides the query that shapes the generated SQL"""
+        schema = self.get_table_schema(table_names)
+        return hashlib.sha256(f"{PROMPT_VERSION}|{schema}|{additional_context}".encode('utf-8')).hexdigest()
+
+    async def convert_to_sql(self, query: str, table_names: Optional[List[str]] = None, additional_context: str="") -> str:
         """Convert natural language query to SQL"""
         schema = self.get_table_schema(table_names)
 
@@ -122,13 +149,15 @@ class TextToSQLConverter:
              Try to do proximity search on skills, certifications, experience, education, language using ilike oparator.
              FOR A VALID QUERY RETURN only the user_id. Add a limit of 50.
              ALLWAYS use COALESCE when extracting values from JSONB fields.
+             All JSONB columns are stored as native JSONB, NEVER cast them with ::jsonb.
+             For exact values prefer the indexed @> operator, e.g. tags @> '["cuoco"]' or jobby_jobs @> '{"categories": [{"category": "Ristorazione"}]}'.
              DO NOT include any other information in the response.
              """},
             {"role": "user", "content": f"### Postgres SQL table with properties:\n{schema}\n ### Additional Information: \n{additional_context}\n ### {query}\n### SQL Query:"}
         ]
 
-        # Generate SQL query using GPT-4
-        response = self.client.chat.completions.create(
+        # Generate SQL query using GPT-4, through the shared client and governor
+        response = await chat_completion(
             model="gpt-4o",
             messages=messages,
             temperature=0,
@@ -146,7 +175,7 @@ class TextToSQLConverter:
 
         return sql_query.strip()
 
-    def execute_query(self, query: str, table_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    async def execute_query(self, query: str, table_names: Optional[List[str]] = None) -> Dict[str, Any]:
         """Execute the generated SQL query"""
         try:
             if not os.getenv('OPENAI_API_KEY'):
@@ -154,6 +183,9 @@ class TextToSQLConverter:
             additional_context = """
             Try to do proximity search on skills, certifications, experience, education, language using ilike oparator.
             Use ILIKE operator for fuzzy search.
+            For skills, languages, certifications, experience and tags search the trigram indexed
+            skills_text, languages_text, certifications_text, experience_text and tags_text columns
+            with ILIKE instead of expanding the JSONB arrays.
             You may decide to search in descriptions feilds or about coloumn as well.
             Exact match may not be available.
                 Some examples:
@@ -161,29 +193,25 @@ class TextToSQLConverter:
                 Answer:
                     SELECT user_id
                     FROM candidate_resumes
-                    WHERE EXISTS (
-                        SELECT 1
-                        FROM jsonb_array_elements_text(skills::JSONB) AS skill
-                        WHERE skill ILIKE '%cook%'
-                    )
+                    WHERE skills_text ILIKE '%cook%'
                     LIMIT 50;
                 Question: Candidates worked in RANDSTAD
                 Answer:
                     SELECT user_id
                     FROM candidate_resumes
-                    WHERE EXISTS (
-                        SELECT 1
-                        FROM jsonb_array_elements(experience::JSONB) AS experience_element
-                        WHERE experience_element->>'company' ILIKE '%RANDSTAD%'
-                    )
+                    WHERE experience_text ILIKE '%RANDSTAD%'
                     OR EXISTS (
                         SELECT 1
-                        FROM jsonb_array_elements(jobby_jobs::JSONB -> 'categories') AS category_element
+                        FROM jsonb_array_elements(jobby_jobs -> 'categories') AS category_element
                         WHERE category_element->>'category' ILIKE '%RANDSTAD%'
                     )
                     LIMIT 50;"""
-            sql = self.convert_to_sql(query, table_names, additional_context)
-            logging.info(f"Generated SQL: {sql}")
+            fingerprint = self.prompt_fingerprint(table_names, additional_context)
+            sql = await sql_translation_cache.get(self.db, query, fingerprint)
+            cached = sql is not None
+            if not cached:
+                sql = await self.convert_to_sql(query, table_names, additional_context)
+                logging.info(f"Generated SQL: {sql}")
 
             if sql == "False":
                 raise ValueError("Unable to generate valid SQL query.")
@@ -197,7 +225,7 @@ class TextToSQLConverter:
             logging.info(f"Sanitized SQL: {sql}")
 
             # Execute SQL query
-            result = self.db.execute(text(sql))
+            result = await self.db.execute(text(sql))
 
             # Properly format results by fetching all rows and converting to dict
             rows = result.fetchall()
@@ -210,11 +238,17 @@ class TextToSQLConverter:
                 formatted_results = [{'user_id': dict(zip(columns, row))['user_id']} for row in rows]
 
             logging.info(f"Query Results: {formatted_results}")
+            if not cached:
+                # Only SQL that passed validation and ran is worth reusing
+                await sql_translation_cache.set(self.db, query, fingerprint, sql)
             return {
                 'sql': sql,
-                'results': formatted_results
+                'results': formatted_results,
+                'cached': cached
             }
         except Exception as e:
+            # A failed statement aborts the transaction, reset it so the session stays usable
+            await self.db.rollback()
             return {
                 'error': str(e),
                 'sql': sql if 'sql' in locals() else None
@@ -0,0 +1,45 @@
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+# Fallback ratio when no tokenizer is available, OpenAI's rule of thumb for English and Italian
+CHARS_PER_TOKEN = 4
+# Per message framing tokens added by the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('o200k_base')
+    except Exception as e:
+        # tiktoken missing, or its BPE files can't be fetched
+        logging.warning(f"Tokenizer unavailable for {model}, estimating tokens from length: {str(e)}")
+        return None
+
+
+def count_tokens(text: str, model: str = 'gpt-4o') -> int:
+    """Count the tokens of a text with the model's local tokenizer"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def estimate_request_tokens(model: str, messages: List[Dict[str, str]], response_format: Any = None,
+                            max_output_tokens: Optional[int] = None) -> int:
+    """Estimate the tokens a chat request counts against the TPM limit
+
+    Prompt tokens of every message and of the response JSON schema, plus the output allowance.
+    """
+    tokens = sum(count_tokens(message.get('content') or '', model) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+    if response_format is not None and hasattr(response_format, 'model_json_schema'):
+        tokens += count_tokens(json.dumps(response_format.model_json_schema()), model)
+    return tokens + (max_output_tokens or 0)
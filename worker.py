@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import signal
+import socket
+import asyncio
+import logging
+import multiprocessing
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(process)d - %(message)s',
+    handlers=[
+        logging.FileHandler('worker.log', mode='a'),
+        logging.StreamHandler(sys.stdout)
+    ],
+    force=True
+)
+
+logger = logging.getLogger('jobby.worker')
+
+POLL_INTERVAL_SECONDS = float(os.getenv('RESUME_WORKER_POLL_INTERVAL', '2'))
+
+
+async def work(worker_id: str, stop: multiprocessing.Event):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from core.database import AsyncSessionLocal, AsyncPGSessionLocal
+    from services import ServiceManager
+    from logic.jobs import claim_next_job, complete_job, fail_job
+    from logic.resume import parse_candidate_resume
+    from utils.llm_scheduler import llm_priority, BACKFILL
+
+    # Queue work yields the LLM budget to interactive API requests
+    llm_priority.set(BACKFILL)
+
+    while not stop.is_set():
+        db = AsyncSessionLocal()
+        pg_db = AsyncPGSessionLocal()
+        try:
+            job = await claim_next_job(pg_db, worker_id)
+            if not job:
+                await asyncio.sleep(POLL_INTERVAL_SECONDS)
+                continue
+
+            service_manager = ServiceManager(db)
+
+            try:
+                result = await parse_candidate_resume(service_manager, pg_db, job.candidate_id, job.blend)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+            if result.get("error") or result.get("success") is False:
+                await fail_job(pg_db, job, str(result.get("error")))
+            else:
+                await complete_job(pg_db, job, result)
+        except Exception as e:
+            logger.error(f"Worker {worker_id} error: {str(e)}")
+            await pg_db.rollback()
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        finally:
+            await pg_db.close()
+            await db.close()
+
+
+def run_worker(index: int, stop: multiprocessing.Event):
+    # The parent handles SIGINT/SIGTERM and signals shutdown through the event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    logger.info(f"Starting resume worker {worker_id}")
+    asyncio.run(work(worker_id, stop))
+    logger.info(f"Resume worker {worker_id} stopped")
+
+
+def run_pool(size: int):
+    # spawn, so children do not inherit the parent's pooled database connections
+    ctx = multiprocessing.get_context('spawn')
+    stop = ctx.Event()
+
+    def shutdown(signum, frame):
+        logger.info("Shutting down resume workers")
+        stop.set()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    processes = {}
+    while not stop.is_set():
+        for index in range(size):
+            process = processes.get(index)
+            if process is None or not process.is_alive():
+                if process is not None:
+                    logger.error(f"Resume worker {index} exited with code {process.exitcode}, restarting")
+                process = ctx.Process(target=run_worker, args=(index, stop), daemon=False)
+                process.start()
+                processes[index] = process
+        time.sleep(1)
+
+    for process in processes.values():
+        process.join()
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.getenv('RESUME_WORKERS', '2'))
+    logger.info(f"Starting resume worker pool with {size} workers")
+    run_pool(size)